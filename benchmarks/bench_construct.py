@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Time constructing tags with the tag functions (div(), span(), etc.), for the common
+shapes of arguments, and for building a large table.
+
+Usage: python benchmarks/bench_construct.py
+"""
+
+import timeit
+from typing import Callable
+
+from htmltools import Tag, br, div, span, tags
+
+
+def table(rows: int = 200, cols: int = 10) -> Tag:
+    return tags.table(
+        [
+            tags.tr([tags.td(span(f"{i}-{j}"), class_="cell") for j in range(cols)])
+            for i in range(rows)
+        ],
+        class_="table",
+    )
+
+
+def bench(label: str, fn: Callable[[], object], number: int) -> None:
+    best = min(timeit.repeat(fn, number=number, repeat=7)) / number
+    unit, scale = ("ms", 1e3) if best > 1e-3 else ("us", 1e6)
+    print(f"{label:<40} {best * scale:8.3f} {unit}")
+
+
+def main() -> None:
+    a, b = span("a"), span("b")
+    n = 100_000
+    print("Single tags:")
+    bench("  no arguments: br()", lambda: br(), n)
+    bench("  one string: span('text')", lambda: span("text"), n)
+    bench("  tag children: div(a, b)", lambda: div(a, b), n)
+    bench("  kwargs only: div(id=..., class_=...)", lambda: div(id="x", class_="y"), n)
+    bench("  string and kwargs: span('text', id=...)", lambda: span("text", id="x"), n)
+    bench("  list of children: div([a, b])", lambda: div([a, b]), n)
+    bench("  dict of attributes: div({'id': ...})", lambda: div({"id": "x"}), n)
+    print("Table (200 rows x 10 cells):")
+    bench("  build", table, 10)
+
+
+if __name__ == "__main__":
+    main()
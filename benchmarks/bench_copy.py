@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Time saving a page whose dependency has many files, when the dependency's files have
+already been copied (as when exporting many pages to the same directory).
+
+Usage: python benchmarks/bench_copy.py [--files N] [--size KB]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from htmltools import HTMLDependency, div
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=300)
+    parser.add_argument("--size", type=int, default=64, help="File size, in KB")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        src = os.path.join(tmpdir, "src")
+        for i in range(args.files):
+            f = os.path.join(src, f"dir{i % 10}", f"file{i}.js")
+            os.makedirs(os.path.dirname(f), exist_ok=True)
+            with open(f, "wb") as fh:
+                fh.write(os.urandom(args.size * 1024))
+        dep = HTMLDependency("bundle", "1.0", source={"subdir": src}, all_files=True)
+        page = div("Hello", dep)
+        out = os.path.join(tmpdir, "out", "index.html")
+        os.makedirs(os.path.dirname(out))
+
+        print(f"Saving a page with {args.files} dependency files of {args.size} KB:")
+        for label, kwargs in [
+            ("replace (default)", {}),
+            ("compare='mtime'", {"compare": "mtime"}),
+            ("compare='hash'", {"compare": "hash"}),
+            ("method='hardlink'", {"method": "hardlink"}),
+            ("method='reflink'", {"method": "reflink"}),
+            ("replace, workers=8", {"workers": 8}),
+            ("compare='mtime', workers=8", {"compare": "mtime", "workers": 8}),
+            ("compare='hash', workers=8", {"compare": "hash", "workers": 8}),
+        ]:
+            page.save_html(out, **kwargs)  # type: ignore
+            times = []
+            for _ in range(5):
+                t = time.perf_counter()
+                page.save_html(out, **kwargs)  # type: ignore
+                times.append(time.perf_counter() - t)
+            print(f"  {label:<30} {min(times) * 1000:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Time generating the <head> content for HTML dependencies, and rendering a document
+which has many dependencies.
+
+Usage: python benchmarks/bench_deps.py
+"""
+
+import timeit
+from typing import Callable, List
+
+from htmltools import HTMLDependency, HTMLDocument, div, head_content, tags
+
+
+def dependencies(n: int = 20) -> List[HTMLDependency]:
+    deps = [
+        HTMLDependency(
+            f"lib{i}",
+            "1.2.3",
+            source={"package": "htmltools", "subdir": f"lib{i}"},
+            script=[{"src": "js/main file.js"}, {"src": "js/extra.js", "defer": ""}],
+            stylesheet={"href": "css/style.css"},
+            meta={"name": f"lib{i}", "content": "x"},
+        )
+        for i in range(n)
+    ]
+    deps.append(head_content(tags.title("Title"), tags.style("body { margin: 0; }")))
+    return deps
+
+
+def bench(label: str, fn: Callable[[], object], number: int) -> None:
+    best = min(timeit.repeat(fn, number=number, repeat=7)) / number
+    unit, scale = ("ms", 1e3) if best > 1e-3 else ("us", 1e6)
+    print(f"{label:<40} {best * scale:8.3f} {unit}")
+
+
+def main() -> None:
+    deps = dependencies()
+    dep = deps[0]
+    doc = HTMLDocument(div("Hello", *deps))
+    print("One dependency:")
+    bench("  as_dict()", lambda: dep.as_dict(), 10_000)
+    bench("  as_html_tags()", lambda: dep.as_html_tags(), 10_000)
+    bench("  str()", lambda: str(dep), 10_000)
+    print(f"Document with {len(deps)} dependencies:")
+    bench("  render", lambda: doc.render(), 200)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Time `import htmltools` in fresh interpreters, and check it against a budget.
+
+Usage: python benchmarks/bench_import.py [--runs N] [--budget-ms MS]
+
+Exits with status 1 if the median import time is over the budget, or if any of the
+modules which are supposed to be imported lazily were imported.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# Modules which `import htmltools` shouldn't import (they're imported when needed).
+LAZY_MODULES = [
+    "htmltools.tags",
+    "htmltools.svg",
+    "htmltools._jsx",
+    "concurrent.futures",
+    "http.server",
+    "packaging.version",
+    "shutil",
+    "socketserver",
+    "tempfile",
+    "urllib.parse",
+    "webbrowser",
+]
+
+SCRIPT = f"""
+import sys, time
+t = time.perf_counter()
+import htmltools
+t = time.perf_counter() - t
+import json
+print(json.dumps([t, [m for m in {LAZY_MODULES!r} if m in sys.modules]]))
+"""
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def import_time() -> "tuple[float, list[str]]":
+    env = {**os.environ, "PYTHONPATH": ROOT}
+    out = subprocess.run(
+        [sys.executable, "-c", SCRIPT],
+        env=env,
+        cwd=ROOT,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    t, modules = json.loads(out)
+    return t, modules
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--budget-ms", type=float, default=40.0)
+    args = parser.parse_args()
+
+    # The first run may also compile the modules to bytecode, so it isn't counted.
+    import_time()
+    results = [import_time() for _ in range(args.runs)]
+    median = statistics.median(t for t, _ in results) * 1000
+    imported = sorted({m for _, modules in results for m in modules})
+
+    print(f"import htmltools: {median:.1f} ms (median of {args.runs} runs)")
+    print(f"budget:           {args.budget_ms:.1f} ms")
+    ok = median <= args.budget_ms
+    if imported:
+        print("Imported modules that should be lazy: " + ", ".join(imported))
+        ok = False
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
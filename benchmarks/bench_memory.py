@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Report the memory used per node by Tag trees with 100,000 nodes, and by a document
+which repeats the same few tags many times, as built, frozen, and frozen with interning
+(which shares equal subtrees), along with the time it takes to render them.
+
+Usage: python benchmarks/bench_memory.py
+"""
+
+import gc
+import timeit
+import tracemalloc
+from typing import Callable, Tuple, Union
+
+from htmltools import Tag, TagList, br, span, tags
+
+N_NODES = 100_000
+
+
+def leaves() -> Tuple[TagList, int]:
+    # Tags without attributes or children.
+    return TagList([br() for _ in range(N_NODES)]), N_NODES
+
+
+def text_leaves() -> Tuple[TagList, int]:
+    # Tags with a single text child.
+    return TagList([span(str(i)) for i in range(N_NODES)]), N_NODES
+
+
+def table() -> Tuple[Tag, int]:
+    # A table where every cell has attributes.
+    rows = N_NODES // 10
+    x = tags.table(
+        [
+            tags.tr([tags.td(str(j), class_="cell") for j in range(9)])
+            for _ in range(rows)
+        ]
+    )
+    return x, rows * 10
+
+
+# A list of items, each with a title, an icon, a badge, and a row of cells. The titles
+# are all different, but the icon is the same in every item, and the badges and the
+# cells only take a few values.
+def repetitive() -> Tuple[Tag, int]:
+    items = N_NODES // 20
+    x = tags.ul(
+        [
+            tags.li(
+                span(f"Item {i}", class_="title"),
+                tags.i(class_="bi bi-check-circle", aria_hidden="true"),
+                span("New" if i % 2 else "Old", class_="badge bg-secondary"),
+                tags.div(
+                    [tags.span(tags.b(str((i + j) % 7)), class_="c") for j in range(8)],
+                    class_="cells",
+                ),
+            )
+            for i in range(items)
+        ]
+    )
+    return x, items * 21
+
+
+def frozen(
+    build: Callable[[], Tuple[Union[Tag, TagList], int]], intern: bool = False
+) -> Callable[[], Tuple[object, int]]:
+    def build_frozen() -> Tuple[object, int]:
+        x, n_nodes = build()
+        return x.freeze(intern=intern), n_nodes
+
+    return build_frozen
+
+
+def measure(label: str, build: Callable[[], Tuple[object, int]]) -> None:
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    x, n_nodes = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print(f"{label:<36} {(after - before) / n_nodes:8.1f} bytes/node")
+    del x
+
+
+# Frozen tags cache their HTML, so each timing renders a new tree.
+def render(label: str, build: Callable[[], Tuple[object, int]]) -> None:
+    times = []
+    for _ in range(5):
+        x, _ = build()
+        times.append(timeit.timeit(lambda: str(x), number=1))
+    print(f"{label:<36} {min(times) * 1e3:8.1f} ms")
+
+
+def main() -> None:
+    print(f"Trees with {N_NODES:,} nodes:")
+    measure("  empty leaves, e.g. <br/>", leaves)
+    measure("  text leaves, e.g. <span>1</span>", text_leaves)
+    measure("  table cells with attributes", table)
+    measure("  table cells, frozen", frozen(table))
+    measure("  table cells, frozen, interned", frozen(table, intern=True))
+
+    print(f"Repetitive document with {N_NODES:,} nodes:")
+    measure("  as built", repetitive)
+    measure("  frozen", frozen(repetitive))
+    measure("  frozen, interned", frozen(repetitive, intern=True))
+    print("Rendering the repetitive document (the first time):")
+    render("  as built", repetitive)
+    render("  frozen", frozen(repetitive))
+    render("  frozen, interned", frozen(repetitive, intern=True))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Time rendering a page of repeated cards and table rows with and without a RenderCache,
+when the page is built again for every render (as a server does for every request),
+and when it's also frozen with intern=True, so that the cache can be used.
+
+Usage: python benchmarks/bench_render_cache.py
+"""
+
+import itertools
+import timeit
+from typing import Callable
+
+from htmltools import RenderCache, Tag, div, span, tags, use_render_cache
+
+_requests = itertools.count()
+
+
+def card(title: str) -> Tag:
+    return div(
+        div(
+            tags.h5(title, class_="card-title"),
+            tags.p("Some quick example text.", class_="card-text"),
+            tags.a("Details", href="#", class_="btn btn-primary"),
+            class_="card-body",
+        ),
+        class_="card",
+    )
+
+
+# A page which is the same for every request, except for its title.
+def page(cards: int = 50, rows: int = 200, cols: int = 10) -> Tag:
+    return div(
+        tags.h1(f"Request {next(_requests)}"),
+        div([card(f"Card {i % 5}") for i in range(cards)], class_="cards"),
+        tags.table(
+            [
+                tags.tr([tags.td(span(f"{j}"), class_="cell") for j in range(cols)])
+                for i in range(rows)
+            ],
+            class_="table",
+        ),
+    )
+
+
+def bench(label: str, fn: Callable[[], object]) -> float:
+    best = min(timeit.repeat(fn, number=5, repeat=7)) / 5
+    print(f"{label:<40} {best * 1e3:8.3f} ms")
+    return best
+
+
+# Render a page which was just built (and never rendered) on every call. The pages are
+# built beforehand, so that only rendering is timed.
+def render_new_pages() -> Callable[[], str]:
+    pages = iter([page() for _ in range(5 * 7)])
+    return lambda: str(next(pages))
+
+
+def main() -> None:
+    uncached = bench("Render a new page, no cache", render_new_pages())
+    cache = RenderCache()
+    with use_render_cache(cache):
+        cached = bench("Render a new page, cache", render_new_pages())
+    print(f"  time (cache / no cache): {cached / uncached:.2f}")
+
+    def interned() -> str:
+        return str(page().freeze(intern=True))
+
+    uncached = bench("Build, intern and render, no cache", interned)
+    with use_render_cache(cache):
+        cached = bench("Build, intern and render, cache", interned)
+    print(f"  time (cache / no cache): {cached / uncached:.2f}")
+    print(f"  {cache.cache_info()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Time saving many pages, which share dependencies, with save_site(), compared to calling
+save_html() for each page.
+
+Usage: python benchmarks/bench_site.py [--pages N] [--processes N]
+"""
+
+import argparse
+import functools
+import os
+import tempfile
+import time
+
+from htmltools import HTMLDependency, save_site, tags
+
+
+def page(i: int, deps: "list[HTMLDependency]") -> object:
+    return tags.div(
+        tags.h1(f"Report {i}"),
+        tags.table(
+            [tags.tr([tags.td(f"{i}-{r}-{c}") for c in range(8)]) for r in range(50)]
+        ),
+        *deps,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=500)
+    parser.add_argument("--processes", type=int, default=None)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        src = os.path.join(tmpdir, "src")
+        os.makedirs(src)
+        for i in range(50):
+            with open(os.path.join(src, f"file{i}.js"), "wb") as f:
+                f.write(os.urandom(64 * 1024))
+        deps = [
+            HTMLDependency(
+                "bundle", "1.0", source={"subdir": src}, script={"src": "file0.js"}
+            ),
+            HTMLDependency("assets", "1.0", source={"subdir": src}, all_files=True),
+        ]
+        pages = {f"reports/{i}.html": page(i, deps) for i in range(args.pages)}
+        print(f"Saving {args.pages} pages:")
+
+        os.makedirs(os.path.join(tmpdir, "a", "reports"))
+        t = time.perf_counter()
+        for path, x in pages.items():
+            file = os.path.join(tmpdir, "a", path)
+            x.save_html(file, libdir="../lib")  # type: ignore
+        t = time.perf_counter() - t
+        print("  save_html() for each page".ljust(36) + f"{t:8.3f} s")
+
+        # Pages given as functions are created in the processes which render them.
+        functions = {
+            f"reports/{i}.html": functools.partial(page, i, deps)
+            for i in range(args.pages)
+        }
+        for processes in sorted({1, args.processes or os.cpu_count() or 1}):
+            for label, x in [("tags", pages), ("functions", functions)]:
+                out = os.path.join(tmpdir, f"{label}{processes}")
+                t = time.perf_counter()
+                result = save_site(x, out, processes=processes)  # type: ignore
+                t = time.perf_counter() - t
+                render = sum(p["render_time"] for p in result["pages"])
+                print(
+                    f"  save_site({label}, processes={processes})".ljust(36)
+                    + f"{t:8.3f} s (render {render:.3f} s, "
+                    + f"copy {result['copy_time']:.3f} s)"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Time rendering the rows of a table by creating (and rendering) the tags for each row,
+and by filling in a Template.
+
+Usage: python benchmarks/bench_template.py
+"""
+
+import timeit
+from typing import Callable
+
+from htmltools import HTML, Slot, Tag, Template, span, tags
+
+ROWS = [(f"Item {i}", i, f"<note {i}>") for i in range(1000)]
+
+
+def row(name: str, count: int, note: str) -> Tag:
+    return tags.tr(
+        tags.td(tags.a(name, href=f"/items/{count}")),
+        tags.td(str(count), class_="num"),
+        tags.td(span(note, class_="note")),
+        class_="row",
+    )
+
+
+ROW = Template(
+    tags.tr(
+        tags.td(tags.a(Slot("name"), href=Slot("href"))),
+        tags.td(Slot("count", int), class_="num"),
+        tags.td(span(Slot("note"), class_="note")),
+        class_="row",
+    )
+)
+
+
+def with_tags() -> str:
+    return str(tags.table([row(*r) for r in ROWS]))
+
+
+def with_template() -> str:
+    rows = [
+        ROW(name=name, href=f"/items/{count}", count=count, note=note)
+        for name, count, note in ROWS
+    ]
+    return str(tags.table(HTML("\n".join(rows))))
+
+
+def bench(label: str, fn: Callable[[], object]) -> float:
+    best = min(timeit.repeat(fn, number=5, repeat=7)) / 5
+    print(f"{label:<40} {best * 1e3:8.3f} ms")
+    return best
+
+
+def main() -> None:
+    print(f"{len(ROWS)} rows")
+    slow = bench("Create and render tags", with_tags)
+    fast = bench("Fill in a Template", with_template)
+    print(f"  speedup: {slow / fast:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
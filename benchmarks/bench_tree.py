@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Compare the explicit-stack tree traversal (used by rendering, tagify() and
+get_dependencies()) against the recursive implementation it replaced, time
+rendering a frozen tree, and compare equality checks with structural hashes
+against the field-by-field comparison they replaced.
+
+Usage: python benchmarks/bench_tree.py
+"""
+
+import sys
+import timeit
+from typing import List
+
+from htmltools import HTML, HTMLDependency, MetadataNode, Tag, TagList, div, span, tags
+from htmltools._core import _normalize_text, _structural_hash
+from htmltools._util import _html_escape
+
+_VOID_TAG_NAMES = {"br", "hr", "img", "input", "link", "meta"}
+
+
+# The recursive renderer, as it was before the explicit-stack traversal.
+def tag_open_html(x: Tag) -> str:
+    html_ = "<" + x.name
+    for key, val in x.attrs.items():
+        if not isinstance(val, HTML):
+            val = _html_escape(val, attr=True)
+        html_ += f' {key}="{val}"'
+    return html_
+
+
+def recursive_tag_html(x: Tag, indent: int = 0, eol: str = "\n") -> str:
+    indent_str = "  " * indent
+    html_ = indent_str + tag_open_html(x)
+    children = [c for c in x.children if not isinstance(c, MetadataNode)]
+    if len(children) == 0 and x.name in _VOID_TAG_NAMES:
+        return html_ + "/>"
+    html_ += ">"
+    close = "</" + x.name + ">"
+    if len(children) == 0:
+        return html_ + close
+    if len(children) == 1 and isinstance(children[0], str):
+        return html_ + _normalize_text(children[0]) + close
+    html_ += eol + recursive_taglist_html(x.children, indent + 1, eol)
+    return html_ + eol + indent_str + close
+
+
+def recursive_taglist_html(x: TagList, indent: int = 0, eol: str = "\n") -> str:
+    html_ = ""
+    line_prefix = ""
+    for child in x:
+        if isinstance(child, Tag):
+            html_ += line_prefix + recursive_tag_html(child, indent, eol)
+        elif isinstance(child, MetadataNode):
+            continue
+        else:
+            html_ += line_prefix + ("  " * indent) + _normalize_text(child)
+        line_prefix = eol
+    return HTML(html_)
+
+
+def recursive_dependencies(x: TagList) -> List[HTMLDependency]:
+    deps: List[HTMLDependency] = []
+    for child in x:
+        if isinstance(child, HTMLDependency):
+            deps.append(child)
+        elif isinstance(child, Tag):
+            deps.extend(recursive_dependencies(child.children))
+    return deps
+
+
+# Tag equality, as it was before structural hashes: a recursive comparison of the names,
+# attributes and children.
+def recursive_equals(x: object, y: object) -> bool:
+    if isinstance(x, Tag):
+        return (
+            isinstance(y, Tag)
+            and x.name == y.name
+            and dict(x.attrs) == dict(y.attrs)
+            and recursive_equals(x.children, y.children)
+        )
+    if isinstance(x, list):
+        return (
+            isinstance(y, list)
+            and len(x) == len(y)
+            and all(recursive_equals(a, b) for a, b in zip(x, y))
+        )
+    return x == y
+
+
+def shallow_tree(rows: int = 200, cols: int = 10) -> Tag:
+    dep = HTMLDependency("a", "1.0", source={"subdir": "a"}, script={"src": "a.js"})
+    return tags.table(
+        [
+            tags.tr([tags.td(span(f"{i}-{j}", class_="cell")) for j in range(cols)])
+            for i in range(rows)
+        ],
+        dep,
+        class_="table",
+    )
+
+
+def deep_tree(depth: int) -> Tag:
+    x = span("leaf")
+    for _ in range(depth):
+        x = div(x)
+    return x
+
+
+def bench(label: str, fn, number: int = 20) -> float:
+    best = min(timeit.repeat(fn, number=number, repeat=7)) / number
+    print(f"{label:<40} {best * 1000:8.3f} ms")
+    return best
+
+
+def main() -> None:
+    x = shallow_tree()
+    assert recursive_tag_html(x) == x.get_html_string()
+
+    print("Shallow tree (200 rows x 10 cells):")
+    old = bench("  render, recursive", lambda: recursive_tag_html(x))
+    new = bench("  render, explicit stack", lambda: x.get_html_string())
+    print(f"  ratio (explicit stack / recursive): {new / old:.2f}")
+    old = bench("  dependencies, recursive", lambda: recursive_dependencies(x.children))
+    new = bench(
+        "  dependencies, explicit stack", lambda: x.get_dependencies(dedup=False)
+    )
+    print(f"  ratio (explicit stack / recursive): {new / old:.2f}")
+    bench("  tagify", lambda: x.tagify())
+    frozen = x.freeze()
+    bench("  render, frozen (spliced from cache)", lambda: div(frozen).render())
+
+    x2 = shallow_tree()
+    assert recursive_equals(x, x2) and x == x2
+
+    print("Equality of two copies of the shallow tree:")
+    bench("  previous (recursive)", lambda: recursive_equals(x, x2))
+    bench("  explicit stack", lambda: x == x2)
+    bench("  computing a structural hash", lambda: _structural_hash(x))
+    frozen2 = x2.freeze()
+    _structural_hash(frozen), _structural_hash(frozen2)
+    bench("  frozen, with known hashes", lambda: frozen == frozen2, number=1000)
+
+    depth = sys.getrecursionlimit() * 3
+    y = deep_tree(depth)
+    print(f"Deep tree ({depth} levels):")
+    bench("  render", lambda: y.get_html_string(), number=1)
+    bench("  tagify", lambda: y.tagify(), number=1)
+    bench("  dependencies", lambda: y.get_dependencies(), number=1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,11 @@
 __version__ = "0.1.2"
 
+from typing import TYPE_CHECKING, List
+
 from ._core import (
     TagList,
     Tag,
+    FrozenTag,
     HTMLDocument,
     HTML,
     MetadataNode,
@@ -14,34 +17,106 @@ from ._core import (
     TagFunction,
     Tagifiable,
     head_content,
+    LoadedDependencies,
+    RenderCache,
+    RenderCacheInfo,
+    set_render_cache,
+    use_render_cache,
+    set_bundle_dir,
 )
-from ._jsx import jsx, jsx_tag_create, JSXTag, JSXTagAttrArg
-from ._util import css
-from .tags import (
-    p,
-    h1,
-    h2,
-    h3,
-    h4,
-    h5,
-    h6,
-    a,
-    br,
-    div,
-    span,
-    pre,
-    code,
-    img,
-    strong,
-    em,
-    hr,
-)
-from . import tags
-from . import svg
+from ._util import css, clear_path_caches, set_file_hash_cache
+from ._site import save_site, PageResult, SiteResult
+from ._memo import memo_component, MemoComponent, ComponentCacheInfo
+from ._template import Template, Slot
+
+if TYPE_CHECKING:
+    from ._jsx import jsx, jsx_tag_create, JSXTag, JSXTagAttrArg
+    from .tags import (
+        p,
+        h1,
+        h2,
+        h3,
+        h4,
+        h5,
+        h6,
+        a,
+        br,
+        div,
+        span,
+        pre,
+        code,
+        img,
+        strong,
+        em,
+        hr,
+    )
+    from . import tags
+    from . import svg
+
+# The tag functions (and the JSX functions) are defined in modules which take a while to
+# import, so they're imported the first time that one of them is accessed. The
+# submodules which importing them used to load are imported on access too.
+_lazy_modules = ("tags", "svg", "_jsx", "_versions")
+_lazy_imports = {
+    "jsx": "._jsx",
+    "jsx_tag_create": "._jsx",
+    "JSXTag": "._jsx",
+    "JSXTagAttrArg": "._jsx",
+    **{
+        name: ".tags"
+        for name in (
+            "p",
+            "h1",
+            "h2",
+            "h3",
+            "h4",
+            "h5",
+            "h6",
+            "a",
+            "br",
+            "div",
+            "span",
+            "pre",
+            "code",
+            "img",
+            "strong",
+            "em",
+            "hr",
+        )
+    },
+}
+
+
+def __getattr__(name: str) -> object:
+    from importlib import import_module
+
+    if name in _lazy_modules:
+        value: object = import_module("." + name, __name__)
+    elif name in _lazy_imports:
+        value = getattr(import_module(_lazy_imports[name], __name__), name)
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    globals()[name] = value
+    return value
+
+
+# The helpers for the lazy imports aren't listed, so the names are the same as when
+# everything was imported eagerly.
+def __dir__() -> List[str]:
+    names = set(globals()).union(_lazy_imports, _lazy_modules)
+    names.difference_update(
+        ("_lazy_modules", "_lazy_imports", "__getattr__", "__dir__")
+    )
+    return sorted(names)
+
+
+del TYPE_CHECKING, List
+
 
 __all__ = (
     "TagList",
     "Tag",
+    "FrozenTag",
     "HTMLDocument",
     "HTML",
     "MetadataNode",
@@ -53,11 +128,27 @@ __all__ = (
     "TagFunction",
     "Tagifiable",
     "head_content",
+    "LoadedDependencies",
+    "RenderCache",
+    "RenderCacheInfo",
+    "set_render_cache",
+    "use_render_cache",
+    "set_bundle_dir",
     "jsx",
     "jsx_tag_create",
     "JSXTag",
     "JSXTagAttrArg",
     "css",
+    "clear_path_caches",
+    "set_file_hash_cache",
+    "save_site",
+    "PageResult",
+    "SiteResult",
+    "memo_component",
+    "MemoComponent",
+    "ComponentCacheInfo",
+    "Template",
+    "Slot",
     "p",
     "h1",
     "h2",
@@ -1,12 +1,13 @@
 import os
+import re
 import sys
-import shutil
-import tempfile
-from pathlib import Path
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
 from copy import copy, deepcopy
-import urllib.parse
-import webbrowser
 from typing import (
+    TYPE_CHECKING,
+    Callable,
     Iterable,
     Optional,
     Sequence,
@@ -15,6 +16,10 @@ from typing import (
     Dict,
     Mapping,
     Any,
+    Iterator,
+    NamedTuple,
+    Set,
+    Tuple,
     TypeVar,
     cast,
 )
@@ -37,12 +42,23 @@ else:
         Literal,
     )
 
-from packaging.version import Version
+# Some modules are only needed by a few functions, and take a while to import, so
+# they're imported by those functions (to keep `import htmltools` fast).
+if TYPE_CHECKING:
+    from concurrent.futures import ThreadPoolExecutor
+    from packaging.version import Version
 
 
 from ._util import (
     ensure_http_server,
     _package_dir,  # type: ignore
+    _path_caches_generation,  # type: ignore
+    _file_hashes_for,  # type: ignore
+    _read_file,  # type: ignore
+    _data_uri,  # type: ignore
+    _realpath,  # type: ignore
+    _remove_stale_files,  # type: ignore
+    _sync_file,  # type: ignore
     _html_escape,  # type: ignore
     _flatten,  # type: ignore
     hash_deterministic,
@@ -51,6 +67,7 @@ from ._util import (
 __all__ = (
     "TagList",
     "Tag",
+    "FrozenTag",
     "HTMLDocument",
     "HTML",
     "MetadataNode",
@@ -62,26 +79,33 @@ __all__ = (
     "TagFunction",
     "Tagifiable",
     "head_content",
+    "LoadedDependencies",
+    "RenderCache",
+    "RenderCacheInfo",
+    "set_render_cache",
+    "use_render_cache",
+    "set_bundle_dir",
 )
 
 
 class RenderedHTML(TypedDict):
     dependencies: List["HTMLDependency"]
     html: str
+    link_header: NotRequired[str]
 
 
 # MetadataNode objects are not shown when a Tag tree is rendered to HTML text. They can
 # be used to carry information that doesn't fit into the normal HTML tree structure,
 # such as `HTMLDependency` objects.
 #
-# Note that when `x.tagify()` is called on the parent of a MetadataNode, it calls copy()
-# on MetadataNode; when copied, the resulting object should be completely independent of
-# the original. This may require implementing a custom `__copy__` method.
+# Note that `x.tagify()` doesn't copy MetadataNode objects; like the subtrees which
+# don't contain anything to tagify, they are shared between `x` and the result.
 class MetadataNode:
-    pass
+    __slots__ = ()
 
 
 T = TypeVar("T")
+R = TypeVar("R")
 
 TagT = TypeVar("TagT", bound="Tag")
 
@@ -142,15 +166,30 @@ class TagList(List[TagChild]):
     <div id="foo" class="bar"></div>
     """
 
+    # `_clean_epoch` is the value of `_tagify_epoch` when it was last known that tagify()
+    # has nothing to convert in this list or its descendants (or -1 if it isn't known).
+    # See _mark_tagify_dirty().
+    __slots__ = ("_clean_epoch",)
+
     def __init__(self, *args: TagChildArg) -> None:
-        super().__init__(_tagchildargs_to_tagchilds(args))
+        clean = _simple_children_clean(args)
+        if clean is None:
+            children = _tagchildargs_to_tagchilds(args)
+            super().__init__(children)
+            clean = _all_clean(children)
+        else:
+            super().__init__(args)
+        self._clean_epoch = _tagify_epoch if clean else -1
 
     def extend(self, x: Iterable[TagChildArg]) -> None:
         """
         Extend the children by appending an iterable of children.
         """
 
-        super().extend(_tagchildargs_to_tagchilds(x))
+        children = _tagchildargs_to_tagchilds(x)
+        if not _all_clean(children):
+            _mark_tagify_dirty()
+        super().extend(children)
 
     def append(self, *args: TagChildArg) -> None:  # type: ignore
         """
@@ -169,32 +208,74 @@ class TagList(List[TagChild]):
 
         self[index:index] = _tagchildargs_to_tagchilds([x])
 
+    def __setitem__(self, index: Any, value: Any) -> None:
+        if isinstance(index, slice):
+            value = list(value)
+            if not _all_clean(value):
+                _mark_tagify_dirty()
+        elif not _all_clean([value]):
+            _mark_tagify_dirty()
+        super().__setitem__(index, value)
+
+    def __iadd__(self, x: Iterable[TagChild]) -> "TagList":  # type: ignore
+        x = list(x)
+        if not _all_clean(x):
+            _mark_tagify_dirty()
+        return super().__iadd__(x)
+
     def tagify(self) -> "TagList":
         """
         Convert any tagifiable children to Tag/TagList objects.
+
+        Note
+        ----
+        The returned TagList is a new object, but descendants which don't contain
+        anything to convert are shared with the original (rather than copied), so
+        modifying them in place (e.g., with ``.append()`` or ``.add_class()``) modifies
+        the original too. Use :func:`copy.deepcopy` first to get an independent copy.
         """
 
-        cp = copy(self)
+        cp = _tagify_children(self)
+        return copy(self) if cp is None else cp
 
-        # Iterate backwards because if we hit a Tagifiable object, it may be replaced
-        # with 0, 1, or more items (if it returns TagList).
-        for i in reversed(range(len(cp))):
-            child = cp[i]
+    def freeze(self, *, intern: bool = False) -> "TagList":
+        """
+        Get an immutable, tagified copy of the tag list.
 
-            if isinstance(child, Tagifiable):
-                tagified_child = child.tagify()
-                if isinstance(tagified_child, TagList):
-                    # If the Tagifiable object returned a TagList, flatten it into this one.
-                    cp[i : i + 1] = _tagchildargs_to_tagchilds(tagified_child)
-                else:
-                    cp[i] = tagified_child
+        Parameters
+        ----------
+        intern
+            Whether to share equal subtrees. See :meth:`Tag.freeze`.
 
-            elif isinstance(child, MetadataNode):
-                cp[i] = copy(child)
+        Returns
+        -------
+        A tag list which can't be modified, and which caches its HTML and dependencies.
+        The tags in it are :class:`FrozenTag` objects.
+        """
+
+        return _freeze_children(self.tagify(), intern)
+
+    def __copy__(self) -> "TagList":
+        # The children have already been validated, so skip the list.append() calls (and
+        # the per-item validation) that the default copy() would do.
+        cls = self.__class__
+        cp = cls.__new__(cls)
+        list.extend(cp, self)
+        _copy_instance_attrs(self, cp)
         return cp
 
     def save_html(
-        self, file: str, *, libdir: Optional[str] = "lib", include_version: bool = True
+        self,
+        file: str,
+        *,
+        libdir: Optional[str] = "lib",
+        include_version: bool = True,
+        content_hash: Optional[Literal["path", "query"]] = None,
+        self_contained: bool = False,
+        bundle: bool = False,
+        compare: Optional[Literal["mtime", "hash"]] = None,
+        method: Literal["copy", "hardlink", "reflink"] = "copy",
+        workers: int = 1,
     ) -> str:
         """
         Save to a HTML file.
@@ -207,6 +288,23 @@ class TagList(List[TagChild]):
             The directory to save the dependencies to.
         include_version
             Whether to include the version number in the dependency folder name.
+        content_hash
+            Whether to include a hash of the contents of dependency files in their URLs.
+            See :meth:`HTMLDocument.render`.
+        self_contained
+            Whether to include the contents of dependencies' scripts and stylesheets in
+            the HTML file, instead of copying them to ``libdir``. See the
+            ``inline_deps`` argument of :meth:`HTMLDocument.render`.
+        bundle
+            Whether to combine the scripts and stylesheets of dependencies into one file
+            each. See :meth:`HTMLDocument.render`.
+        compare
+            How to tell whether existing copies of dependency files are up to date. See
+            :meth:`HTMLDependency.copy_to`.
+        method
+            How to copy dependency files. See :meth:`HTMLDependency.copy_to`.
+        workers
+            The number of threads to copy dependency files with.
 
         Returns
         -------
@@ -214,16 +312,31 @@ class TagList(List[TagChild]):
         """
 
         return HTMLDocument(self).save_html(
-            file, libdir=libdir, include_version=include_version
+            file,
+            libdir=libdir,
+            include_version=include_version,
+            content_hash=content_hash,
+            self_contained=self_contained,
+            bundle=bundle,
+            compare=compare,
+            method=method,
+            workers=workers,
         )
 
-    def render(self) -> RenderedHTML:
+    def render(
+        self, *, loaded: Optional["LoadedDependenciesArg"] = None
+    ) -> RenderedHTML:
         """
         Get string representation as well as it's HTML dependencies.
+
+        Parameters
+        ----------
+        loaded
+            Dependencies which have already been loaded (see
+            :class:`LoadedDependencies`). Only the dependencies which are new, or newer
+            than the loaded versions, are returned.
         """
-        cp = self.tagify()
-        deps = cp.get_dependencies()
-        return {"dependencies": deps, "html": cp.get_html_string()}
+        return _render_fused(self, loaded)
 
     def get_html_string(
         self, indent: int = 0, eol: str = "\n", *, _escape_strings: bool = True
@@ -239,31 +352,9 @@ class TagList(List[TagChild]):
             End-of-line character(s).
         """
 
-        html_ = ""
-        line_prefix = ""
-        for child in self:
-            if isinstance(child, Tag):
-                # Note that we don't pass _escape_strings along, because that should
-                # only be set to True when <script> and <style> tags call
-                # self.children.get_html_string(), and those tags don't have children to
-                # recurse into.
-                html_ += line_prefix + child.get_html_string(indent, eol)
-            elif isinstance(child, MetadataNode):
-                continue
-            elif isinstance(child, Tagifiable):
-                raise RuntimeError(
-                    "Encountered a non-tagified object. x.tagify() must be called before x.render()"
-                )
-            else:
-                # If we get here, x must be a string.
-                if _escape_strings:
-                    html_ += line_prefix + ("  " * indent) + _normalize_text(child)
-                else:
-                    html_ += line_prefix + ("  " * indent) + child
-
-            if line_prefix == "":
-                line_prefix = eol
-        return HTML(html_)
+        chunks: List[str] = []
+        _write_taglist_html(self, chunks.append, indent, eol, _escape_strings)
+        return HTML("".join(chunks))
 
     def get_dependencies(self, *, dedup: bool = True) -> List["HTMLDependency"]:
         """
@@ -275,15 +366,7 @@ class TagList(List[TagChild]):
             Whether to deduplicate the dependencies.
         """
 
-        deps: List[HTMLDependency] = []
-        for x in self:
-            if isinstance(x, HTMLDependency):
-                deps.append(x)
-            elif isinstance(x, Tag):
-                # When we recurse, don't deduplicate at every node. We only need to do
-                # that once, at the top level.
-                deps.extend(x.get_dependencies(dedup=False))
-
+        deps = _collect_dependencies(self)
         if dedup:
             return _resolve_dependencies(deps)
         else:
@@ -304,7 +387,11 @@ class TagList(List[TagChild]):
         return str(self.get_html_string())
 
     def __eq__(self, other: Any) -> bool:
-        return _equals_impl(self, other)
+        return _tags_equal(self, other)
+
+    # list defines __ne__(), so it isn't derived from __eq__().
+    def __ne__(self, other: Any) -> bool:
+        return not _tags_equal(self, other)
 
     def __repr__(self) -> str:
         return repr(self.get_html_string())
@@ -328,9 +415,11 @@ class TagAttrs(Dict[str, str]):
         More attributes.
     """
 
+    __slots__ = ()
+
     def __init__(self, *args: Mapping[str, TagAttrArg], **kwargs: TagAttrArg) -> None:
         super().__init__()
-        self.update(*args, **kwargs)
+        self._update(args + (kwargs,) if kwargs else args)
 
     def __setitem__(self, name: str, value: TagAttrArg) -> None:
         val = self._normalize_attr_value(value)
@@ -343,16 +432,27 @@ class TagAttrs(Dict[str, str]):
     def update(  # type: ignore
         self, *args: Mapping[str, TagAttrArg], **kwargs: TagAttrArg
     ) -> None:
-        if kwargs:
-            args = args + (kwargs,)
+        self._update(args + (kwargs,) if kwargs else args)
+
+    def _update(self, args: Tuple[Mapping[str, TagAttrArg], ...]) -> None:
+        # Subclasses may normalize differently, so only use the shortcuts for TagAttrs.
+        plain = self.__class__ is TagAttrs
+        names = _attr_names if plain else {}
 
         attrz: Dict[str, Union[str, HTML]] = {}
         for arg in args:
             for k, v in arg.items():
-                val = self._normalize_attr_value(v)
-                if val is None:
-                    continue
-                nm = self._normalize_attr_name(k)
+                if plain and v.__class__ is str:
+                    val = v
+                else:
+                    val = self._normalize_attr_value(v)
+                    if val is None:
+                        continue
+                nm = names.get(k)
+                if nm is None:
+                    nm = self._normalize_attr_name(k)
+                    if len(names) < 1000:
+                        names[k] = nm
 
                 # Preserve the HTML() when combining two HTML() attributes
                 if nm in attrz:
@@ -362,6 +462,14 @@ class TagAttrs(Dict[str, str]):
 
         super().update(attrz)
 
+    def __copy__(self) -> "TagAttrs":
+        # The attributes have already been normalized, so skip __setitem__().
+        cls = self.__class__
+        cp = cls.__new__(cls)
+        dict.update(cp, self)
+        _copy_instance_attrs(self, cp)
+        return cp
+
     @staticmethod
     def _normalize_attr_name(x: str) -> str:
         # e.g., foo_Bar_ -> foo-Bar
@@ -385,6 +493,10 @@ class TagAttrs(Dict[str, str]):
         )
 
 
+# Normalized attribute names, e.g., {"class_": "class", "data_foo": "data-foo"}.
+_attr_names: Dict[str, str] = {}
+
+
 # =============================================================================
 # Tag class
 # =============================================================================
@@ -421,9 +533,11 @@ class Tag:
     >>> x.show()
     """
 
+    # Tags without attributes or children share the immutable _EMPTY_ATTRS and
+    # _EMPTY_CHILDREN objects, until .attrs or .children is accessed.
+    __slots__ = ("name", "_attrs", "_children")
+
     name: str
-    attrs: TagAttrs
-    children: TagList
 
     def __init__(
         self,
@@ -434,6 +548,25 @@ class Tag:
     ) -> None:
         self.name = _name
 
+        if not children:
+            # Fast path for the common case, where the children are strings and tags,
+            # and all the attributes are keyword arguments.
+            clean = _simple_children_clean(args)
+            if clean is not None:
+                if kwargs:
+                    self._attrs = TagAttrs.__new__(TagAttrs)
+                    self._attrs._update((kwargs,))
+                else:
+                    self._attrs = _EMPTY_ATTRS
+                if args:
+                    kids_ = TagList.__new__(TagList)
+                    list.extend(kids_, args)
+                    kids_._clean_epoch = _tagify_epoch if clean else -1
+                    self._children = kids_
+                else:
+                    self._children = _EMPTY_CHILDREN
+                return
+
         # As a workaround for Python not allowing for numerous keyword
         # arguments of the same name, we treat any dictionaries that appear
         # within children as attributes (i.e., treat them like kwargs).
@@ -442,14 +575,42 @@ class Tag:
             arguments.extend(_flatten(children))
 
         attrs = [x for x in arguments if isinstance(x, dict)]
-        self.attrs = TagAttrs(*attrs, **kwargs)
+        self._attrs = TagAttrs(*attrs, **kwargs) if attrs or kwargs else _EMPTY_ATTRS
 
         kids = [x for x in arguments if not isinstance(x, dict)]
-        self.children = TagList(*kids)
+        self._children = TagList(*kids) if kids else _EMPTY_CHILDREN
+
+    @property
+    def attrs(self) -> TagAttrs:
+        attrs = self._attrs
+        if attrs is _EMPTY_ATTRS:
+            attrs = self._attrs = TagAttrs()
+        return attrs
+
+    @attrs.setter
+    def attrs(self, value: TagAttrs) -> None:
+        self._attrs = value
+
+    @property
+    def children(self) -> TagList:
+        children = self._children
+        if children is _EMPTY_CHILDREN:
+            children = self._children = TagList()
+        return children
+
+    @children.setter
+    def children(self, value: TagList) -> None:
+        # The new children may have been created before the epoch was last incremented,
+        # and are now attached to a tree whose bookkeeping may say it is clean.
+        if value and value._clean_epoch != _tagify_epoch:
+            _mark_tagify_dirty()
+        self._children = value
 
     def __call__(self, *args: TagChildArg, **kwargs: TagAttrArg) -> "Tag":
-        self.children.extend(args)
-        self.attrs.update(**kwargs)
+        if args:
+            self.children.extend(args)
+        if kwargs:
+            self.attrs.update(**kwargs)
         return self
 
     def __copy__(self: TagT) -> TagT:
@@ -457,8 +618,12 @@ class Tag:
         cp = cls.__new__(cls)
         # Any instance fields (like .children, and _attrs for the tag subclass) are
         # shallow-copied.
-        new_dict = {key: copy(value) for key, value in self.__dict__.items()}
-        cp.__dict__.update(new_dict)
+        if cls is Tag:
+            cp.name = self.name
+            cp._attrs = copy(self._attrs)
+            cp._children = copy(self._children)
+        else:
+            _copy_instance_attrs(self, cp, copy)
         return cp
 
     def insert(self, index: SupportsIndex, x: TagChildArg) -> None:
@@ -514,7 +679,7 @@ class Tag:
         -------
         ``True`` if the tag has the class, ``False`` otherwise.
         """
-        cls = self.attrs.get("class")
+        cls = self._attrs.get("class")
         if cls:
             return class_ in cls.split(" ")
         else:
@@ -523,12 +688,49 @@ class Tag:
     def tagify(self: TagT) -> TagT:
         """
         Convert any tagifiable children to Tag/TagList objects.
+
+        Note
+        ----
+        The returned Tag is a new object, but descendants which don't contain anything
+        to convert are shared with the original (rather than copied), so modifying them
+        in place (e.g., with ``.append()`` or ``.add_class()``) modifies the original
+        too. Use :func:`copy.deepcopy` first to get an independent copy.
         """
 
+        children = _tagify_children(self._children)
         cp = copy(self)
-        cp.children = cp.children.tagify()
+        if children is not None:
+            cp._children = children
         return cp
 
+    def freeze(self, *, intern: bool = False) -> "FrozenTag":
+        """
+        Get an immutable, tagified copy of the tag.
+
+        Parameters
+        ----------
+        intern
+            Whether to share equal subtrees. If ``True``, descendant tags which are
+            equal (have the same name, attributes, and children) are replaced by one
+            :class:`FrozenTag` object, and equal attributes and strings are shared too.
+            This uses less memory for content which repeats the same tags many times,
+            such as icons, badges, or table cells, and the HTML of a tag which appears
+            more than once is only rendered once.
+
+        Returns
+        -------
+        A :class:`FrozenTag`, which caches its HTML and dependencies. Descendant tags are
+        frozen too.
+        """
+
+        cp = self.tagify()
+        if not isinstance(cp, FrozenTag) and not _is_freezable(cp):
+            raise TypeError(
+                f"Can't freeze a {type(self).__name__} object, because it customizes "
+                + "its HTML output or dependencies."
+            )
+        return cast(FrozenTag, _freeze_children([cp], intern)[0])
+
     def get_html_string(self, indent: int = 0, eol: str = "\n") -> "HTML":
         """
         Get the HTML string representation of the tag.
@@ -541,53 +743,37 @@ class Tag:
             The end-of-line character(s).
         """
 
-        indent_str = "  " * indent
-        html_ = indent_str + "<" + self.name
-
-        # Write attributes
-        for key, val in self.attrs.items():
-            if not isinstance(val, HTML):
-                val = _html_escape(val, attr=True)
-            html_ += f' {key}="{val}"'
+        chunks: List[str] = []
+        _write_tag_html(self, chunks.append, indent, eol)
+        return HTML("".join(chunks))
 
-        # Dependencies are ignored in the HTML output
-        children = [x for x in self.children if not isinstance(x, MetadataNode)]
-
-        # Don't enclose JSX/void elements if there are no children
-        if len(children) == 0 and self.name in _VOID_TAG_NAMES:
-            return HTML(html_ + "/>")
-
-        # Other empty tags are enclosed
-        html_ += ">"
-        close = "</" + self.name + ">"
-        if len(children) == 0:
-            return HTML(html_ + close)
-
-        # Inline a single/empty child text node
-        if len(children) == 1 and isinstance(children[0], str):
-            if self.name in _NO_ESCAPE_TAG_NAMES:
-                return HTML(html_ + children[0] + close)
-            else:
-                return HTML(html_ + _normalize_text(children[0]) + close)
-
-        # Write children
-        # TODO: inline elements should eat ws?
-        html_ += eol
-        html_ += self.children.get_html_string(
-            indent + 1, eol, _escape_strings=(self.name not in _NO_ESCAPE_TAG_NAMES)
-        )
-        return HTML(html_ + eol + indent_str + close)
-
-    def render(self) -> RenderedHTML:
+    def render(
+        self, *, loaded: Optional["LoadedDependenciesArg"] = None
+    ) -> RenderedHTML:
         """
         Get string representation as well as it's HTML dependencies.
+
+        Parameters
+        ----------
+        loaded
+            Dependencies which have already been loaded (see
+            :class:`LoadedDependencies`). Only the dependencies which are new, or newer
+            than the loaded versions, are returned.
         """
-        cp = self.tagify()
-        deps = cp.get_dependencies()
-        return {"dependencies": deps, "html": cp.get_html_string()}
+        return _render_fused([self], loaded)
 
     def save_html(
-        self, file: str, *, libdir: Optional[str] = "lib", include_version: bool = True
+        self,
+        file: str,
+        *,
+        libdir: Optional[str] = "lib",
+        include_version: bool = True,
+        content_hash: Optional[Literal["path", "query"]] = None,
+        self_contained: bool = False,
+        bundle: bool = False,
+        compare: Optional[Literal["mtime", "hash"]] = None,
+        method: Literal["copy", "hardlink", "reflink"] = "copy",
+        workers: int = 1,
     ) -> str:
         """
         Save to a HTML file.
@@ -600,6 +786,23 @@ class Tag:
             The directory to save the dependencies to.
         include_version
             Whether to include the version number in the dependency folder name.
+        content_hash
+            Whether to include a hash of the contents of dependency files in their URLs.
+            See :meth:`HTMLDocument.render`.
+        self_contained
+            Whether to include the contents of dependencies' scripts and stylesheets in
+            the HTML file, instead of copying them to ``libdir``. See the
+            ``inline_deps`` argument of :meth:`HTMLDocument.render`.
+        bundle
+            Whether to combine the scripts and stylesheets of dependencies into one file
+            each. See :meth:`HTMLDocument.render`.
+        compare
+            How to tell whether existing copies of dependency files are up to date. See
+            :meth:`HTMLDependency.copy_to`.
+        method
+            How to copy dependency files. See :meth:`HTMLDependency.copy_to`.
+        workers
+            The number of threads to copy dependency files with.
 
         Returns
         -------
@@ -607,14 +810,22 @@ class Tag:
         """
 
         return HTMLDocument(self).save_html(
-            file, libdir=libdir, include_version=include_version
+            file,
+            libdir=libdir,
+            include_version=include_version,
+            content_hash=content_hash,
+            self_contained=self_contained,
+            bundle=bundle,
+            compare=compare,
+            method=method,
+            workers=workers,
         )
 
     def get_dependencies(self, dedup: bool = True) -> List["HTMLDependency"]:
         """
         Get any HTML dependencies.
         """
-        return self.children.get_dependencies(dedup=dedup)
+        return self._children.get_dependencies(dedup=dedup)
 
     def show(self, renderer: Literal["auto", "ipython", "browser"] = "auto") -> object:
         """
@@ -637,7 +848,366 @@ class Tag:
         return str(self.get_html_string())
 
     def __eq__(self, other: Any) -> bool:
-        return _equals_impl(self, other)
+        return _tags_equal(self, other)
+
+
+# =============================================================================
+# FrozenTag class
+# =============================================================================
+def _frozen_error(self: Any, *args: Any, **kwargs: Any) -> Any:
+    raise TypeError(
+        "Frozen tags, and their attributes and children, can't be modified."
+    )
+
+
+# The attributes of a FrozenTag.
+class _FrozenTagAttrs(TagAttrs):
+    __slots__ = ()
+
+    __setitem__ = __delitem__ = update = setdefault = _frozen_error  # type: ignore
+    pop = popitem = clear = __ior__ = _frozen_error  # type: ignore
+
+    def __copy__(self) -> "_FrozenTagAttrs":
+        return self
+
+    def __deepcopy__(self, memo: Dict[int, Any]) -> "_FrozenTagAttrs":
+        return self
+
+    def __reduce__(self) -> Any:
+        return (_frozen_tagattrs, (dict(self),))
+
+
+# The children of a FrozenTag (or the result of TagList.freeze()). It never contains
+# anything for tagify() to convert. The rendered HTML, the dependencies, and the
+# structural hash are cached the first time they're needed.
+class _FrozenTagList(TagList):
+    __slots__ = ("_html_cache", "_deps", "_hash_cache")
+
+    _html_cache: Optional[Dict[Tuple[int, str, bool], "HTML"]]
+    _deps: Optional[List["HTMLDependency"]]
+
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _frozen_error  # type: ignore
+    append = extend = insert = pop = remove = clear = _frozen_error  # type: ignore
+    sort = reverse = _frozen_error  # type: ignore
+
+    @property
+    def _clean_epoch(self) -> int:  # type: ignore
+        return _tagify_epoch
+
+    def __copy__(self) -> "_FrozenTagList":
+        return self
+
+    def __deepcopy__(self, memo: Dict[int, Any]) -> "_FrozenTagList":
+        return self
+
+    def __reduce__(self) -> Any:
+        return (_frozen_taglist, (list(self),))
+
+    def freeze(self, *, intern: bool = False) -> "_FrozenTagList":
+        return _freeze_children(self, True) if intern else self
+
+    def __hash__(self) -> int:  # type: ignore
+        return _frozen_hash(self)
+
+    def render(
+        self, *, loaded: Optional["LoadedDependenciesArg"] = None
+    ) -> RenderedHTML:
+        deps = _filter_loaded(self.get_dependencies(), loaded)
+        return {
+            "dependencies": [copy(d) for d in deps],
+            "html": self.get_html_string(),
+        }
+
+    def get_html_string(
+        self, indent: int = 0, eol: str = "\n", *, _escape_strings: bool = True
+    ) -> "HTML":
+        cache = self._html_cache
+        if cache is None:
+            cache = self._html_cache = {}
+        key = (indent, eol, _escape_strings)
+        html_ = cache.get(key)
+        if html_ is None:
+            html_ = cache[key] = super().get_html_string(
+                indent, eol, _escape_strings=_escape_strings
+            )
+        return html_
+
+    def get_dependencies(self, *, dedup: bool = True) -> List["HTMLDependency"]:
+        deps = self._dependencies()
+        return _resolve_dependencies(deps) if dedup else list(deps)
+
+    # The (cached) dependencies, without deduplicating. Don't modify the result.
+    def _dependencies(self) -> List["HTMLDependency"]:
+        if self._deps is None:
+            self._deps = _collect_dependencies(self)
+        return self._deps
+
+
+class FrozenTag(Tag):
+    """
+    An immutable HTML tag, which caches its HTML and dependencies.
+
+    The attributes and children of a frozen tag (and those of its descendants) can't be
+    modified, so it only has to be rendered once: after that, its HTML is inserted as is
+    wherever the tag appears. This is useful for content which is the same on every
+    page, such as headers, navigation bars, and footers.
+
+    Parameters
+    -----------
+    _name
+        The tag's name.
+    *args
+        Children for the tag.
+    children
+        Children for the tag.
+    **kwargs
+        Attributes for the tag.
+
+    Note
+    ----
+    FrozenTag objects are usually created with :meth:`Tag.freeze`. Tagifiable children
+    are tagified when the tag is frozen, and descendant tags are frozen too, except for
+    instances of Tag subclasses that customize their HTML output or dependencies. Those
+    are kept as they are, and shouldn't be modified after they've been frozen.
+
+    Example
+    --------
+    >>> from htmltools import div, tags
+    >>> nav = tags.nav(tags.a("Home", href="/"), class_="navbar").freeze()
+    >>> div(nav, "Page content")
+    <div>
+      <nav class="navbar">
+        <a href="/">Home</a>
+      </nav>
+      Page content
+    </div>
+    """
+
+    # `_html_cache` is the rendered HTML, keyed by (indent, eol). It's created the first
+    # time it's needed, or when the tag is found to be shared by interning (see
+    # _write_html_frames()). `_hash_cache` is the structural hash (see
+    # _structural_hash()), which is computed the first time it's needed.
+    __slots__ = ("_html_cache", "_hash_cache")
+
+    _attrs: _FrozenTagAttrs
+    _children: _FrozenTagList
+    _html_cache: Optional[Dict[Tuple[int, str], "HTML"]]
+
+    def __init__(
+        self,
+        _name: str,
+        *args: TagChildArg,
+        children: Optional[List[TagChildArg]] = None,
+        **kwargs: TagAttrArg,
+    ) -> None:
+        tag = Tag(_name, *args, children=children, **kwargs).tagify()
+        _init_frozen_tag(self, tag.name, tag.attrs, _freeze_children(tag.children))
+
+    __setattr__ = __delattr__ = _frozen_error  # type: ignore
+
+    @property
+    def attrs(self) -> TagAttrs:
+        return self._attrs
+
+    @property
+    def children(self) -> TagList:
+        return self._children
+
+    def __copy__(self) -> "FrozenTag":
+        return self
+
+    def __deepcopy__(self, memo: Dict[int, Any]) -> "FrozenTag":
+        return self
+
+    def __reduce__(self) -> Any:
+        return (_frozen_tag, (self.name, dict(self.attrs), list(self.children)))
+
+    def get_html_string(self, indent: int = 0, eol: str = "\n") -> "HTML":
+        cache = self._html_cache
+        if cache is None:
+            cache = {}
+            object.__setattr__(self, "_html_cache", cache)
+        key = (indent, eol)
+        html_ = cache.get(key)
+        if html_ is None:
+            render_cache = _current_render_cache()
+            cache_key = (
+                None if render_cache is None else _render_cache_key(self, indent, eol)
+            )
+            entry = None if cache_key is None else render_cache._get(cache_key)
+            if entry is not None:
+                html_ = cache[key] = HTML(entry[0])
+                return html_
+            # The tag is written directly, rather than as the child of a list, since
+            # that would splice it in from the cache.
+            chunks: List[str] = []
+            frame = _write_tag_open_html(self, chunks.append, indent, eol)
+            if frame is not None:
+                _write_html_frames([frame], chunks.append, eol)
+            html_ = cache[key] = HTML("".join(chunks))
+            if cache_key is not None:
+                render_cache._put(cache_key, html_, None)
+        return html_
+
+    def render(
+        self, *, loaded: Optional["LoadedDependenciesArg"] = None
+    ) -> RenderedHTML:
+        deps = _filter_loaded(self.get_dependencies(), loaded)
+        return {
+            "dependencies": [copy(d) for d in deps],
+            "html": self.get_html_string(),
+        }
+
+    def __eq__(self, other: Any) -> bool:
+        # A FrozenTag is equal to a Tag with the same name, attributes, and children.
+        if isinstance(other, Tag) and not isinstance(other, FrozenTag):
+            return _tags_equal(other, self)
+        return _tags_equal(self, other)
+
+    def __hash__(self) -> int:
+        return _frozen_hash(self)
+
+
+def _frozen_tagattrs(x: Mapping[str, str]) -> _FrozenTagAttrs:
+    if isinstance(x, _FrozenTagAttrs):
+        return x
+    if not x:
+        return _EMPTY_ATTRS
+    attrs = _FrozenTagAttrs.__new__(_FrozenTagAttrs)
+    dict.update(attrs, x)
+    return attrs
+
+
+def _frozen_taglist(x: Iterable[TagChild]) -> _FrozenTagList:
+    children = _FrozenTagList.__new__(_FrozenTagList)
+    list.extend(children, x)
+    if not children:
+        return _EMPTY_CHILDREN
+    children._html_cache = None
+    children._deps = None
+    children._hash_cache = None
+    return children
+
+
+def _init_frozen_tag(
+    x: FrozenTag, name: str, attrs: Mapping[str, str], children: _FrozenTagList
+) -> None:
+    object.__setattr__(x, "name", name)
+    object.__setattr__(x, "_attrs", _frozen_tagattrs(attrs))
+    object.__setattr__(x, "_children", children)
+    object.__setattr__(x, "_html_cache", None)
+    object.__setattr__(x, "_hash_cache", None)
+
+
+# Shared by all tags that have no attributes or no children (see Tag.__slots__).
+_EMPTY_ATTRS = _FrozenTagAttrs.__new__(_FrozenTagAttrs)
+_EMPTY_CHILDREN = _FrozenTagList.__new__(_FrozenTagList)
+_EMPTY_CHILDREN._html_cache = None
+_EMPTY_CHILDREN._deps = None
+_EMPTY_CHILDREN._hash_cache = None
+
+
+def _frozen_tag(
+    name: str, attrs: Mapping[str, str], children: Iterable[TagChild]
+) -> FrozenTag:
+    x = FrozenTag.__new__(FrozenTag)
+    _init_frozen_tag(x, name, attrs, _frozen_taglist(children))
+    return x
+
+
+# Can `x` be converted to a FrozenTag? Instances of Tag subclasses which customize their
+# output can't be, because the FrozenTag would render differently.
+def _is_freezable(x: object) -> bool:
+    cls = type(x)
+    return (
+        isinstance(x, Tag)
+        and cls is not FrozenTag
+        and cls.get_html_string is Tag.get_html_string
+        and cls.get_dependencies is Tag.get_dependencies
+    )
+
+
+# Freeze the (already tagified) items of `x`, converting Tag objects to FrozenTag objects.
+# A Tag which appears more than once in the tree is only frozen once, so the frozen tree
+# shares the FrozenTag in the same way. If `intern` is True, equal tags are shared too,
+# and FrozenTag objects are frozen again, so that they're shared with equal tags.
+def _freeze_children(x: List[TagChild], intern: bool = False) -> _FrozenTagList:
+    frozen: Dict[int, Optional[FrozenTag]] = {}
+    interner = _Interner() if intern else None
+    # Each frame is (tag, iterator over its children); a tag is frozen when its frame is
+    # popped, i.e., after all of its descendants.
+    stack: List[Tuple[Optional[Tag], Iterator[TagChild]]] = [(None, iter(x))]
+    while stack:
+        tag, children = stack[-1]
+        for child in children:
+            if id(child) not in frozen and (
+                _is_freezable(child) or (intern and child.__class__ is FrozenTag)
+            ):
+                frozen[id(child)] = None
+                stack.append((cast(Tag, child), iter(cast(Tag, child)._children)))
+                break
+        else:
+            stack.pop()
+            if tag is None:
+                continue
+            tag_children = [frozen.get(id(c)) or c for c in tag._children]
+            if interner is None:
+                frozen[id(tag)] = _frozen_tag(tag.name, tag._attrs, tag_children)
+            else:
+                frozen[id(tag)] = interner.tag(tag.name, tag._attrs, tag_children)
+
+    items = [frozen.get(id(c)) or c for c in x]
+    if interner is not None:
+        items = interner.strings(items)
+    return _frozen_taglist(items)
+
+
+# The tables of the shared objects in an interned tree (see _freeze_children()).
+class _Interner:
+    __slots__ = ("_tags", "_attrs", "_strings")
+
+    def __init__(self) -> None:
+        # FrozenTag objects are keyed by themselves: they're hashed by their structural
+        # hash (see _structural_hash()). Attributes are keyed by their items, and
+        # whether the values are HTML.
+        self._tags: Dict[FrozenTag, FrozenTag] = {}
+        self._attrs: Dict[Tuple[Any, ...], _FrozenTagAttrs] = {}
+        self._strings: Dict[str, str] = {}
+
+    def tag(
+        self, name: str, attrs: Mapping[str, str], children: List[TagChild]
+    ) -> FrozenTag:
+        attrs_key = tuple((k, v, isinstance(v, HTML)) for k, v in attrs.items())
+        frozen_attrs = self._attrs.get(attrs_key)
+        if frozen_attrs is None:
+            frozen_attrs = self._attrs[attrs_key] = _frozen_tagattrs(attrs)
+        x = FrozenTag.__new__(FrozenTag)
+        _init_frozen_tag(x, name, frozen_attrs, _frozen_taglist(self.strings(children)))
+        shared = self._tags.setdefault(x, x)
+        if shared is not x and shared._html_cache is None:
+            # Give the tag a cache, so that it's only rendered once (see
+            # _write_html_frames()).
+            object.__setattr__(shared, "_html_cache", {})
+        return shared
+
+    # Replace the strings (but not HTML strings) in `x` with shared ones.
+    def strings(self, x: List[TagChild]) -> List[TagChild]:
+        strings = self._strings
+        return [strings.setdefault(c, c) if c.__class__ is str else c for c in x]
+
+
+# A shallow copy of `x` which can be modified, even if `x` is a FrozenTag.
+def _mutable_copy(x: Tag) -> Tag:
+    if not isinstance(x, FrozenTag):
+        return copy(x)
+    cp = Tag.__new__(Tag)
+    cp.name = x.name
+    cp._attrs = TagAttrs.__new__(TagAttrs)
+    dict.update(cp._attrs, x._attrs)
+    cp._children = TagList.__new__(TagList)
+    list.extend(cp._children, x._children)
+    cp._children._clean_epoch = _tagify_epoch
+    return cp
 
 
 # Tags that have the form <tagname />
@@ -662,6 +1232,779 @@ _VOID_TAG_NAMES = {
 
 _NO_ESCAPE_TAG_NAMES = {"script", "style"}
 
+
+# =============================================================================
+# Classifying tag children
+# =============================================================================
+# Constructing, tagifying, and rendering tags all need to know what kind of object each
+# child is, and `isinstance(x, Tagifiable)` (a runtime-checkable Protocol) is much
+# slower than a check for a concrete type. So the kind of each type of child is computed
+# once, and cached. (This means that adding a `tagify` method to a class after its
+# instances have been used as children isn't noticed.) The kinds are, in order of
+# precedence:
+_KIND_TAG = 0  # Tag, or a subclass that doesn't override tagify() or rendering.
+_KIND_FROZEN_TAG = 1  # FrozenTag.
+_KIND_CUSTOM_TAG = 2  # Other Tag subclasses.
+_KIND_STR = 3  # str, but not HTML.
+_KIND_HTML = 4
+_KIND_NUMBER = 5  # int or float, which are converted to str by TagList().
+_KIND_METADATA = 6  # MetadataNode that isn't Tagifiable.
+_KIND_TAGIFIABLE = 7  # Other objects with a .tagify() method.
+_KIND_INVALID = 8  # Anything else, which can't be a tag child.
+
+_child_kinds: Dict[type, int] = {}
+
+
+def _child_kind(x: object) -> int:
+    cls = type(x)
+    kind = _child_kinds.get(cls)
+    if kind is None:
+        kind = _child_kinds[cls] = _classify_child_type(cls)
+    if kind < 0:
+        # Instances of this type may be Tagifiable, even though the type isn't.
+        return _KIND_TAGIFIABLE if isinstance(x, Tagifiable) else ~kind
+    return kind
+
+
+# Returns the kind of child that instances of `cls` are. If the type doesn't have a
+# `tagify` attribute, but its instances might (e.g., by setting it on the instance, or
+# with __getattr__()), returns the bitwise complement of the kind, so that
+# _child_kind() checks each instance.
+def _classify_child_type(cls: type) -> int:
+    if issubclass(cls, Tag):
+        if cls is FrozenTag:
+            return _KIND_FROZEN_TAG
+        if (
+            cls.tagify is Tag.tagify
+            and cls.get_html_string is Tag.get_html_string
+            and cls.get_dependencies is Tag.get_dependencies
+        ):
+            return _KIND_TAG
+        return _KIND_CUSTOM_TAG
+    if issubclass(cls, str):
+        return _KIND_HTML if issubclass(cls, HTML) else _KIND_STR
+    if issubclass(cls, (int, float)):
+        return _KIND_NUMBER
+    if hasattr(cls, "tagify"):
+        return _KIND_TAGIFIABLE
+    kind = _KIND_METADATA if issubclass(cls, MetadataNode) else _KIND_INVALID
+    if "__dict__" in dir(cls) or hasattr(cls, "__getattr__"):
+        return ~kind
+    return kind
+
+
+# If the items of `x` can be used as tag children as they are (i.e., they're tags,
+# strings, and metadata, so they don't need to be flattened, converted, or checked for
+# attributes), returns whether they're known to be unaffected by tagify() (see
+# _all_clean()). Otherwise, returns None.
+def _simple_children_clean(x: Sequence[object]) -> Optional[bool]:
+    clean = True
+    kinds = _child_kinds
+    for child in x:
+        kind = kinds.get(type(child))
+        if kind is None or kind < 0:
+            kind = _child_kind(child)
+        if kind <= _KIND_FROZEN_TAG:
+            if clean:
+                children = child._children  # type: ignore
+                clean = not children or children._clean_epoch == _tagify_epoch
+        elif kind != _KIND_STR and kind != _KIND_HTML and kind != _KIND_METADATA:
+            return None
+    return clean
+
+
+# =============================================================================
+# Tree traversal
+# =============================================================================
+# The functions below walk Tag trees with an explicit stack instead of recursing once
+# per level of nesting, so arbitrarily deep trees don't hit Python's recursion limit.
+
+# `write` is any callable that accepts a chunk of HTML text, e.g. `list.append`,
+# `io.StringIO.write`, or the `write` method of an open file. Nested tags write into the
+# same callable, so the output is only joined once by the caller (instead of once per
+# level of nesting).
+HTMLWriter = Callable[[str], object]
+
+# Whether to tagify while writing. With "deep", the results of calling .tagify() are
+# tagified too (so Tagifiable objects can return other Tagifiable objects), which is
+# what documents do.
+_TagifyArg = Union[bool, Literal["deep"]]
+
+
+def _write_tag_html(x: "Tag", write: HTMLWriter, indent: int, eol: str) -> None:
+    _write_taglist_html([x], write, indent, eol)
+
+
+def _write_taglist_html(
+    x: Iterable[TagChild],
+    write: HTMLWriter,
+    indent: int,
+    eol: str,
+    escape_strings: bool = True,
+    *,
+    tagify: _TagifyArg = False,
+    deps: Optional[List["HTMLDependency"]] = None,
+) -> None:
+    if tagify and isinstance(x, TagList) and x._clean_epoch == _tagify_epoch:
+        # There's nothing to tagify in this subtree.
+        tagify = False
+    children = x if isinstance(x, list) else list(x)
+    if tagify:
+        children = _tagify_expand(children, tagify == "deep")
+    frame = [children, 0, indent, "  " * indent, escape_strings, "", tagify, "", None]
+    cache = _current_render_cache()
+    if cache is None:
+        _write_html_frames([frame], write, eol, deps)
+        return
+    # The cache stores the HTML of subtrees by joining the chunks they were written to,
+    # so the chunks are written to a list (which is the caller's, if `write` is the
+    # append method of a list).
+    out = getattr(write, "__self__", None)
+    if out.__class__ is list and write == out.append:
+        _write_html_frames([frame], write, eol, deps, cache, out)
+    else:
+        out = []
+        _write_html_frames([frame], out.append, eol, deps, cache, out)
+        write("".join(out))
+
+
+# Render `x` in a single pass: Tagifiable objects are tagified as they are encountered,
+# HTMLDependency objects are collected, and HTML is written, all in the same traversal.
+# This is equivalent to x.tagify(), then .get_dependencies(), then .get_html_string(),
+# but it doesn't copy the tree or walk it three times.
+def _render_fused(
+    x: Iterable[TagChild], loaded: Optional["LoadedDependenciesArg"] = None
+) -> RenderedHTML:
+    chunks: List[str] = []
+    deps: List[HTMLDependency] = []
+    _write_taglist_html(x, chunks.append, 0, "\n", tagify=True, deps=deps)
+    deps = _filter_loaded(_resolve_dependencies(deps), loaded)
+    return {
+        "dependencies": [copy(d) for d in deps],
+        "html": HTML("".join(chunks)),
+    }
+
+
+# Wraps the result of calling .tagify() on a child during a fused render. The result is
+# already tagified, so its subtree shouldn't be tagified again.
+class _Tagified:
+    __slots__ = ("x",)
+
+    def __init__(self, x: TagChild) -> None:
+        self.x = x
+
+
+# Replace the Tagifiable objects in `x` with (wrapped) results of calling .tagify() on
+# them. Returns `x` itself when there is nothing to tagify. If `deep` is True, the
+# results aren't wrapped, but tagified too (see _tagify_result()).
+def _tagify_expand(x: List[Any], deep: bool = False) -> List[Any]:
+    result: Optional[List[Any]] = None
+    for i, child in enumerate(x):
+        kind = _child_kind(child)
+        if kind == _KIND_CUSTOM_TAG:
+            needs_tagify = type(child).tagify is not Tag.tagify
+        else:
+            needs_tagify = kind == _KIND_TAGIFIABLE
+
+        if not needs_tagify:
+            if result is not None:
+                result.append(child)
+            continue
+
+        if result is None:
+            result = x[:i]
+        tagified_child = child.tagify()
+        if deep:
+            result.extend(_tagify_result(tagified_child))
+        elif isinstance(tagified_child, TagList):
+            # If the Tagifiable object returned a TagList, flatten it into this one.
+            result.extend(
+                _Tagified(y) for y in _tagchildargs_to_tagchilds(tagified_child)
+            )
+        else:
+            result.append(_Tagified(tagified_child))
+
+    return x if result is None else result
+
+
+# Tagify the result of calling .tagify() on a child, for a deep tagify. Tagifiable
+# objects which it returns are tagified, and so are the items of TagLists it returns.
+# Tags are returned as they are, and their children are tagified when they're written
+# (calling .tagify() on a Tag subclass again could return a Tag of the same class).
+def _tagify_result(x: Any) -> List[Any]:
+    while not isinstance(x, TagList):
+        if _child_kind(x) != _KIND_TAGIFIABLE or isinstance(x, MetadataNode):
+            return [x]
+        x = x.tagify()
+    return _tagify_expand(_tagchildargs_to_tagchilds(x), deep=True)
+
+
+# Each frame is a list of [children, next_index, indent, indent_str, escape_strings,
+# close, tagify, line_prefix, cached], where `close` is written after the last child.
+# When a child Tag has children of its own, the current frame is suspended and a new
+# frame is pushed for the child. If `tagify` is True, Tagifiable grandchildren are
+# tagified when the frame for their parent is created. If `deps` is not None,
+# HTMLDependency objects are appended to it as they are encountered.
+#
+# If `cache` is not None, tags are looked up in it before they're written, and the HTML
+# of the ones that aren't found is added to it after they're written (`out` is the list
+# of chunks which `write` appends to, and `cached` is where the tag's HTML and
+# dependencies start in `out` and `deps`).
+def _write_html_frames(
+    stack: List[List[Any]],
+    write: HTMLWriter,
+    eol: str,
+    deps: Optional[List["HTMLDependency"]] = None,
+    cache: Optional["RenderCache"] = None,
+    out: Optional[List[str]] = None,
+) -> None:
+    while stack:
+        frame = stack[-1]
+        (
+            children,
+            i,
+            indent,
+            indent_str,
+            escape_strings,
+            close,
+            tagify,
+            line_prefix,
+            _,
+        ) = frame
+        n = len(children)
+        while i < n:
+            child = children[i]
+            i += 1
+            child_tagify = tagify
+            if child.__class__ is _Tagified:
+                child = child.x
+                child_tagify = False
+
+            kind = _child_kind(child)
+            if kind <= _KIND_CUSTOM_TAG:
+                # Note that we don't pass escape_strings along, because that should only
+                # be False for the children of <script> and <style> tags, and those tags
+                # don't have children to recurse into.
+                if line_prefix:
+                    write(line_prefix)
+                line_prefix = eol
+                if kind == _KIND_FROZEN_TAG and (
+                    children.__class__ is not _FrozenTagList
+                    or child._html_cache is not None
+                ):
+                    # Splice in the cached HTML of a frozen tag. In a frozen tree, only
+                    # the tags which have a cache (e.g., the ones which appear more than
+                    # once in an interned tree) are spliced in, so that the HTML of
+                    # every tag in the tree isn't cached.
+                    write(child.get_html_string(indent, eol))
+                    if deps is not None:
+                        deps.extend(child._children._dependencies())
+                    continue
+                cached = None
+                if cache is not None and kind == _KIND_FROZEN_TAG:
+                    key = _render_cache_key(child, indent, eol)
+                    if key is not None:
+                        entry = cache._get(key)
+                        if entry is not None:
+                            write(entry[0])
+                            if deps is not None:
+                                deps.extend(_cached_dependencies(child, entry))
+                            continue
+                        start = len(out)  # type: ignore
+                        cached = (key, start, -1 if deps is None else len(deps))
+                child_frame = _write_tag_open_html(
+                    child, write, indent, eol, child_tagify, deps
+                )
+                if child_frame is not None:
+                    child_frame[8] = cached
+                    frame[1] = i
+                    frame[7] = line_prefix
+                    stack.append(child_frame)
+                    break
+                if cached is not None:
+                    _cache_rendered(cache, out, deps, cached)  # type: ignore
+            elif kind == _KIND_METADATA or (
+                kind == _KIND_TAGIFIABLE and isinstance(child, MetadataNode)
+            ):
+                if deps is not None:
+                    _collect_metadata(child, deps, indent)
+            elif kind == _KIND_TAGIFIABLE:
+                raise RuntimeError(
+                    "Encountered a non-tagified object. x.tagify() must be called before x.render()"
+                )
+            else:
+                # If we get here, x must be a string.
+                if escape_strings:
+                    write(line_prefix + indent_str + _normalize_text(child))
+                else:
+                    write(line_prefix + indent_str + child)
+                line_prefix = eol
+        else:
+            stack.pop()
+            if close:
+                write(close)
+            if frame[8] is not None:
+                _cache_rendered(cache, out, deps, frame[8])  # type: ignore
+
+
+# Write a tag and, if it has children which need their own lines, write its opening tag
+# and return a frame for writing the children.
+def _write_tag_open_html(
+    x: "Tag",
+    write: HTMLWriter,
+    indent: int,
+    eol: str,
+    tagify: _TagifyArg = False,
+    deps: Optional[List["HTMLDependency"]] = None,
+) -> Optional[List[Any]]:
+    cls = type(x)
+    if _child_kind(x) == _KIND_CUSTOM_TAG and (
+        cls.get_html_string is not Tag.get_html_string
+        or (deps is not None and cls.get_dependencies is not Tag.get_dependencies)
+    ):
+        # Respect subclasses that customize their HTML output or dependencies.
+        if tagify:
+            x = x.tagify()
+        write(x.get_html_string(indent, eol))
+        if deps is not None:
+            deps.extend(x.get_dependencies(dedup=False))
+        return None
+
+    children: List[Any] = x._children
+    if tagify:
+        if children._clean_epoch == _tagify_epoch:
+            # There's nothing to tagify in this subtree.
+            tagify = False
+        else:
+            children = _tagify_expand(children, tagify == "deep")
+
+    # Dependencies are ignored in the HTML output, so find out if there are zero, one,
+    # or more children which are actually written.
+    n_written = 0
+    first_written: Any = None
+    for child in children:
+        if child.__class__ is _Tagified:
+            child = child.x
+        if not isinstance(child, MetadataNode):
+            n_written += 1
+            if n_written > 1:
+                break
+            first_written = child
+
+    name = x.name
+    indent_str = "  " * indent
+    open_ = indent_str + "<" + name
+    for key, val in x._attrs.items():
+        if not isinstance(val, HTML):
+            val = _html_escape(val, attr=True)
+        open_ += f' {key}="{val}"'
+
+    if n_written == 0:
+        # Don't enclose JSX/void elements if there are no children
+        if name in _VOID_TAG_NAMES:
+            write(open_ + "/>")
+        # Other empty tags are enclosed
+        else:
+            write(open_ + "></" + name + ">")
+
+    # Inline a single/empty child text node
+    elif n_written == 1 and isinstance(first_written, str):
+        if name in _NO_ESCAPE_TAG_NAMES:
+            write(open_ + ">" + first_written + "</" + name + ">")
+        else:
+            write(open_ + ">" + _normalize_text(first_written) + "</" + name + ">")
+
+    # Write children
+    # TODO: inline elements should eat ws?
+    else:
+        write(open_ + ">" + eol)
+        return [
+            children,
+            0,
+            indent + 1,
+            indent_str + "  ",
+            name not in _NO_ESCAPE_TAG_NAMES,
+            eol + indent_str + "</" + name + ">",
+            tagify,
+            "",
+            None,
+        ]
+
+    # The children weren't written with a frame, so collect their dependencies here.
+    if deps is not None:
+        for child in children:
+            if child.__class__ is _Tagified:
+                child = child.x
+            if isinstance(child, MetadataNode):
+                _collect_metadata(child, deps, indent + 1)
+    return None
+
+
+def _collect_metadata(
+    x: MetadataNode, deps: List["HTMLDependency"], indent: int
+) -> None:
+    if isinstance(x, HTMLDependency):
+        deps.append(x)
+    elif isinstance(x, _HeadContentSlot):
+        x.mark(deps, indent)
+
+
+# Bookkeeping for tagify(). A TagList's `_clean_epoch` is set to the current value of
+# `_tagify_epoch` when it's known that neither it nor its descendants contain anything
+# that tagify() would convert (i.e., Tagifiable objects other than plain Tags). Lists
+# don't know their parents, so when something that might need converting is added to an
+# existing list, instead of invalidating the list's ancestors, the epoch is incremented,
+# which invalidates every list at once. Building new trees doesn't increment the epoch.
+_tagify_epoch: int = 0
+
+
+def _mark_tagify_dirty() -> None:
+    global _tagify_epoch
+    _tagify_epoch += 1
+
+
+# Are the items known to be unaffected by tagify()?
+def _all_clean(x: Iterable[object]) -> bool:
+    for child in x:
+        kind = _child_kind(child)
+        if kind == _KIND_STR or kind == _KIND_HTML or kind == _KIND_METADATA:
+            continue
+        if kind <= _KIND_CUSTOM_TAG:
+            if kind == _KIND_CUSTOM_TAG and type(child).tagify is not Tag.tagify:
+                return False
+            children = child._children
+            if children and children._clean_epoch != _tagify_epoch:
+                return False
+        elif isinstance(child, TagList):
+            if child and child._clean_epoch != _tagify_epoch:
+                return False
+        else:
+            return False
+    return True
+
+
+# Convert any Tagifiable objects in `x` (and its descendants) to Tag/TagList objects.
+# This is copy-on-write: `x` is not modified, and only the lists (and Tags) which are
+# ancestors of a converted object are copied; other subtrees are shared with `x`.
+# Returns None if there was nothing to convert.
+def _tagify_children(x: TagList) -> Optional[TagList]:
+    epoch = _tagify_epoch
+    if not x or x._clean_epoch == epoch:
+        return None
+
+    # Each frame is [list, index, copy_of_list, owner], where `owner` is the Tag whose
+    # children are `list` (or None for `x`), and `copy_of_list` is None until one of the
+    # children is converted. Lists are processed back to front because if we hit a
+    # Tagifiable object, it may be replaced with 0, 1, or more items (if it returns
+    # TagList). This is also the order in which .tagify() methods were called by the
+    # recursive implementation.
+    stack: List[List[Any]] = [[x, len(x), None, None]]
+    while True:
+        frame = stack[-1]
+        children: TagList = frame[0]
+        i = frame[1] - 1
+
+        if i < 0:
+            stack.pop()
+            new_children: Optional[TagList] = frame[2]
+            if new_children is None:
+                children._clean_epoch = epoch
+            if not stack:
+                return new_children
+            if new_children is not None:
+                cp = copy(frame[3])
+                cp._children = new_children
+                parent = stack[-1]
+                if parent[2] is None:
+                    parent[2] = copy(parent[0])
+                list.__setitem__(parent[2], parent[1], cp)
+            continue
+
+        frame[1] = i
+        child = children[i]
+        kind = _child_kind(child)
+        if kind <= _KIND_CUSTOM_TAG and (
+            kind != _KIND_CUSTOM_TAG or type(child).tagify is Tag.tagify
+        ):
+            grandchildren = child._children
+            if grandchildren and grandchildren._clean_epoch != epoch:
+                stack.append([grandchildren, len(grandchildren), None, child])
+
+        elif kind == _KIND_TAGIFIABLE or kind == _KIND_CUSTOM_TAG:
+            if frame[2] is None:
+                frame[2] = copy(children)
+            tagified_child = child.tagify()
+            if isinstance(tagified_child, TagList):
+                # If the Tagifiable object returned a TagList, flatten it into this one.
+                list.__setitem__(
+                    frame[2],
+                    slice(i, i + 1),
+                    _tagchildargs_to_tagchilds(tagified_child),
+                )
+            else:
+                list.__setitem__(frame[2], i, tagified_child)
+
+
+# Collect HTMLDependency objects in document order, without deduplicating.
+def _collect_dependencies(x: Iterable[TagChild]) -> List["HTMLDependency"]:
+    deps: List[HTMLDependency] = []
+    stack: List[Iterator[TagChild]] = [iter(x)]
+    while stack:
+        for child in stack[-1]:
+            kind = _child_kind(child)
+            if kind <= _KIND_CUSTOM_TAG:
+                if (
+                    kind == _KIND_CUSTOM_TAG
+                    and type(child).get_dependencies is not Tag.get_dependencies
+                ):
+                    deps.extend(child.get_dependencies(dedup=False))
+                elif kind == _KIND_FROZEN_TAG and child._children._deps is not None:
+                    deps.extend(child._children._deps)
+                elif child._children:
+                    stack.append(iter(child._children))
+                    break
+            elif isinstance(child, HTMLDependency):
+                deps.append(child)
+        else:
+            stack.pop()
+
+    return deps
+
+
+# =============================================================================
+# Render cache
+# =============================================================================
+class RenderCacheInfo(NamedTuple):
+    """
+    Statistics of a :class:`RenderCache`.
+    """
+
+    hits: int
+    misses: int
+    evictions: int
+    entries: int
+    bytes: int
+    max_bytes: int
+
+
+# The HTML of a tag, its dependencies (or None if they weren't collected), and its size.
+_RenderCacheEntry = Tuple[str, Optional[List["HTMLDependency"]], int]
+
+
+class RenderCache:
+    """
+    A cache of the HTML of rendered tags, keyed by their content.
+
+    When a render cache is in use (see :func:`set_render_cache` and
+    :func:`use_render_cache`), frozen tags (see :meth:`Tag.freeze`) which have child
+    tags are looked up in it before they're rendered, and if an equal tag (one with the
+    same name, attributes, and children) has been rendered before, with the same
+    indentation, its HTML is written instead of rendering the tag again. Its
+    dependencies are cached too.
+
+    Tags are looked up by their structural hash, a digest of their content. Computing
+    it takes about as long as rendering a tag, so only tags whose hash is already known
+    are looked up: those of trees frozen with ``intern=True``, and frozen tags which
+    have been compared or hashed before. This lets equal frozen trees which are built
+    separately (for example, for every request) share their HTML. Mutable tags are
+    always rendered, so a cache doesn't slow down pages which are built for every
+    render.
+
+    Parameters
+    ----------
+    max_bytes
+        The maximum size of the cached HTML, in bytes. When it's exceeded, the least
+        recently used entries are evicted.
+
+    Note
+    ----
+    Only trees of tags, tag lists, strings, and dependencies are cached. Tags which
+    contain other objects (such as instances of Tag subclasses which customize their
+    HTML) are always rendered, but the tags inside of them can be cached.
+
+    Example
+    -------
+    >>> from htmltools import RenderCache, div, set_render_cache
+    >>> cache = RenderCache(max_bytes=16 * 1024 * 1024)
+    >>> set_render_cache(cache)
+    >>> card = lambda: div(div("Title", class_="title"), "Text", class_="card")
+    >>> html = card().freeze(intern=True).get_html_string()
+    >>> html = card().freeze(intern=True).get_html_string()
+    >>> cache.cache_info().hits
+    1
+    """
+
+    __slots__ = ("max_bytes", "_entries", "_bytes", "_hits", "_misses", "_evictions")
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024) -> None:
+        self.max_bytes = max_bytes
+        # Entries are keyed by (structural hash, indent, eol), and ordered from least to
+        # most recently used.
+        self._entries: "OrderedDict[Tuple[bytes, int, str], _RenderCacheEntry]" = (
+            OrderedDict()
+        )
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def cache_info(self) -> RenderCacheInfo:
+        """
+        Return the number of hits, misses, and evictions, and the number of entries and
+        their size in bytes.
+        """
+        return RenderCacheInfo(
+            self._hits,
+            self._misses,
+            self._evictions,
+            len(self._entries),
+            self._bytes,
+            self.max_bytes,
+        )
+
+    def clear(self) -> None:
+        """
+        Remove all of the entries, and reset the statistics.
+        """
+        self._entries.clear()
+        self._bytes = self._hits = self._misses = self._evictions = 0
+
+    def __repr__(self) -> str:
+        return f"<RenderCache {self.cache_info()}>"
+
+    # The cache isn't locked. The operations on its entries are atomic, and if threads
+    # race to update it, the worst that can happen is that the statistics are off.
+    def _get(self, key: Tuple[bytes, int, str]) -> Optional[_RenderCacheEntry]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self._misses += 1
+            return None
+        try:
+            self._entries.move_to_end(key)
+        except KeyError:
+            # Another thread evicted it.
+            pass
+        self._hits += 1
+        return entry
+
+    def _put(
+        self,
+        key: Tuple[bytes, int, str],
+        html: str,
+        deps: Optional[List["HTMLDependency"]],
+    ) -> None:
+        size = sys.getsizeof(html)
+        if size > self.max_bytes:
+            return
+        entries = self._entries
+        old = entries.pop(key, None)
+        if old is not None:
+            self._bytes -= old[2]
+        entries[key] = (html, deps, size)
+        self._bytes += size
+        while self._bytes > self.max_bytes:
+            try:
+                _, (_, _, old_size) = entries.popitem(last=False)
+            except KeyError:
+                break
+            self._bytes -= old_size
+            self._evictions += 1
+
+
+# The render cache that's used by default (see set_render_cache()), and the one that's
+# used in the current context instead, if one has been set (see use_render_cache()).
+_render_cache: Optional[RenderCache] = None
+_NO_SCOPED_RENDER_CACHE: Any = object()
+_scoped_render_cache: "ContextVar[Optional[RenderCache]]" = ContextVar(
+    "htmltools_render_cache", default=_NO_SCOPED_RENDER_CACHE
+)
+
+
+def set_render_cache(cache: Optional[RenderCache]) -> None:
+    """
+    Set the render cache that's used by default, in every thread.
+
+    Parameters
+    ----------
+    cache
+        The cache to use (see :class:`RenderCache`), or ``None`` to stop using one.
+    """
+    global _render_cache
+    _render_cache = cache
+
+
+@contextmanager
+def use_render_cache(cache: Optional[RenderCache]) -> Iterator[Optional[RenderCache]]:
+    """
+    Use a render cache (or no cache) in a ``with`` block.
+
+    This overrides the cache set with :func:`set_render_cache` in the current thread
+    (or asyncio task) only, until the end of the block.
+
+    Parameters
+    ----------
+    cache
+        The cache to use (see :class:`RenderCache`), or ``None`` to render without a
+        cache.
+
+    Example
+    -------
+    >>> from htmltools import RenderCache, use_render_cache
+    >>> with use_render_cache(RenderCache()) as cache:
+    ...     html = page.get_html_string()
+    >>> with use_render_cache(None):
+    ...     html = page.get_html_string()
+    """
+    token = _scoped_render_cache.set(cache)
+    try:
+        yield cache
+    finally:
+        _scoped_render_cache.reset(token)
+
+
+def _current_render_cache() -> Optional[RenderCache]:
+    cache = _scoped_render_cache.get()
+    return _render_cache if cache is _NO_SCOPED_RENDER_CACHE else cache
+
+
+# The key that a frozen tag's HTML is cached with, or None if it isn't cached. Only tags
+# whose structural hash is already known are looked up, since computing it takes about
+# as long as rendering the tag. Tags whose only child is a string are written on one
+# line, which is faster than looking them up.
+def _render_cache_key(
+    x: "FrozenTag", indent: int, eol: str
+) -> Optional[Tuple[bytes, int, str]]:
+    digest = x._hash_cache
+    if not digest:
+        return None
+    children = x._children
+    if len(children) < 2 and (not children or children[0].__class__ is str):
+        return None
+    return (digest, indent, eol)
+
+
+def _cached_dependencies(
+    x: "FrozenTag", entry: _RenderCacheEntry
+) -> List["HTMLDependency"]:
+    deps = entry[1]
+    # If the tag was cached by get_html_string(), its dependencies weren't collected.
+    return x._children._dependencies() if deps is None else deps
+
+
+# Add the HTML (and dependencies) of a tag which was just written to the cache.
+# `cached` is (key, index of the tag's first chunk in `out`, index of its first
+# dependency in `deps`).
+def _cache_rendered(
+    cache: RenderCache,
+    out: List[str],
+    deps: Optional[List["HTMLDependency"]],
+    cached: Tuple[Tuple[bytes, int, str], int, int],
+) -> None:
+    key, start, deps_start = cached
+    html = "".join(out[start:])
+    cache._put(key, html, None if deps is None else deps[deps_start:])
+
+
 # =============================================================================
 # HTMLDocument class
 # =============================================================================
@@ -711,7 +2054,14 @@ class HTMLDocument:
         self._content.append(*args)
 
     def render(
-        self, *, lib_prefix: Optional[str] = "lib", include_version: bool = True
+        self,
+        *,
+        lib_prefix: Optional[str] = "lib",
+        include_version: bool = True,
+        content_hash: Optional[Literal["path", "query"]] = None,
+        inline_deps: bool = False,
+        bundle: bool = False,
+        preload: bool = False,
     ) -> RenderedHTML:
         """
         Render the document.
@@ -722,15 +2072,90 @@ class HTMLDocument:
             A prefix to add to relative paths to dependency files.
         include_version
             Whether to include the version number in the dependency's folder name.
+        content_hash
+            Whether to include a hash of the contents of dependency files in their URLs,
+            so that they can be cached indefinitely by browsers. With ``"path"``, a hash
+            of all of a dependency's files is added to its folder name, and with
+            ``"query"``, a hash of each file is added to its URL as ``?v=<hash>``.
+        inline_deps
+            Whether to include the contents of dependencies' scripts and stylesheets in
+            the document (in ``<script>`` and ``<style>`` tags), instead of referring to
+            their files. Files which stylesheets refer to with relative ``url()``s, such
+            as fonts and images, are included as ``data:`` URIs.
+        bundle
+            Whether to combine the scripts of dependencies into one file, and their
+            stylesheets into another, so that the page makes fewer requests. The bundle
+            is another dependency of the document, named after a hash of its contents,
+            and is written to a directory which can be set with
+            :func:`set_bundle_dir`. Scripts and stylesheets with attributes other than
+            ``src`` and ``href`` (e.g. ``defer`` or ``media``) aren't bundled, and the
+            dependencies between them are bundled separately, so that the scripts run
+            in the same order.
+        preload
+            Whether to add ``<link rel="preload">`` tags (or ``rel="modulepreload"``,
+            for module scripts) for the scripts and stylesheets of dependencies before
+            them, ordered by their ``fetchpriority`` (``"high"``, then ``"auto"`` or none,
+            then ``"low"``). The same links are returned in ``link_header``, formatted
+            as the value of an HTTP ``Link`` header, which a server can send (e.g. with a
+            103 Early Hints response) before the page is rendered.
         """
 
-        html_ = self._gen_html_tag_tree(lib_prefix, include_version=include_version)
-        rendered = html_.render()
-        rendered["html"] = "<!DOCTYPE html>\n" + rendered["html"]
+        chunks: List[str] = ["<!DOCTYPE html>\n"]
+        deps: List[HTMLDependency] = []
+        slot = _HeadContentSlot(chunks)
+        html_ = self._gen_html_tag_tree(slot)
+
+        # Tagify, collect dependencies, and write HTML in a single pass. The content
+        # hoisted from the dependencies can only be written once all the dependencies
+        # are known, so a placeholder chunk is left for it at the end of the <head>.
+        _write_taglist_html([html_], chunks.append, 0, "\n", tagify="deep", deps=deps)
+
+        preload_links: Optional[List[Dict[str, str]]] = [] if preload else None
+        head_content = HTMLDocument._hoist_head_content(
+            _resolve_dependencies(deps),
+            lib_prefix,
+            include_version,
+            content_hash,
+            inline_deps,
+            bundle,
+            preload_links,
+        )
+        head_chunks: List[str] = []
+        head_deps: List[HTMLDependency] = []
+        _write_taglist_html(
+            head_content,
+            head_chunks.append,
+            slot.indent,
+            "\n",
+            tagify=True,
+            deps=head_deps,
+        )
+        if head_chunks:
+            chunks[slot.index] = "\n" + "".join(head_chunks)
+
+        # Dependencies are ordered as they appear in the final document, where the
+        # hoisted content is at the end of the <head>.
+        deps[slot.deps_index : slot.deps_index] = head_deps
+        rendered: RenderedHTML = {
+            "dependencies": [copy(d) for d in _resolve_dependencies(deps)],
+            "html": "".join(chunks),
+        }
+        if preload_links is not None:
+            rendered["link_header"] = _link_header(preload_links)
         return rendered
 
     def save_html(
-        self, file: str, libdir: Optional[str] = "lib", include_version: bool = True
+        self,
+        file: str,
+        libdir: Optional[str] = "lib",
+        include_version: bool = True,
+        *,
+        content_hash: Optional[Literal["path", "query"]] = None,
+        self_contained: bool = False,
+        bundle: bool = False,
+        compare: Optional[Literal["mtime", "hash"]] = None,
+        method: Literal["copy", "hardlink", "reflink"] = "copy",
+        workers: int = 1,
     ) -> str:
         """
         Save the document to a HTML file.
@@ -743,93 +2168,149 @@ class HTMLDocument:
             The directory to save the dependencies to (relative to the file's directory).
         include_version
             Whether to include the version number in the dependency folder name.
+        content_hash
+            Whether to include a hash of the contents of dependency files in their URLs.
+            See :meth:`HTMLDocument.render`.
+        self_contained
+            Whether to include the contents of dependencies' scripts and stylesheets in
+            the HTML file, instead of copying them to ``libdir``. See the
+            ``inline_deps`` argument of :meth:`HTMLDocument.render`.
+        bundle
+            Whether to combine the scripts and stylesheets of dependencies into one file
+            each. See :meth:`HTMLDocument.render`.
+        compare
+            How to tell whether existing copies of dependency files are up to date. If
+            ``"mtime"`` or ``"hash"``, only the files which have changed are copied. See
+            :meth:`HTMLDependency.copy_to`.
+        method
+            How to copy dependency files: ``"copy"``, ``"hardlink"``, or ``"reflink"``.
+            See :meth:`HTMLDependency.copy_to`.
+        workers
+            The number of threads to copy dependency files with. The files of all the
+            dependencies are copied with one pool of threads.
         """
 
+        from pathlib import Path
+
         # Directory where dependencies are copied to.
         destdir = str(Path(file).resolve().parent)
         if libdir:
             destdir = os.path.join(destdir, libdir)
 
-        rendered = self.render(lib_prefix=libdir, include_version=include_version)
-        for dep in rendered["dependencies"]:
-            dep.copy_to(destdir, include_version=include_version)
+        rendered = self.render(
+            lib_prefix=libdir,
+            include_version=include_version,
+            content_hash=content_hash,
+            inline_deps=self_contained,
+            bundle=bundle,
+        )
+        if not self_contained:
+            self._copy_dependencies(
+                rendered["dependencies"],
+                destdir,
+                include_version=include_version,
+                content_hash=content_hash,
+                compare=compare,
+                method=method,
+                workers=workers,
+            )
 
         with open(file, "w") as f:
             f.write(rendered["html"])
         return file
 
-    # Take the stored content, and generate an <html> tag which contains the correct
-    # <head> and <body> content. HTMLDependency items will be extracted out of the body
-    # and inserted into the <head>.
-    # - lib_prefix: A directoy prefix to add to <script src="[lib_prefix]/script.js">
-    #   and <link rel="[lib_prefix]/style.css"> tags.
-    def _gen_html_tag_tree(
-        self, lib_prefix: Optional[str], include_version: bool
-    ) -> Tag:
+    # The files of all the dependencies are copied with the same thread pool, except for
+    # dependencies with their own copy_to() method.
+    @staticmethod
+    def _copy_dependencies(
+        deps: List["HTMLDependency"],
+        path: str,
+        *,
+        include_version: bool,
+        content_hash: Optional[str],
+        compare: Optional[str],
+        method: str,
+        workers: int,
+    ) -> None:
+        default_deps: List[HTMLDependency] = []
+        for dep in deps:
+            if type(dep).copy_to is HTMLDependency.copy_to:
+                default_deps.append(dep)
+            else:
+                dep.copy_to(path, include_version=include_version)
+        _copy_dependencies(
+            default_deps,
+            path,
+            include_version=include_version,
+            content_hash=content_hash,
+            compare=compare,
+            method=method,
+            workers=workers,
+        )
+
+    # Take the stored content, and generate an <html> tag which contains a <head> and
+    # <body>. The <head> starts with <meta charset="utf-8">, and ends with `slot`, which
+    # marks where the content from HTMLDependency items will be inserted when rendering.
+    # Note that the tree is not tagified, and the user's objects are not modified.
+    def _gen_html_tag_tree(self, slot: "_HeadContentSlot") -> Tag:
         content: TagList = self._content
         html: Tag
-        body: Tag
-
-        if (
-            len(content) == 1
-            and isinstance(content[0], Tag)
-            and cast(Tag, content[0]).name == "html"
-        ):
-            html = cast(Tag, content[0])
-            html.attrs.update(**self._html_attr_args)
-            html = html.tagify()
-            html = HTMLDocument._hoist_head_content(html, lib_prefix, include_version)
-            return html
 
         if (
             len(content) == 1
             and isinstance(content[0], Tag)
-            and cast(Tag, content[0]).name == "body"
-        ):
-            body = cast(Tag, content[0])
-        else:
-            body = Tag("body", content)
-
-        body = body.tagify()
-
-        html = Tag("html", Tag("head"), body, **self._html_attr_args)
-        html = HTMLDocument._hoist_head_content(html, lib_prefix, include_version)
-        return html
-
-    # Given an <html> tag object, copies the top node, then extracts dependencies from
-    # the tree, and inserts the content from those dependencies into the <head>, such as
-    # <link> and <script> tags.
-    @staticmethod
-    def _hoist_head_content(
-        x: Tag, lib_prefix: Optional[str], include_version: bool
-    ) -> Tag:
-        if x.name != "html":
-            raise ValueError(f"Expected <html> tag, got <{x.name}>.")
-
-        res = copy(x)
+            and cast(Tag, content[0]).name == "html"
+        ):
+            html = _mutable_copy(cast(Tag, content[0]))
+            html.attrs.update(**self._html_attr_args)
+        else:
+            if (
+                len(content) == 1
+                and isinstance(content[0], Tag)
+                and cast(Tag, content[0]).name == "body"
+            ):
+                body = cast(Tag, content[0])
+            else:
+                body = Tag("body", content)
+            html = Tag("html", Tag("head"), body, **self._html_attr_args)
 
         # <head> needs to be a direct child of <html>, but not necessarily the first
         # child (it would be suprising if you weren't able to, for example, have a
         # HTMLDependency() as the first child of <html>).
         head_index: Optional[int] = None
-        for i, child in enumerate(res.children):
+        for i, child in enumerate(html.children):
             if isinstance(child, Tag) and child.name == "head":
                 head_index = i
                 break
 
         if head_index is None:
-            res.insert(0, Tag("head"))
+            html.children.insert(0, Tag("head"))
             head_index = 0
 
-        res.children[head_index] = copy(res.children[head_index])
-        head = cast(Tag, res.children[head_index])
+        head = _mutable_copy(cast(Tag, html.children[head_index]))
+        html.children[head_index] = head
         # Put <meta charset="utf-8"> at beginning of head, and other hoisted tags at the
         # end. This matters only if the <head> tag starts out with some children.
-        head.insert(0, Tag("meta", charset="utf-8"))
+        head.children.insert(0, Tag("meta", charset="utf-8"))
+        head.children.append(slot)
+        return html
+
+    # Given the (resolved) dependencies of a document, returns the content to insert in
+    # the <head>, such as <link> and <script> tags.
+    @staticmethod
+    def _hoist_head_content(
+        deps: List["HTMLDependency"],
+        lib_prefix: Optional[str],
+        include_version: bool,
+        content_hash: Optional[Literal["path", "query"]] = None,
+        inline: bool = False,
+        bundle: bool = False,
+        preload: Optional[List[Dict[str, str]]] = None,
+    ) -> TagList:
+        head = TagList()
 
         # Add some metadata about the dependencies so that shiny.js' renderDependency
         # logic knows not to re-render them.
-        deps = x.get_dependencies()
         if len(deps) > 0:
             head.append(
                 Tag(
@@ -839,13 +2320,82 @@ class HTMLDocument:
                 )
             )
 
-        head.extend(
-            [
-                d.as_html_tags(lib_prefix=lib_prefix, include_version=include_version)
-                for d in deps
+        # The scripts and stylesheets of each run of consecutive dependencies which can
+        # be bundled are replaced by a bundle, where the first of them would have been.
+        # Dependencies which can't be bundled stay between the bundles, so the scripts
+        # still run in the same order.
+        bundled = [False] * len(deps)
+        bundle_deps: Dict[int, HTMLDependency] = {}
+        if bundle and not inline:
+            for start, end in _bundleable_runs(deps):
+                bundled[start:end] = [True] * (end - start)
+                bundle_deps[start] = _bundle_dependencies(
+                    deps[start:end], include_version, content_hash
+                )
+
+        # Preload links for the scripts and stylesheets which are referred to by URL go
+        # before all of them (and are added to `preload`, for a Link header).
+        if preload is not None and not inline:
+            linked = [
+                bundle_deps.get(i, d)
+                for i, (d, b) in enumerate(zip(deps, bundled))
+                if not b or i in bundle_deps
             ]
-        )
-        return res
+            for d in linked:
+                preload.extend(
+                    d._preload_links(
+                        lib_prefix=lib_prefix,
+                        include_version=include_version,
+                        content_hash=content_hash,
+                    )
+                )
+            preload[:] = _sort_preload_links(preload)
+            head.extend([FrozenTag("link", **x) for x in preload])
+
+        for i, (d, b) in enumerate(zip(deps, bundled)):
+            if not b:
+                head.append(
+                    d.as_html_tags(
+                        lib_prefix=lib_prefix,
+                        include_version=include_version,
+                        content_hash=content_hash,
+                        inline=inline,
+                    )
+                )
+                continue
+            bundle_dep = bundle_deps.get(i)
+            if bundle_dep is not None:
+                # The bundle is a dependency of the document too, so it gets saved.
+                head.append(bundle_dep)
+                head.append(
+                    bundle_dep.as_html_tags(
+                        lib_prefix=lib_prefix,
+                        include_version=include_version,
+                        content_hash=content_hash,
+                    )
+                )
+            head.extend([Tag("meta", **m) for m in d.meta])
+            head.append(d.head)
+        return head
+
+
+# Marks where the content from HTMLDependency objects goes in the <head> of a rendered
+# HTMLDocument. When the HTML writer reaches it, it leaves an empty chunk in the output
+# (to be filled in later), and records how many dependencies had been found so far.
+class _HeadContentSlot(MetadataNode):
+    __slots__ = ("chunks", "index", "deps_index", "indent")
+
+    def __init__(self, chunks: List[str]) -> None:
+        self.chunks = chunks
+        self.index = -1
+        self.deps_index = 0
+        self.indent = 0
+
+    def mark(self, deps: List["HTMLDependency"], indent: int) -> None:
+        self.index = len(self.chunks)
+        self.chunks.append("")
+        self.deps_index = len(deps)
+        self.indent = indent
 
 
 # =============================================================================
@@ -1018,19 +2568,36 @@ class HTMLDependency(MetadataNode):
     >>> x.render()
     """
 
+    __slots__ = (
+        "name",
+        "version",
+        "source",
+        "script",
+        "stylesheet",
+        "meta",
+        "all_files",
+        "head",
+        "_output_cache",
+    )
+
     name: str
-    version: Version
+    version: "Version"
     source: Optional[HTMLDependencySource]
     script: List[ScriptItem]
     stylesheet: List[StylesheetItem]
     meta: List[MetaItem]
     all_files: bool
     head: Optional[TagList]
+    # The output of as_dict() and as_html_tags(), keyed by method and arguments. Each
+    # value is stored along with the _cache_key() it was computed for.
+    _output_cache: Dict[
+        Tuple[str, Optional[str], bool, Optional[str]], Tuple[Tuple[object, ...], Any]
+    ]
 
     def __init__(
         self,
         name: str,
-        version: Union[str, Version],
+        version: Union[str, "Version"],
         *,
         source: Optional[HTMLDependencySource] = None,
         script: Union[ScriptItem, List[ScriptItem]] = [],
@@ -1039,6 +2606,8 @@ class HTMLDependency(MetadataNode):
         meta: Union[MetaItem, List[MetaItem]] = [],
         head: TagChildArg = None,
     ) -> None:
+        from packaging.version import Version
+
         self.name = name
         self.version = Version(version) if isinstance(version, str) else version
         self.source = source
@@ -1073,51 +2642,220 @@ class HTMLDependency(MetadataNode):
         else:
             self.head = TagList(head)
 
+        self._output_cache = {}
+
     def source_path_map(
-        self, *, lib_prefix: Optional[str] = "lib", include_version: bool = True
+        self,
+        *,
+        lib_prefix: Optional[str] = "lib",
+        include_version: bool = True,
+        content_hash: Optional[Literal["path", "query"]] = None,
     ) -> SourcePathMapping:
         """
         Returns a dict of the absolute 'source' filepath and the 'href' path it will
         point to in the HTML (given the lib_prefix).
+
+        If ``content_hash`` is ``"path"``, a hash of the dependency's files is included
+        in the 'href' path.
         """
 
+        _validate_content_hash(content_hash)
+
         src = self.source
         if src is None:
             return {"source": "", "href": ""}
 
         pkg = src.get("package", None)
         if pkg is None:
-            source = os.path.realpath(src["subdir"])
+            source = _realpath(src["subdir"])
         else:
             source = os.path.join(_package_dir(pkg), src["subdir"])
 
         href = self.name
         if include_version:
             href += "-" + str(self.version)
+        if content_hash == "path":
+            files = sorted(self._source_files(source))
+            href += "-" + _combined_hash(files, self._hash_files(source, files))
         href = os.path.join(lib_prefix, href) if lib_prefix else href
         return {"source": source, "href": href}
 
+    # The dependency's files, as paths relative to the `source` directory.
+    def _source_files(self, source: str) -> List[str]:
+        from pathlib import Path
+
+        if self.all_files:
+            files = [
+                os.path.relpath(x, source)
+                for x in Path(source).rglob("*")
+                if x.is_file()
+            ]
+            files.sort()
+            return files
+        return [
+            *[s["src"] for s in self.script],
+            *[s["href"] for s in self.stylesheet],
+        ]
+
+    # The content hashes of `files` (relative to the `source` directory).
+    def _hash_files(self, source: str, files: List[str]) -> List[str]:
+        try:
+            return _file_hashes_for([os.path.join(source, f) for f in files])
+        except FileNotFoundError as e:
+            raise Exception(
+                f"Failed to hash HTML dependency {self.name}-{str(self.version)} "
+                + f"because {e.filename} doesn't exist."
+            )
+
     def as_html_tags(
-        self, *, lib_prefix: Optional[str] = "lib", include_version: bool = True
+        self,
+        *,
+        lib_prefix: Optional[str] = "lib",
+        include_version: bool = True,
+        content_hash: Optional[Literal["path", "query"]] = None,
+        inline: bool = False,
     ) -> TagList:
         """
         Render the dependency as a ``TagList()``.
+
+        See :meth:`HTMLDocument.render` for the meaning of ``content_hash``. If
+        ``inline`` is ``True``, the contents of the dependency's scripts and
+        stylesheets are included in ``<script>`` and ``<style>`` tags, instead of
+        being referred to by URL.
         """
-        d = self.as_dict(lib_prefix=lib_prefix, include_version=include_version)
-        metas = [Tag("meta", **m) for m in self.meta]
-        links = [Tag("link", **s) for s in d["stylesheet"]]
-        scripts = [Tag("script", **s) for s in d["script"]]
-        return TagList(*metas, *links, *scripts, self.head)
+        if inline:
+            return self._inline_html_tags()
+
+        # The <meta>, <link>, and <script> tags are frozen, so they're only rendered once.
+        key = ("as_html_tags", lib_prefix, include_version, content_hash)
+        tags = self._cached_output(key)
+        if tags is None:
+            d = self.as_dict(
+                lib_prefix=lib_prefix,
+                include_version=include_version,
+                content_hash=content_hash,
+            )
+            tags = self._cache_output(
+                key,
+                [
+                    *[FrozenTag("meta", **m) for m in self.meta],
+                    *[FrozenTag("link", **s) for s in d["stylesheet"]],
+                    *[FrozenTag("script", **s) for s in d["script"]],
+                ],
+            )
+        return TagList(*tags, self.head)
+
+    def _inline_html_tags(self) -> TagList:
+        source = self.source_path_map(lib_prefix=None)["source"]
+        if source == "":
+            return self.as_html_tags()
+
+        def read(file: str) -> str:
+            try:
+                return _read_file(os.path.join(source, file)).decode("utf-8", "replace")
+            except FileNotFoundError as e:
+                raise Exception(
+                    f"Failed to inline HTML dependency {self.name}-{str(self.version)} "
+                    + f"because {e.filename} doesn't exist."
+                )
+
+        styles = [
+            Tag(
+                "style",
+                HTML(_inline_css(read(s["href"]), os.path.join(source, s["href"]))),
+                **{k: v for k, v in s.items() if k not in _LINK_ONLY_ATTRS},
+            )
+            for s in self.stylesheet
+        ]
+        scripts = [
+            Tag(
+                "script",
+                HTML(_inline_script(read(s["src"]))),
+                **{k: v for k, v in s.items() if k not in _EXTERNAL_SCRIPT_ATTRS},
+            )
+            for s in self.script
+        ]
+        metas = [FrozenTag("meta", **m) for m in self.meta]
+        return TagList(*metas, *styles, *scripts, self.head)
 
     def as_dict(
-        self, *, lib_prefix: Optional[str] = "lib", include_version: bool = True
+        self,
+        *,
+        lib_prefix: Optional[str] = "lib",
+        include_version: bool = True,
+        content_hash: Optional[Literal["path", "query"]] = None,
     ) -> Dict[str, Any]:
         """
         Returns a dict of the dependency's attributes.
+
+        See :meth:`HTMLDocument.render` for the meaning of ``content_hash``.
         """
 
+        key = ("as_dict", lib_prefix, include_version, content_hash)
+        d = self._cached_output(key)
+        if d is None:
+            d = self._cache_output(
+                key,
+                self._as_dict(
+                    lib_prefix=lib_prefix,
+                    include_version=include_version,
+                    content_hash=content_hash,
+                ),
+            )
+        # Return copies of the lists of dicts, so the cached value can't be modified.
+        return {
+            **d,
+            "script": [dict(s) for s in d["script"]],
+            "stylesheet": [dict(s) for s in d["stylesheet"]],
+        }
+
+    # The attributes of <link rel="preload"> (or rel="modulepreload") tags for the
+    # dependency's scripts and stylesheets, in the order they appear in the document.
+    def _preload_links(
+        self,
+        *,
+        lib_prefix: Optional[str],
+        include_version: bool,
+        content_hash: Optional[Literal["path", "query"]],
+    ) -> List[Dict[str, str]]:
+        key = ("preload_links", lib_prefix, include_version, content_hash)
+        links = self._cached_output(key)
+        if links is None:
+            d = self.as_dict(
+                lib_prefix=lib_prefix,
+                include_version=include_version,
+                content_hash=content_hash,
+            )
+            links = []
+            for s in d["stylesheet"]:
+                if s["rel"] == "stylesheet" and "disabled" not in s:
+                    link = {"href": s["href"], "rel": "preload", "as": "style"}
+                    links.append(_preload_attrs(link, s))
+            for s in d["script"]:
+                script_type = s.get("type", "text/javascript")
+                if script_type == "module":
+                    link = {"href": s["src"], "rel": "modulepreload"}
+                elif script_type in ("text/javascript", "application/javascript"):
+                    link = {"href": s["src"], "rel": "preload", "as": "script"}
+                else:
+                    continue
+                links.append(_preload_attrs(link, s))
+            links = self._cache_output(key, links)
+        return links
+
+    def _as_dict(
+        self,
+        *,
+        lib_prefix: Optional[str],
+        include_version: bool,
+        content_hash: Optional[str],
+    ) -> Dict[str, Any]:
+        import urllib.parse
+
         paths = self.source_path_map(
-            lib_prefix=lib_prefix, include_version=include_version
+            lib_prefix=lib_prefix,
+            include_version=include_version,
+            content_hash=content_hash,  # type: ignore
         )
 
         stylesheets = deepcopy(self.stylesheet)
@@ -1135,6 +2873,15 @@ class HTMLDependency(MetadataNode):
             src = urllib.parse.quote(s["src"])
             s.update({"src": os.path.join(paths["href"], src)})
 
+        if content_hash == "query" and paths["source"]:
+            files = [s["href"] for s in self.stylesheet]
+            files += [s["src"] for s in self.script]
+            hashes = self._hash_files(paths["source"], files)
+            for s, h in zip(stylesheets, hashes):
+                s["href"] += "?v=" + h
+            for s, h in zip(scripts, hashes[len(stylesheets) :]):
+                s["src"] += "?v=" + h
+
         head: Optional[str]
         if self.head is None:
             head = None
@@ -1150,46 +2897,130 @@ class HTMLDependency(MetadataNode):
             "head": head,
         }
 
-    def copy_to(self, path: str, include_version: bool = True) -> None:
+    # The output of as_dict() and as_html_tags() is cached, and the cached value is used
+    # for as long as the dependency's fields are unchanged: this covers assigning new
+    # values to them, and modifying their lists and dicts in place. Changes made in
+    # place to the tags in `head` aren't detected, though. Output with content hashes is
+    # also keyed by the modification times and sizes of the hashed files, so that it's
+    # computed again when they change.
+    def _cache_key(self, content_hash: Optional[str]) -> Tuple[object, ...]:
+        key = (
+            _path_caches_generation(),
+            self.name,
+            self.version,
+            None if self.source is None else tuple(self.source.items()),
+            tuple(tuple(s.items()) for s in self.script),
+            tuple(tuple(s.items()) for s in self.stylesheet),
+            tuple(tuple(m.items()) for m in self.meta),
+            None if self.head is None else tuple(self.head),
+        )
+        if content_hash is not None:
+            key += (self._hashed_files_stats(content_hash),)
+        return key
+
+    # The names, modification times, and sizes of the files which are hashed with
+    # `content_hash`. Missing files have no stats (hashing them raises an error).
+    def _hashed_files_stats(self, content_hash: str) -> Tuple[object, ...]:
+        source = self.source_path_map(lib_prefix=None)["source"]
+        if not source:
+            return ()
+        if content_hash == "path":
+            files = self._source_files(source)
+        else:
+            files = [s["href"] for s in self.stylesheet]
+            files += [s["src"] for s in self.script]
+        stats: List[object] = []
+        for file in files:
+            try:
+                st = os.stat(os.path.join(source, file))
+            except OSError:
+                stats.append((file, None))
+                continue
+            stats.append((file, st.st_mtime_ns, st.st_size))
+        return tuple(stats)
+
+    def _cached_output(
+        self, key: Tuple[str, Optional[str], bool, Optional[str]]
+    ) -> Any:
+        cached = self._output_cache.get(key)
+        if cached is None or cached[0] != self._cache_key(key[3]):
+            return None
+        return cached[1]
+
+    def _cache_output(
+        self, key: Tuple[str, Optional[str], bool, Optional[str]], value: Any
+    ) -> Any:
+        self._output_cache[key] = (self._cache_key(key[3]), value)
+        return value
+
+    def copy_to(
+        self,
+        path: str,
+        include_version: bool = True,
+        *,
+        content_hash: Optional[Literal["path", "query"]] = None,
+        compare: Optional[Literal["mtime", "hash"]] = None,
+        method: Literal["copy", "hardlink", "reflink"] = "copy",
+        workers: int = 1,
+    ) -> None:
         """
         Copy the dependency's files to the given path.
-        """
 
-        paths = self.source_path_map(lib_prefix=None, include_version=include_version)
-        if paths["source"] == "":
-            return None
+        Parameters
+        ----------
+        path
+            The directory to copy the dependency's directory to.
+        include_version
+            Whether to include the version number in the dependency's directory name.
+        content_hash
+            If ``"path"``, a hash of the dependency's files is included in the
+            directory's name. See :meth:`HTMLDocument.render`.
+        compare
+            How to tell whether the files in an existing copy of the dependency's
+            directory are up to date. If ``None`` (the default), the directory is deleted
+            and all the files are copied. With ``"mtime"``, files with the same size and
+            modification time as the source file are up to date, and with ``"hash"``,
+            files with the same contents are. Files which are up to date aren't copied
+            again, and files which aren't dependency files are deleted.
+        method
+            How to copy files. ``"hardlink"`` creates hard links to the source files, and
+            ``"reflink"`` creates copy-on-write clones of them (on filesystems which
+            support it, such as Btrfs and XFS). If that isn't possible for a file, it's
+            copied instead.
+        workers
+            The number of threads to check and copy files with. Errors are raised in the
+            same order regardless of this: the first file which failed is reported.
+        """
 
-        # Collect all the source files
-        if self.all_files:
-            src_files = list(Path(paths["source"]).glob("*"))
-            src_files = [str(x) for x in src_files]
-        else:
-            src_files = [
-                *[s["src"] for s in self.script],
-                *[s["href"] for s in self.stylesheet],
-            ]
+        _copy_dependencies(
+            [self],
+            path,
+            include_version=include_version,
+            content_hash=content_hash,
+            compare=compare,
+            method=method,
+            workers=workers,
+        )
 
-        # Verify they all exist
-        for f in src_files:
-            src_file = os.path.join(paths["source"], f)
-            if not os.path.isfile(src_file):
-                raise Exception(
-                    f"Failed to copy HTML dependency {self.name}-{str(self.version)} "
-                    + f"because {src_file} doesn't exist."
-                )
+    # Returns the source directory, the files to copy (relative to it), and the target
+    # directory for copying the dependency's files to `path`, or None if the dependency
+    # doesn't have any files.
+    def _copy_plan(
+        self, path: str, include_version: bool, content_hash: Optional[str] = None
+    ) -> Optional["_DependencyCopyPlan"]:
+        from pathlib import Path
 
-        # Set up the target directory.
-        target_dir = Path(os.path.join(path, paths["href"])).resolve()
-        if os.path.exists(target_dir):
-            shutil.rmtree(target_dir)
-        target_dir.mkdir(parents=True, exist_ok=True)
+        paths = self.source_path_map(
+            lib_prefix=None,
+            include_version=include_version,
+            content_hash=content_hash,  # type: ignore
+        )
+        if paths["source"] == "":
+            return None
 
-        # Copy all the files
-        for f in src_files:
-            src_file = os.path.join(paths["source"], f)
-            target_file = os.path.join(target_dir, f)
-            os.makedirs(os.path.dirname(target_file), exist_ok=True)
-            shutil.copy2(src_file, target_file)
+        src_files = self._source_files(paths["source"])
+        target_dir = str(Path(os.path.join(path, paths["href"])).resolve())
+        return _DependencyCopyPlan(self, paths["source"], src_files, target_dir)
 
     def _validate_dicts(self, ld: Iterable[object], req_attr: List[str] = []) -> None:
         for d in ld:
@@ -1218,6 +3049,434 @@ class HTMLDependency(MetadataNode):
         return _equals_impl(self, other)
 
 
+class _DependencyCopyPlan(NamedTuple):
+    dep: HTMLDependency
+    source: str
+    files: List[str]
+    target: str
+
+
+# Copy the files of `deps` to `path`, with a pool of `workers` threads. All the source
+# files are checked before anything is copied. Each step is run for the files of all the
+# dependencies at once, so the work is spread over the threads even if there are only a
+# few files per dependency. When a step fails, the error raised is the one for the first
+# file (in the order of `deps`, and of their files), so it doesn't depend on timing.
+def _copy_dependencies(
+    deps: Iterable[HTMLDependency],
+    path: str,
+    *,
+    include_version: bool = True,
+    content_hash: Optional[str] = None,
+    compare: Optional[str] = None,
+    method: str = "copy",
+    workers: int = 1,
+) -> None:
+    if compare not in (None, "mtime", "hash"):
+        raise ValueError(f"Invalid value for `compare`: {compare!r}")
+    if method not in ("copy", "hardlink", "reflink"):
+        raise ValueError(f"Invalid value for `method`: {method!r}")
+    if workers < 1:
+        raise ValueError(f"`workers` must be at least 1, not {workers!r}")
+
+    plans = [
+        p
+        for p in (d._copy_plan(path, include_version, content_hash) for d in deps)
+        if p
+    ]
+    if not plans:
+        return
+    files = [(p, f) for p in plans for f in p.files]
+
+    pool: Optional["ThreadPoolExecutor"] = None
+    if workers > 1 and len(files) > 1:
+        from concurrent.futures import ThreadPoolExecutor
+
+        pool = ThreadPoolExecutor(min(workers, len(files)))
+    try:
+        # Verify they all exist
+        exists = _map_pool(
+            pool, lambda x: os.path.isfile(os.path.join(x[0].source, x[1])), files
+        )
+        for (p, f), ok in zip(files, exists):
+            if not ok:
+                raise Exception(
+                    f"Failed to copy HTML dependency {p.dep.name}-{str(p.dep.version)} "
+                    + f"because {os.path.join(p.source, f)} doesn't exist."
+                )
+
+        # Set up the target directories.
+        def setup(p: _DependencyCopyPlan) -> None:
+            if compare is None:
+                if os.path.exists(p.target):
+                    import shutil
+
+                    shutil.rmtree(p.target)
+            elif os.path.isdir(p.target):
+                _remove_stale_files(p.target, p.files)
+            os.makedirs(p.target, exist_ok=True)
+
+        _map_pool(pool, setup, plans)
+
+        # Copy all the files
+        def copy_file(x: Tuple[_DependencyCopyPlan, str]) -> None:
+            p, f = x
+            target_file = os.path.join(p.target, f)
+            os.makedirs(os.path.dirname(target_file), exist_ok=True)
+            _sync_file(os.path.join(p.source, f), target_file, compare, method)
+
+        _map_pool(pool, copy_file, files)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+
+# Call `fn` on each of `items` in `pool` (or in this thread, if it's None), and return the
+# results in order. If any of the calls fail, the exception from the first one is raised,
+# once they've all finished.
+def _map_pool(
+    pool: Optional["ThreadPoolExecutor"], fn: Callable[[T], R], items: List[T]
+) -> List[R]:
+    if pool is None:
+        return [fn(x) for x in items]
+    from concurrent.futures import wait
+
+    futures = [pool.submit(fn, x) for x in items]
+    wait(futures)
+    return [f.result() for f in futures]
+
+
+# Attributes of <link> and <script> tags which don't apply to <style> and inline <script>
+# tags.
+_LINK_ONLY_ATTRS = {
+    "href",
+    "rel",
+    "as",
+    "crossorigin",
+    "disabled",
+    "hreflang",
+    "imagesizes",
+    "imagesrcset",
+    "integrity",
+    "prefetch",
+    "referrerpolicy",
+    "sizes",
+    "type",
+}
+_EXTERNAL_SCRIPT_ATTRS = {
+    "src",
+    "async",
+    "crossorigin",
+    "defer",
+    "fetchpriority",
+    "integrity",
+    "referrerpolicy",
+}
+
+# Attributes of scripts and stylesheets which are copied to preload links for them, so
+# that the preloaded response can be used for the script or stylesheet.
+_PRELOAD_ATTRS = (
+    "media",
+    "crossorigin",
+    "integrity",
+    "referrerpolicy",
+    "fetchpriority",
+)
+_FETCHPRIORITY_ORDER = {"high": 0, "auto": 1, "low": 2}
+
+
+def _preload_attrs(link: Dict[str, str], item: Mapping[str, str]) -> Dict[str, str]:
+    link.update({k: item[k] for k in _PRELOAD_ATTRS if k in item})
+    return link
+
+
+# Sort preload links by their fetchpriority (high, then auto, then low), keeping the
+# document order otherwise.
+def _sort_preload_links(links: List[Dict[str, str]]) -> List[Dict[str, str]]:
+    return sorted(
+        links, key=lambda x: _FETCHPRIORITY_ORDER.get(x.get("fetchpriority", ""), 1)
+    )
+
+
+_LINK_TOKEN_RE = re.compile(r"[!#$%&'*+.^_`|~0-9A-Za-z-]+")
+
+
+# Format preload links as the value of an HTTP Link header (RFC 8288).
+def _link_header(links: List[Dict[str, str]]) -> str:
+    def param(k: str, v: str) -> str:
+        if v == "":
+            return k
+        if _LINK_TOKEN_RE.fullmatch(v):
+            return f"{k}={v}"
+        v = v.replace("\\", "\\\\").replace('"', '\\"')
+        return f'{k}="{v}"'
+
+    return ", ".join(
+        "; ".join(
+            [f"<{x['href']}>", *[param(k, v) for k, v in x.items() if k != "href"]]
+        )
+        for x in links
+    )
+
+
+_CSS_URL_RE = re.compile(r"""url\(\s*(['"]?)([^'")]*?)\1\s*\)""")
+
+
+# Replace the relative URLs in the url()s of a stylesheet. `fn` is called with the path
+# part of each URL (unquoted), and returns the new URL, or None to leave it as it is.
+def _replace_css_urls(css: str, fn: Callable[[str], Optional[str]]) -> str:
+    import urllib.parse
+
+    def replace_url(m: "re.Match[str]") -> str:
+        url = m.group(2)
+        parts = urllib.parse.urlsplit(url)
+        if parts.scheme or parts.netloc or url.startswith(("/", "#")) or not url:
+            return m.group(0)
+        new_url = fn(urllib.parse.unquote(parts.path))
+        return m.group(0) if new_url is None else f'url("{new_url}")'
+
+    return _CSS_URL_RE.sub(replace_url, css)
+
+
+# Make the contents of a stylesheet (from the file at `path`) safe to put in a <style>
+# tag, and replace relative url()s of files with data: URIs.
+def _inline_css(css: str, path: str) -> str:
+    dir = os.path.dirname(path)
+
+    def data_uri(url: str) -> Optional[str]:
+        file = os.path.join(dir, url)
+        return _data_uri(file) if os.path.isfile(file) else None
+
+    css = _replace_css_urls(css, data_uri)
+    return re.sub(r"</(style)", r"<\\/\1", css, flags=re.IGNORECASE)
+
+
+# Make the contents of a script safe to put in a <script> tag: "</script" would end the
+# tag, and "<!--" can make the parser treat a later "</script>" as script content.
+def _inline_script(js: str) -> str:
+    js = re.sub(r"</(script)", r"<\\/\1", js, flags=re.IGNORECASE)
+    return js.replace("<!--", "<\\!--")
+
+
+# =============================================================================
+# Bundling dependencies
+# =============================================================================
+
+# Bundles which have been made, keyed by the dependencies in them (and the arguments which
+# affect their contents, including the modification times and sizes of their files). The
+# oldest bundle is dropped when there are too many.
+_bundles: Dict[Tuple[object, ...], HTMLDependency] = {}
+_BUNDLES_MAX = 256
+# The directory which the files of bundles are written to (see set_bundle_dir()). By
+# default, it's a temporary directory which is shared by all processes (so that
+# save_site() can copy the bundles made by its worker processes).
+_bundle_dir: Optional[str] = None
+# The directories of the bundles which this process has written. Those which haven't
+# been used for _BUNDLES_MAX_AGE (in seconds) are deleted when a new bundle is written.
+# Bundles written by other processes are left to them, since they may still be in use.
+_written_bundles: Set[str] = set()
+_BUNDLES_MAX_AGE = 24 * 60 * 60
+
+
+def set_bundle_dir(path: Optional[str]) -> None:
+    """
+    Set the directory which bundles of dependencies are written to.
+
+    When a document is rendered with ``bundle=True``, the scripts and stylesheets of its
+    dependencies are combined into files in a folder of this directory, which are copied
+    from there when the document is saved. Bundles are reused by renders with the same
+    dependencies, including those in other processes which use the same directory.
+
+    Parameters
+    ----------
+    path
+        The directory to write bundles to. It's created if it doesn't exist. If
+        ``None``, a directory named ``htmltools-bundles`` in the system's temporary
+        directory is used (the default).
+    """
+    global _bundle_dir
+    _bundle_dir = path
+
+
+# The directory which bundles are written to.
+def _bundles_root() -> str:
+    if _bundle_dir is not None:
+        return _bundle_dir
+    import tempfile
+
+    return os.path.join(tempfile.gettempdir(), "htmltools-bundles")
+
+
+# Whether a dependency's scripts and stylesheets can be put in a bundle: they have to be
+# plain scripts and stylesheets, since attributes like `defer`, `type="module"`, and
+# `media` can't be applied to a part of a bundle.
+def _is_bundleable(dep: HTMLDependency) -> bool:
+    if dep.source is None or not (dep.script or dep.stylesheet):
+        return False
+    for s in dep.script:
+        if any(k != "src" for k in s):
+            return False
+    for s in dep.stylesheet:
+        if any(k not in ("href", "rel") for k in s) or s.get("rel") != "stylesheet":
+            return False
+    return True
+
+
+# The (start, end) indices of the runs of consecutive dependencies in `deps` which can be
+# bundled. A dependency on its own isn't bundled, since that wouldn't save a request.
+def _bundleable_runs(deps: List[HTMLDependency]) -> List[Tuple[int, int]]:
+    runs: List[Tuple[int, int]] = []
+    start = 0
+    for i, d in enumerate([*deps, None]):
+        if d is not None and _is_bundleable(d):
+            continue
+        if i - start > 1:
+            runs.append((start, i))
+        start = i + 1
+    return runs
+
+
+# Returns an HTMLDependency with one script and one stylesheet, which contain the scripts
+# and stylesheets of `deps` (in order). Bundles are written to a directory named after a
+# hash of their contents, and are reused by renders with the same dependencies.
+def _bundle_dependencies(
+    deps: List[HTMLDependency], include_version: bool, content_hash: Optional[str]
+) -> HTMLDependency:
+    key = (
+        _path_caches_generation(),
+        _bundles_root(),
+        include_version,
+        content_hash,
+        *[
+            (
+                d.name,
+                d.version,
+                d.source_path_map(lib_prefix=None)["source"],
+                tuple(s["src"] for s in d.script),
+                tuple(s["href"] for s in d.stylesheet),
+                # The bundled files, or (with content_hash="path") all of the files
+                # which the folder name that url()s point into is a hash of.
+                d._hashed_files_stats(content_hash or "query"),  # type: ignore
+            )
+            for d in deps
+        ],
+    )
+    bundle = _bundles.get(key)
+    if bundle is not None:
+        try:
+            # Mark the bundle as used, so that it isn't deleted as stale.
+            os.utime(bundle.source_path_map(lib_prefix=None)["source"])
+        except FileNotFoundError:
+            bundle = None
+    if bundle is None:
+        if len(_bundles) >= _BUNDLES_MAX:
+            del _bundles[next(iter(_bundles))]
+        bundle = _bundles[key] = _make_bundle(deps, include_version, content_hash)
+    return bundle
+
+
+def _make_bundle(
+    deps: List[HTMLDependency], include_version: bool, content_hash: Optional[str]
+) -> HTMLDependency:
+    import posixpath
+
+    scripts: List[str] = []
+    stylesheets: List[str] = []
+    for d in deps:
+        source = d.source_path_map(lib_prefix=None)["source"]
+        # The bundle is saved next to the dependency's folder, so relative url()s in its
+        # stylesheets are changed to point into that folder.
+        folder = d.source_path_map(
+            lib_prefix=None,
+            include_version=include_version,
+            content_hash=content_hash,  # type: ignore
+        )["href"].replace(os.sep, "/")
+
+        def read(file: str) -> str:
+            try:
+                return _read_file(os.path.join(source, file)).decode("utf-8", "replace")
+            except FileNotFoundError as e:
+                raise Exception(
+                    f"Failed to bundle HTML dependency {d.name}-{str(d.version)} "
+                    + f"because {e.filename} doesn't exist."
+                )
+
+        for s in d.stylesheet:
+            dir = posixpath.join("..", folder, posixpath.dirname(s["href"]))
+            css = _replace_css_urls(
+                read(s["href"]),
+                lambda url: posixpath.normpath(posixpath.join(dir, url)),
+            )
+            stylesheets.append(f"/* {d.name}-{d.version}: {s['href']} */\n{css}\n")
+        for s in d.script:
+            # The semicolon ends the last statement of a script which doesn't end with
+            # one, so it doesn't run into the next script.
+            js = read(s["src"])
+            scripts.append(f"/* {d.name}-{d.version}: {s['src']} */\n{js}\n;\n")
+
+    js = "".join(scripts)
+    css = "".join(stylesheets)
+    digest = hash_deterministic(js + "\0" + css)[:16]
+    dir = _write_bundle(digest, {"bundle.js": js, "bundle.css": css})
+    return HTMLDependency(
+        "bundle-" + digest,
+        "0.0",
+        source={"subdir": dir},
+        script=[{"src": "bundle.js"}] if js else [],
+        stylesheet=[{"href": "bundle.css"}] if css else [],
+    )
+
+
+# Write the files of a bundle to the bundle directory (unless they've already been
+# written, possibly by another process), and return the directory.
+def _write_bundle(digest: str, files: Dict[str, str]) -> str:
+    import tempfile
+
+    dir = os.path.join(_bundles_root(), digest)
+    try:
+        os.makedirs(dir)
+        _written_bundles.add(dir)
+    except FileExistsError:
+        os.utime(dir)
+    for name, content in files.items():
+        path = os.path.join(dir, name)
+        if content and not os.path.exists(path):
+            fd, tmp = tempfile.mkstemp(dir=dir)
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(content)
+            os.replace(tmp, path)
+    _remove_stale_bundles()
+    return dir
+
+
+# Delete the directories of the bundles written by this process which haven't been used
+# (by any process) for _BUNDLES_MAX_AGE. If one of them is still cached by a process,
+# that process writes it again the next time it's used.
+def _remove_stale_bundles() -> None:
+    import shutil
+    import time
+
+    cutoff = time.time() - _BUNDLES_MAX_AGE
+    for path in list(_written_bundles):
+        try:
+            stale = os.stat(path).st_mtime < cutoff
+        except OSError:
+            stale = True
+        if stale:
+            _written_bundles.discard(path)
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def _validate_content_hash(content_hash: Optional[str]) -> None:
+    if content_hash not in (None, "path", "query"):
+        raise ValueError(f"Invalid value for `content_hash`: {content_hash!r}")
+
+
+# A hash of the names and content hashes of a set of files.
+def _combined_hash(files: List[str], hashes: List[str]) -> str:
+    listing = "".join(f"{f}\0{h}\n" for f, h in zip(files, hashes))
+    return hash_deterministic(listing)[:16]
+
+
 def _resolve_dependencies(deps: List[HTMLDependency]) -> List[HTMLDependency]:
     map: Dict[str, HTMLDependency] = {}
     for dep in deps:
@@ -1230,6 +3489,129 @@ def _resolve_dependencies(deps: List[HTMLDependency]) -> List[HTMLDependency]:
     return list(map.values())
 
 
+class LoadedDependencies:
+    """
+    A set of the HTML dependencies which have already been loaded (e.g., by a browser
+    which is showing a page), for rendering only the dependencies which are new.
+
+    A dependency is loaded if a dependency with the same name, and the same or a newer
+    version, has been added to the set.
+
+    Parameters
+    ----------
+    loaded
+        The dependencies which have been loaded: ``"name[version]"`` strings (the format
+        of the ``application/html-dependencies`` script which :class:`HTMLDocument`
+        adds to the ``<head>``), as an iterable, or as one string with the keys
+        separated by ``;``, or :class:`HTMLDependency` objects.
+
+    Example
+    -------
+    >>> from htmltools import *
+    >>> loaded = LoadedDependencies("jquery[3.6.0];bootstrap[5.1.3]")
+    >>> rendered = div(...).render(loaded=loaded)
+    >>> # Send rendered["html"] and rendered["dependencies"] to the browser, and then:
+    >>> loaded.add(*rendered["dependencies"])
+    """
+
+    __slots__ = ("_versions",)
+
+    def __init__(
+        self, loaded: Union[str, Iterable[Union[str, HTMLDependency]]] = ()
+    ) -> None:
+        # The latest version of each dependency, by name. Versions are kept as strings
+        # until they're compared with a different version, since parsing them is slow,
+        # and most of the time the version of a dependency is the one that was loaded.
+        self._versions: Dict[str, Union[str, "Version"]] = {}
+        if isinstance(loaded, str):
+            loaded = [x for x in loaded.split(";") if x]
+        self.add(*loaded)
+
+    def add(self, *deps: Union[str, HTMLDependency]) -> None:
+        """
+        Add dependencies (or ``"name[version]"`` strings) to the set.
+        """
+        versions = self._versions
+        for dep in deps:
+            if isinstance(dep, HTMLDependency):
+                name, version = dep.name, dep.version
+            else:
+                name, version = _parse_dependency_key(dep)
+            current = versions.get(name)
+            if current is None or _version_greater(version, current):
+                versions[name] = version
+
+    def __contains__(self, dep: object) -> bool:
+        if isinstance(dep, str):
+            name, version = _parse_dependency_key(dep)
+        elif isinstance(dep, HTMLDependency):
+            name, version = dep.name, dep.version
+        else:
+            return False
+        current = self._versions.get(name)
+        if current is None:
+            return False
+        if current is version:
+            return True
+        if not isinstance(current, str) or str(version) != current:
+            return not _version_greater(version, current)
+        # Keep the dependency's Version, so the next check of a dependency with the
+        # same Version object only has to compare identities.
+        if not isinstance(version, str):
+            self._versions[name] = version
+        return True
+
+    def __iter__(self) -> Iterator[str]:
+        return (f"{name}[{version}]" for name, version in self._versions.items())
+
+    def __len__(self) -> int:
+        return len(self._versions)
+
+    def __repr__(self) -> str:
+        return f"LoadedDependencies({';'.join(self)!r})"
+
+    def new_dependencies(self, deps: Iterable[HTMLDependency]) -> List[HTMLDependency]:
+        """
+        Return the dependencies which aren't loaded, or are newer than the versions
+        which are loaded.
+        """
+        return [d for d in deps if d not in self]
+
+
+def _parse_dependency_key(key: str) -> Tuple[str, str]:
+    name, sep, version = key.strip().partition("[")
+    if not sep or not version.endswith("]") or not name:
+        raise ValueError(f"Invalid HTML dependency key {key!r}, expected name[version]")
+    return name, version[:-1]
+
+
+# Whether version `a` is greater than version `b`. Versions which are the same string
+# (or the same Version) are equal, and otherwise they're parsed.
+def _version_greater(a: Union[str, "Version"], b: Union[str, "Version"]) -> bool:
+    if a is b or str(a) == str(b):
+        return False
+    from packaging.version import Version
+
+    a = a if isinstance(a, Version) else Version(a)
+    b = b if isinstance(b, Version) else Version(b)
+    return a > b
+
+
+LoadedDependenciesArg = Union[
+    LoadedDependencies, str, Iterable[Union[str, HTMLDependency]]
+]
+
+
+def _filter_loaded(
+    deps: List[HTMLDependency], loaded: Optional[LoadedDependenciesArg]
+) -> List[HTMLDependency]:
+    if loaded is None:
+        return deps
+    if not isinstance(loaded, LoadedDependencies):
+        loaded = LoadedDependencies(loaded)
+    return loaded.new_dependencies(deps)
+
+
 def head_content(*args: TagChildArg) -> HTMLDependency:
     """
     Place content in the ``<head>`` of the HTML document.
@@ -1279,9 +3661,10 @@ def head_content(*args: TagChildArg) -> HTMLDependency:
 def _tagchildargs_to_tagchilds(x: Iterable[TagChildArg]) -> List[TagChild]:
     result = _flatten(x)
     for i, child in enumerate(result):
-        if isinstance(child, (int, float)):
+        kind = _child_kind(child)
+        if kind == _KIND_NUMBER:
             result[i] = str(child)
-        elif not isinstance(child, (Tagifiable, Tag, MetadataNode, str)):
+        elif kind == _KIND_INVALID:
             raise TypeError(
                 f"Invalid tag child type: {type(child)}. "
                 + "Consider calling str() on this value before treating it as a tag child."
@@ -1317,6 +3700,10 @@ def _tag_show(
         )  # type: ignore
 
     if renderer == "browser":
+        import tempfile
+        import webbrowser
+        from pathlib import Path
+
         tmpdir = tempfile.gettempdir()
         key_ = "viewhtml" + str(hash(str(self)))
         dir = os.path.join(tmpdir, key_)
@@ -1337,10 +3724,308 @@ def _normalize_text(txt: str) -> str:
         return _html_escape(txt, attr=False)
 
 
+# =============================================================================
+# Structural hashing
+# =============================================================================
+# Tags and tag lists have a structural hash: a digest of their content (a tag's name,
+# attributes, and children; a tag list's items), which is the same for any two trees
+# which are equal. Attributes are hashed in order of their names, since their order
+# doesn't matter for equality, but strings and HTML() strings are hashed differently,
+# since they're rendered differently.
+#
+# The hash is a 128-bit blake2b digest of the repr() of a tuple of the content, with the
+# digests of child tags in place of the tags. The RenderCache uses the hash as a key for
+# HTML, so two trees with different content must not have the same hash, which a
+# combination of hash()es (e.g., of strings) doesn't guarantee.
+#
+# The hash of a node is computed from the hashes of its children. Frozen nodes can't be
+# modified, so their hashes are cached on them for good. Modifying a mutable node would
+# change the hashes of all of its ancestors, which it doesn't know, so the hashes of
+# mutable nodes aren't cached, and are computed again every time they're needed.
+#
+# Only Tag, FrozenTag, TagList, str, and HTMLDependency objects are hashed. Trees which
+# contain anything else (e.g., Tagifiable objects, or instances of Tag subclasses) don't
+# have a structural hash.
+
+
+# The cached hash of a tree which doesn't have a structural hash.
+_NO_HASH = b""
+
+
+# The structural hash of `x`, or None if it doesn't have one.
+def _structural_hash(x: Union[Tag, TagList]) -> Optional[bytes]:
+    cls = x.__class__
+    if cls not in _HASHED_NODE_TYPES:
+        return None
+    digest = None
+    if cls is FrozenTag or cls is _FrozenTagList:
+        digest = x._hash_cache  # type: ignore
+    if digest is None:
+        digest = _compute_hash(x)
+    return None if digest == _NO_HASH else digest
+
+
+_HASHED_NODE_TYPES = {Tag, FrozenTag, TagList, _FrozenTagList}
+
+
+# Attributes are hashed in order of their names. Values which aren't plain strings are
+# converted to them (since their repr() can be anything), and marked if they're HTML.
+def _attrs_key(attrs: Mapping[str, str]) -> Tuple[Any, ...]:
+    items: List[Any] = sorted(attrs.items())
+    for i, (name, value) in enumerate(items):
+        if value.__class__ is not str:
+            items[i] = (name, str.__str__(value), isinstance(value, HTML))
+    return tuple(items)
+
+
+# Compute the hash of `x` (and cache the hashes of it and its descendants, if they're
+# frozen). This is done without recursion, so that it works on deep trees: each frame is
+# (node, iterator over its children, key), where `key` is a list of the node's children,
+# with (the hashes of) tags in place of tags, and the node is hashed when its frame is
+# popped. A tag and its list of children are hashed in the same frame. This is the
+# bottleneck of comparing and interning trees, so it's all inlined.
+def _compute_hash(x: Union[Tag, TagList]) -> bytes:
+    from hashlib import blake2b
+
+    # Keys only contain strings, bytes (the digests of children), tuples, booleans, and
+    # None, so that their repr() identifies them.
+    def digest_of(key: Tuple[Any, ...]) -> bytes:
+        data = repr(key).encode("utf-8", "surrogatepass")
+        return blake2b(data, digest_size=16).digest()
+
+    cls = x.__class__
+    is_tag = cls is Tag or cls is FrozenTag
+    stack: List[Tuple[Any, Iterator[Any], List[Any]]] = [
+        (x, iter(x._children if is_tag else x), [])  # type: ignore
+    ]
+    digest = _NO_HASH
+    while stack:
+        node, children, key = stack[-1]
+        for child in children:
+            cls = child.__class__
+            if cls is str:
+                key.append(child)
+            elif cls in _HASHED_NODE_TYPES:
+                frozen = cls is FrozenTag or cls is _FrozenTagList
+                if frozen and child._hash_cache is not None:
+                    key.append(child._hash_cache)
+                    continue
+                is_tag = cls is Tag or cls is FrozenTag
+                if is_tag:
+                    kids = child._children
+                    if not kids or (len(kids) == 1 and kids[0].__class__ is str):
+                        # Tags without child tags (the most common kind) don't need a
+                        # frame of their own.
+                        attrs = child._attrs
+                        attrs_key = _attrs_key(attrs) if attrs else None
+                        digest = digest_of((child.name, attrs_key, tuple(kids)))
+                        if frozen:
+                            object.__setattr__(child, "_hash_cache", digest)
+                        key.append(digest)
+                        continue
+                stack.append((child, iter(child._children if is_tag else child), []))
+                break
+            elif cls is HTML:
+                key.append(("HTML", str.__str__(child)))
+            elif cls is HTMLDependency:
+                dep_digest = _dependency_hash(child)
+                key.append(_NO_HASH if dep_digest is None else ("dep", dep_digest))
+            else:
+                key.append(_NO_HASH)
+        else:
+            stack.pop()
+            cls = node.__class__
+            if _NO_HASH in key:
+                digest = _NO_HASH
+            elif cls is Tag or cls is FrozenTag:
+                attrs = node._attrs
+                attrs_key = _attrs_key(attrs) if attrs else None
+                digest = digest_of((node.name, attrs_key, tuple(key)))
+            else:
+                digest = digest_of((tuple(key),))
+            if cls is FrozenTag or cls is _FrozenTagList:
+                object.__setattr__(node, "_hash_cache", digest)
+            if stack:
+                stack[-1][2].append(digest)
+    return digest
+
+
+# The hash of an HTMLDependency, from the values of its fields (which are compared by
+# HTMLDependency.__eq__). Returns None if a field can't be hashed.
+def _dependency_hash(x: HTMLDependency) -> Optional[bytes]:
+    from hashlib import blake2b
+    from packaging.version import Version
+
+    def canonical(value: Any) -> Any:
+        if isinstance(value, str):
+            return str.__str__(value)
+        if value is None or isinstance(value, (bool, int)):
+            return value
+        if isinstance(value, TagList):
+            digest = _structural_hash(value)
+            if digest is None:
+                raise TypeError("Tag list without a structural hash")
+            return ("TagList", digest)
+        if isinstance(value, dict):
+            return tuple(sorted((k, canonical(v)) for k, v in value.items()))
+        if isinstance(value, (list, tuple)):
+            return tuple(canonical(v) for v in value)
+        if isinstance(value, Version):
+            # Equal versions can be written differently (e.g. 1.0 and 1.0.0).
+            release = list(value.release)
+            while len(release) > 1 and release[-1] == 0:
+                release.pop()
+            return (
+                "Version",
+                value.epoch,
+                tuple(release),
+                value.pre,
+                value.post,
+                value.dev,
+                value.local,
+            )
+        raise TypeError(f"Can't hash {type(value).__name__} objects")
+
+    try:
+        fields = tuple(
+            (key, canonical(getattr(x, key, None)))
+            for key in _instance_attr_names(x)
+            if key not in _EQUALS_IGNORED_ATTRS
+        )
+    except TypeError:
+        return None
+    data = repr(fields).encode("utf-8", "surrogatepass")
+    return blake2b(data, digest_size=16).digest()
+
+
+# Tags and tag lists are compared field by field, unless both of them are frozen (so
+# their structural hashes are known), and their hashes are different. Strings and HTML()
+# strings with the same text aren't equal, since they're rendered differently.
+#
+# Child tags and tag lists are compared with an explicit stack (instead of with ==), so
+# that deep trees can be compared. Each pair is pushed in the order that == would pass
+# them to _tags_equal() (see FrozenTag.__eq__()).
+def _tags_equal(x: Any, y: Any) -> bool:
+    stack = [(x, y)]
+    while stack:
+        x, y = stack.pop()
+        if not isinstance(y, type(x)):
+            return False
+        x_cls = x.__class__
+        if (x_cls is FrozenTag or x_cls is _FrozenTagList) and (
+            y.__class__ is FrozenTag or y.__class__ is _FrozenTagList
+        ):
+            x_hash = _structural_hash(x)
+            if x_hash is not None:
+                y_hash = _structural_hash(y)
+                if y_hash is not None and x_hash != y_hash:
+                    return False
+        if isinstance(x, Tag):
+            if x.name != y.name or not _attrs_equal(x._attrs, y._attrs):
+                return False
+            x_items: List[Any] = x._children
+            y_items: List[Any] = y._children
+        else:
+            x_items, y_items = x, y
+        if len(x_items) != len(y_items):
+            return False
+        for a, b in zip(x_items, y_items):
+            if a is b:
+                continue
+            # Like _attrs_equal(), and the renderer, this treats subclasses of HTML as
+            # HTML.
+            if isinstance(a, HTML) != isinstance(b, HTML):
+                return False
+            if a.__class__ in _HASHED_NODE_TYPES and b.__class__ in _HASHED_NODE_TYPES:
+                if a.__class__ is FrozenTag and b.__class__ is Tag:
+                    stack.append((b, a))
+                else:
+                    stack.append((a, b))
+            elif a != b:
+                return False
+        if x_cls in _HASHED_NODE_TYPES:
+            continue
+        # The fields of subclasses.
+        for key in _instance_attr_names(x):
+            if key in _EQUALS_IGNORED_ATTRS or key in _TAG_FIELDS:
+                continue
+            if getattr(x, key, None) != getattr(y, key, None):
+                return False
+    return True
+
+
+_TAG_FIELDS = {"name", "_attrs", "_children"}
+
+
+def _attrs_equal(x: Mapping[str, str], y: Mapping[str, str]) -> bool:
+    if x != y:
+        return False
+    # Like _attrs_key(), and the renderer, this treats subclasses of HTML as HTML.
+    return all(isinstance(v, HTML) == isinstance(y[k], HTML) for k, v in x.items())
+
+
+# The hash() of a FrozenTag or a frozen tag list. Trees which don't have a structural
+# hash are only equal to trees with the same name (or, for lists, any other list).
+def _frozen_hash(x: Union[FrozenTag, _FrozenTagList]) -> int:
+    digest = _structural_hash(x)
+    return hash(digest) if digest is not None else hash(getattr(x, "name", None))
+
+
+# Instance attributes which are bookkeeping, rather than content, and are ignored when
+# comparing objects.
+_EQUALS_IGNORED_ATTRS = {
+    "_clean_epoch",
+    "_html_cache",
+    "_deps",
+    "_output_cache",
+    "_hash_cache",
+}
+
+
 def _equals_impl(x: Any, y: Any) -> bool:
     if not isinstance(y, type(x)):
         return False
-    for key in x.__dict__.keys():
+    for key in _instance_attr_names(x):
+        if key in _EQUALS_IGNORED_ATTRS:
+            continue
         if getattr(x, key, None) != getattr(y, key, None):
             return False
     return True
+
+
+# The names of the slots of each class (including inherited ones).
+_slot_names_cache: Dict[type, Tuple[str, ...]] = {}
+
+
+def _slot_names(cls: type) -> Tuple[str, ...]:
+    names = _slot_names_cache.get(cls)
+    if names is None:
+        names_: List[str] = []
+        for c in reversed(cls.__mro__):
+            slots = c.__dict__.get("__slots__", ())
+            if isinstance(slots, str):
+                slots = (slots,)
+            names_.extend(s for s in slots if s not in ("__dict__", "__weakref__"))
+        names = _slot_names_cache[cls] = tuple(names_)
+    return names
+
+
+# The names of the instance attributes of `x`, whether they're stored in slots or (for
+# subclasses which don't define __slots__) in __dict__.
+def _instance_attr_names(x: object) -> List[str]:
+    names = list(_slot_names(type(x)))
+    names.extend(getattr(x, "__dict__", ()))
+    return names
+
+
+# Copy the instance attributes of `x` to `y` (optionally applying `fn` to each value).
+# Slots which haven't been set are skipped.
+def _copy_instance_attrs(
+    x: object, y: object, fn: Optional[Callable[[Any], Any]] = None
+) -> None:
+    for key in _instance_attr_names(x):
+        try:
+            value = getattr(x, key)
+        except AttributeError:
+            continue
+        object.__setattr__(y, key, value if fn is None else fn(value))
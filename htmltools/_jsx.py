@@ -24,6 +24,7 @@ from ._core import (
     TagList,
     TagAttrArg,
     Tag,
+    FrozenTag,
     TagChild,
     TagChildArg,
     Tagifiable,
@@ -202,7 +203,12 @@ class JSXTag:
 def _walk_attrs_and_children(x: Any, fn: Callable[[Any], Any]) -> Any:
     x = fn(x)
 
-    if isinstance(x, Tag):
+    if isinstance(x, FrozenTag):
+        # A frozen tag is already tagified, and can't be modified, so its descendants are
+        # only visited (so that metadata nodes are still collected).
+        for child in x.children:
+            _walk_attrs_and_children(child, fn)
+    elif isinstance(x, Tag):
         for i, child in enumerate(x.children):
             x.children[i] = _walk_attrs_and_children(child, fn)
     elif isinstance(x, JSXTag):
@@ -0,0 +1,187 @@
+from collections import OrderedDict
+from functools import update_wrapper
+from typing import (
+    Any,
+    Callable,
+    Generic,
+    NamedTuple,
+    Optional,
+    Tuple,
+    TypeVar,
+    overload,
+)
+
+from ._core import Tag, Tagifiable, TagList
+
+__all__ = (
+    "memo_component",
+    "MemoComponent",
+    "ComponentCacheInfo",
+)
+
+T = TypeVar("T")
+
+
+class ComponentCacheInfo(NamedTuple):
+    """
+    Statistics of a :func:`memo_component` function.
+    """
+
+    hits: int
+    misses: int
+    evictions: int
+    maxsize: int
+    currsize: int
+
+
+# Separates the positional arguments from the keyword arguments in cache keys.
+_KWARGS_MARK = object()
+_MISSING: Any = object()
+
+
+class MemoComponent(Generic[T]):
+    """
+    A function which returns (frozen) tags, and caches them by its arguments. See
+    :func:`memo_component`.
+    """
+
+    def __init__(self, fn: Callable[..., T], maxsize: int) -> None:
+        update_wrapper(self, fn)
+        self._fn = fn
+        self._maxsize = maxsize
+        self._results: "OrderedDict[Tuple[Any, ...], T]" = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def __call__(self, *args: Any, **kwargs: Any) -> T:
+        key = args
+        if kwargs:
+            key += (_KWARGS_MARK, *kwargs.items())
+        results = self._results
+        result = results.get(key, _MISSING)
+        if result is not _MISSING:
+            try:
+                results.move_to_end(key)
+            except KeyError:
+                # Another thread evicted it.
+                pass
+            self._hits += 1
+            return result
+
+        # Like the RenderCache, this isn't locked: if threads race to call the function
+        # with the same arguments, it's called more than once.
+        self._misses += 1
+        result = _frozen_result(self._fn(*args, **kwargs))
+        results[key] = result
+        while len(results) > self._maxsize:
+            try:
+                results.popitem(last=False)
+            except KeyError:
+                break
+            self._evictions += 1
+        return result
+
+    def cache_info(self) -> ComponentCacheInfo:
+        """
+        Return the number of hits, misses, and evictions, and the maximum and current
+        number of cached results.
+        """
+        return ComponentCacheInfo(
+            self._hits, self._misses, self._evictions, self._maxsize, len(self._results)
+        )
+
+    def cache_clear(self) -> None:
+        """
+        Remove all of the cached results, and reset the statistics.
+        """
+        self._results.clear()
+        self._hits = self._misses = self._evictions = 0
+
+    def __repr__(self) -> str:
+        return f"<memo_component {self._fn!r}>"
+
+
+@overload
+def memo_component(fn: Callable[..., T], *, maxsize: int = 128) -> MemoComponent[T]:
+    ...
+
+
+@overload
+def memo_component(
+    fn: None = None, *, maxsize: int = 128
+) -> Callable[[Callable[..., T]], MemoComponent[T]]:
+    ...
+
+
+def memo_component(fn: Optional[Callable[..., T]] = None, *, maxsize: int = 128) -> Any:
+    """
+    Cache the tags which a function returns, by its arguments.
+
+    The first time the function is called with some arguments, its result is tagified
+    and frozen (see :meth:`Tag.freeze`), and its HTML and dependencies are rendered.
+    After that, calling it with the same arguments returns the same frozen result, and
+    rendering it only inserts the HTML which was rendered before. This makes components
+    which always return the same content for the same arguments about as cheap as a dict
+    lookup.
+
+    Parameters
+    ----------
+    fn
+        The function, which should return a :class:`Tag`, a :class:`TagList`, a
+        :class:`Tagifiable` object, or a string, and should only depend on its arguments
+        (which have to be hashable).
+    maxsize
+        The maximum number of results to cache. When it's exceeded, the least recently
+        used results are evicted.
+
+    Returns
+    -------
+    A :class:`MemoComponent`, which is called like ``fn``, and has a ``cache_info()``
+    method which returns the number of hits, misses, and evictions, and a
+    ``cache_clear()`` method.
+
+    Note
+    ----
+    The results are frozen (and shared by every call with the same arguments), so they
+    can't be modified. Functions which need variations of a result should take them as
+    arguments.
+
+    Example
+    -------
+    >>> from htmltools import div, memo_component, tags
+    >>> @memo_component
+    ... def card(title, text):
+    ...     return div(tags.h5(title, class_="card-title"), text, class_="card")
+    >>> page = div(card("Sales", "Up 5%"), card("Sales", "Up 5%"))
+    >>> card.cache_info()
+    ComponentCacheInfo(hits=1, misses=1, evictions=0, maxsize=128, currsize=1)
+    """
+
+    def decorator(fn: Callable[..., T]) -> MemoComponent[T]:
+        return MemoComponent(fn, maxsize)
+
+    return decorator if fn is None else decorator(fn)
+
+
+# Freeze the result of a component, and render it, so that rendering it again only
+# inserts the cached HTML.
+def _frozen_result(x: Any) -> Any:
+    if isinstance(x, (str, int, float)) or x is None:
+        # Strings (including HTML) and numbers are immutable already.
+        return x
+    if isinstance(x, (list, tuple)):
+        x = TagList(*x)
+    elif not isinstance(x, (Tag, TagList)) and isinstance(x, Tagifiable):
+        x = x.tagify()
+        if isinstance(x, str):
+            return x
+    if not isinstance(x, (Tag, TagList)):
+        raise TypeError(
+            "A memo_component() function has to return a Tag, TagList, Tagifiable "
+            + f"object, or string, not {type(x).__name__}."
+        )
+    frozen = x.freeze()
+    frozen.get_html_string()
+    frozen.get_dependencies()
+    return frozen
@@ -0,0 +1,274 @@
+import os
+import sys
+import time
+from copy import copy
+from typing import Callable, Dict, Iterable, List, Mapping, Optional, Tuple, Union
+
+if sys.version_info >= (3, 11):
+    from typing import TypedDict
+else:
+    from typing_extensions import TypedDict
+
+if sys.version_info >= (3, 8):
+    from typing import Literal
+else:
+    from typing_extensions import Literal
+
+from ._core import (
+    HTMLDependency,
+    HTMLDocument,
+    TagChildArg,
+    Tagifiable,
+    set_bundle_dir,
+    _bundles_root,  # type: ignore
+)
+
+# A page, or a function which creates one.
+PageArg = Union[
+    HTMLDocument, TagChildArg, Callable[[], Union[HTMLDocument, TagChildArg]]
+]
+
+__all__ = (
+    "save_site",
+    "PageResult",
+    "SiteResult",
+)
+
+
+class PageResult(TypedDict):
+    path: str
+    dependencies: List[str]
+    render_time: float
+    write_time: float
+
+
+class SiteResult(TypedDict):
+    pages: List[PageResult]
+    dependencies: List[HTMLDependency]
+    copy_time: float
+    total_time: float
+
+
+def save_site(
+    pages: Union[Mapping[str, PageArg], Iterable[Tuple[str, PageArg]]],
+    dir: str = ".",
+    libdir: str = "lib",
+    *,
+    include_version: bool = True,
+    content_hash: Optional[Literal["path", "query"]] = None,
+    bundle: bool = False,
+    processes: Optional[int] = 1,
+    compare: Optional[Literal["mtime", "hash"]] = None,
+    method: Literal["copy", "hardlink", "reflink"] = "copy",
+    workers: int = 1,
+) -> SiteResult:
+    """
+    Save many pages to HTML files, with one shared directory of dependencies.
+
+    The pages are rendered (optionally in parallel), and then the files of each of the
+    dependencies they use are copied (once) to ``libdir``.
+
+    Parameters
+    ----------
+    pages
+        The pages to save, as a dict (or an iterable of pairs) of file paths (relative
+        to ``dir``) and documents. A document can be an :class:`HTMLDocument`, or any
+        content which :class:`HTMLDocument` accepts, such as a :class:`Tag`, or a
+        function (with no arguments) which returns one. Functions are called in the
+        process which renders the page.
+    dir
+        The directory to save the pages to.
+    libdir
+        The directory to save the dependencies to (relative to ``dir``). Each page
+        refers to it with a relative path.
+    include_version
+        Whether to include the version number in the dependency folder names. If
+        ``True``, different pages can use different versions of a dependency; if
+        ``False``, the latest version which any page uses is copied, and pages which
+        use older versions are rendered again with the latest version.
+    content_hash
+        Whether to include a hash of the contents of dependency files in their URLs.
+        See :meth:`HTMLDocument.render`.
+    bundle
+        Whether to combine the scripts and stylesheets of dependencies into one file
+        each. Pages with the same dependencies share a bundle. See
+        :meth:`HTMLDocument.render`.
+    processes
+        The number of processes to render the pages with. By default, the pages are
+        rendered in this process, and if ``None``, the number of CPUs is used. The pages
+        have to be picklable to be rendered in other processes (so they can't be
+        lambdas or local functions, for example), and pickling a tag tree takes about as
+        long as rendering it, so this pays off when pages are given as (module-level)
+        functions, which do the work of creating the pages in the other processes.
+    compare
+        How to tell whether existing copies of dependency files are up to date. See
+        :meth:`HTMLDependency.copy_to`.
+    method
+        How to copy dependency files. See :meth:`HTMLDependency.copy_to`.
+    workers
+        The number of threads to copy dependency files with.
+
+    Returns
+    -------
+    A dict with information about each page (its path, the dependencies it uses, and
+    the time it took to render and to write), the dependencies which were copied, the
+    time it took to copy them, and the total time, in seconds.
+
+    Example
+    -------
+    >>> from functools import partial
+    >>> from htmltools import save_site, tags
+    >>> def report(year):
+            return tags.h1(f"Report for {year}")
+    >>> pages = {f"reports/{y}.html": partial(report, y) for y in range(2000, 2024)}
+    >>> pages["index.html"] = tags.h1("Reports")
+    >>> result = save_site(pages, "site", processes=None)
+    >>> [page["path"] for page in result["pages"]]
+    """
+
+    start = time.perf_counter()
+    if isinstance(pages, Mapping):
+        pages = pages.items()
+    dir = os.path.abspath(dir)
+    libdir = os.path.join(dir, libdir)
+    args = (libdir, include_version, content_hash, bundle)
+    jobs: List[_PageJob] = [
+        (os.path.join(dir, path), doc, *args, []) for path, doc in pages
+    ]
+    if processes is None:
+        processes = os.cpu_count() or 1
+    saved = _save_pages(jobs, processes)
+
+    # Each dependency folder is copied once. If the version isn't included in the folder
+    # names, pages which use different versions of a dependency use the same folder,
+    # which gets the latest version. Getting the folder name can mean hashing the files,
+    # so it's only done once for each distinct dependency.
+    unique: Dict[Tuple[object, ...], HTMLDependency] = {}
+    for _, page_deps in saved:
+        for dep in page_deps:
+            unique.setdefault(_dependency_files_key(dep), dep)
+    folders: Dict[Tuple[object, ...], Tuple[str, str]] = {}
+    deps: Dict[Tuple[str, str], HTMLDependency] = {}
+    for files_key, dep in unique.items():
+        href = dep.source_path_map(
+            lib_prefix=None,
+            include_version=include_version,
+            content_hash=content_hash,
+        )["href"]
+        key = folders[files_key] = (dep.name, href)
+        if key not in deps or dep.version > deps[key].version:
+            deps[key] = dep
+        elif dep.version == deps[key].version:
+            raise ValueError(
+                f"Pages use different HTML dependencies named {dep.name!r}, with the "
+                + f"same version ({dep.version}), which would be copied to the same "
+                + "folder."
+            )
+
+    # Pages which use an older version of a dependency than the one which is copied to
+    # its folder are rendered again with the copied version, which replaces the older
+    # one (since a page uses the latest version of each dependency it contains).
+    redo: List[int] = []
+    for i, (_, page_deps) in enumerate(saved):
+        for dep in page_deps:
+            latest = deps[folders[_dependency_files_key(dep)]]
+            if latest is not dep and latest != dep:
+                jobs[i][6].append(latest)
+        if jobs[i][6]:
+            redo.append(i)
+    if redo:
+        for i, page in zip(redo, _save_pages([jobs[i] for i in redo], processes)):
+            saved[i] = page
+
+    copy_start = time.perf_counter()
+    HTMLDocument._copy_dependencies(
+        list(deps.values()),
+        libdir,
+        include_version=include_version,
+        content_hash=content_hash,
+        compare=compare,
+        method=method,
+        workers=workers,
+    )
+    end = time.perf_counter()
+
+    return {
+        "pages": [page for page, _ in saved],
+        "dependencies": list(deps.values()),
+        "copy_time": end - copy_start,
+        "total_time": end - start,
+    }
+
+
+# Dependencies with the same key have the same files, and use the same folder.
+def _dependency_files_key(dep: HTMLDependency) -> Tuple[object, ...]:
+    return (
+        dep.name,
+        str(dep.version),
+        None if dep.source is None else tuple(dep.source.items()),
+        dep.all_files,
+        tuple(s["src"] for s in dep.script),
+        tuple(s["href"] for s in dep.stylesheet),
+    )
+
+
+# A page to save: its path, the page, the lib directory, the arguments of render(), and
+# dependencies to add to the page.
+_PageJob = Tuple[str, PageArg, str, bool, Optional[str], bool, List[HTMLDependency]]
+
+
+def _save_pages(
+    jobs: List[_PageJob], processes: int
+) -> List[Tuple[PageResult, List[HTMLDependency]]]:
+    processes = min(processes, len(jobs))
+    if processes <= 1:
+        return [_save_page(job) for job in jobs]
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    # The workers write bundles to the same directory as this process (see
+    # set_bundle_dir()), so that they can be copied from there.
+    with ProcessPoolExecutor(
+        processes, initializer=set_bundle_dir, initargs=(_bundles_root(),)
+    ) as pool:
+        chunksize = max(1, len(jobs) // (processes * 4))
+        return list(pool.map(_save_page, jobs, chunksize=chunksize))
+
+
+# Render a page, and write it to a file. This runs in the worker processes, so it has to
+# be a module-level function (so it can be pickled).
+def _save_page(job: _PageJob) -> Tuple[PageResult, List[HTMLDependency]]:
+    path, doc, libdir, include_version, content_hash, bundle, extra_deps = job
+    start = time.perf_counter()
+    if callable(doc) and not isinstance(doc, (HTMLDocument, Tagifiable)):
+        doc = doc()
+    if not isinstance(doc, HTMLDocument):
+        doc = HTMLDocument(doc)
+    elif extra_deps:
+        # Don't modify the caller's document.
+        doc = copy(doc)
+    if extra_deps:
+        doc.append(*extra_deps)
+    # Dependencies are referred to relative to the page, so that the site can be moved.
+    lib_prefix = os.path.relpath(libdir, os.path.dirname(path)).replace(os.sep, "/")
+    rendered = doc.render(
+        lib_prefix=lib_prefix,
+        include_version=include_version,
+        content_hash=content_hash,  # type: ignore
+        bundle=bundle,
+    )
+
+    write_start = time.perf_counter()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(rendered["html"])
+    end = time.perf_counter()
+
+    deps = rendered["dependencies"]
+    page: PageResult = {
+        "path": path,
+        "dependencies": [f"{d.name}-{d.version}" for d in deps],
+        "render_time": write_start - start,
+        "write_time": end - write_start,
+    }
+    return page, deps
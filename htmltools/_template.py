@@ -0,0 +1,282 @@
+import re
+from copy import copy
+from typing import Any, Dict, List, Optional, Tuple, Type, Union
+
+from ._core import (
+    HTML,
+    HTMLDependency,
+    RenderedHTML,
+    Tag,
+    TagChildArg,
+    TagList,
+    _NO_ESCAPE_TAG_NAMES,  # type: ignore
+    _resolve_dependencies,  # type: ignore
+    _write_taglist_html,  # type: ignore
+)
+from ._util import _html_escape  # type: ignore
+
+__all__ = (
+    "Template",
+    "Slot",
+)
+
+SlotType = Union[Type[Any], Tuple[Type[Any], ...]]
+
+# Slots are rendered as their name between NUL characters, which aren't escaped, and
+# can't appear in (valid) HTML, so the holes can be found in the rendered HTML.
+_SLOT_RE = re.compile("\x00([^\x00]+)\x00")
+
+
+class Slot(HTML):
+    """
+    A placeholder for a value in a :class:`Template`.
+
+    A slot can be a child of a tag, or an attribute value.
+
+    Parameters
+    ----------
+    name
+        The name of the slot, which is the keyword argument which fills it. A name can
+        be used for more than one slot.
+    type
+        The type (or tuple of types) which the values of the slot have to have. Strings
+        are escaped (unless they're :class:`HTML`), and numbers are converted to
+        strings. Slots which are children (but not attribute values) can also be filled
+        with tags.
+
+    Example
+    -------
+    >>> from htmltools import Slot, Template, tags
+    >>> row = Template(tags.tr(tags.td(Slot("name")), tags.td(Slot("count", int))))
+    >>> row(name="Apples", count=3)
+    <tr>
+      <td>Apples</td>
+      <td>3</td>
+    </tr>
+    """
+
+    name: str
+    type: SlotType
+
+    def __new__(cls, name: str, type: SlotType = str) -> "Slot":
+        if not name.isidentifier():
+            raise ValueError(f"Slot names have to be identifiers, not {name!r}.")
+        self = super().__new__(cls, f"\x00{name}\x00")
+        self.name = name
+        self.type = type
+        return self
+
+    def __repr__(self) -> str:
+        return f"Slot({self.name!r}, {_type_name(self.type)})"
+
+    def __reduce__(self) -> Tuple[Any, ...]:
+        return (Slot, (self.name, self.type))
+
+
+# A hole in a Template: the name of its slot, whether it's in an attribute value, the
+# type of the values, and the indentation level of the line it's on.
+_Hole = Tuple[str, bool, SlotType, int]
+
+
+class Template:
+    """
+    A tag tree with :class:`Slot` placeholders, which is rendered once, and then filled
+    in many times.
+
+    The parts of the tree around the slots are rendered to strings when the template is
+    created, so filling it in only escapes the values, and joins them with the
+    strings, without creating (or rendering) any tags. This is much faster than
+    creating the same tags for each value, for content which is repeated with different
+    values, like the rows of a table, or cards.
+
+    Parameters
+    ----------
+    *args
+        The content, which contains :class:`Slot` objects (as children, or attribute
+        values). It's tagified when the template is created.
+
+    Note
+    ----
+    The template is rendered when it's created, so (unlike tags) modifying the content
+    afterwards doesn't change it. Slots are rendered like strings, so tags which fill
+    a slot that's the only child of a tag are inline (``<td><div>...</div></td>``).
+    Slots can't be in ``<script>`` or ``<style>`` tags (since their contents aren't
+    escaped), in :class:`HTML` strings, or in attribute names.
+
+    Example
+    -------
+    >>> from htmltools import Slot, Template, tags
+    >>> link = Template(tags.a(Slot("text"), href=Slot("url")))
+    >>> link(text="Search", url="https://www.google.com/search?q=html&hl=en")
+    <a href="https://www.google.com/search?q=html&amp;hl=en">Search</a>
+    >>> tags.ul([tags.li(link(text=t, url=u)) for t, u in links])
+    """
+
+    def __init__(self, *args: TagChildArg) -> None:
+        x = TagList(*args).tagify()
+        occurrences, types = _find_slots(x)
+        rendered = x.render()
+        parts = _SLOT_RE.split(rendered["html"])
+        segments = parts[0::2]
+        if parts[1::2] != [name for name, _ in occurrences]:
+            raise ValueError(
+                "Slots can only be children of tags, or attribute values (and not in "
+                + "HTML() strings, or attribute names)."
+            )
+
+        holes: List[_Hole] = []
+        for (name, attr), before in zip(occurrences, segments):
+            # Tags which fill a slot are indented like the line it's on.
+            line = before[before.rfind("\n") + 1 :]
+            indent = 0 if attr else (len(line) - len(line.lstrip(" "))) // 2
+            holes.append((name, attr, types.get(name, str), indent))
+
+        self._segments = segments
+        self._holes = holes
+        self._types = {name: types.get(name, str) for name, _ in occurrences}
+        self._dependencies = rendered["dependencies"]
+
+    @property
+    def slots(self) -> Dict[str, SlotType]:
+        """
+        The names of the slots, and the types of their values.
+        """
+        return dict(self._types)
+
+    def __call__(self, **values: Any) -> HTML:
+        """
+        Fill in the slots, and return the HTML.
+
+        Parameters
+        ----------
+        **values
+            The value of each slot.
+
+        Returns
+        -------
+        The HTML, which doesn't include the dependencies (of the template, or of tags
+        which fill its slots); use :meth:`render` to get them too.
+        """
+        return HTML(self._fill(values, None))
+
+    def render(self, **values: Any) -> RenderedHTML:
+        """
+        Fill in the slots, and return the HTML and dependencies.
+
+        Parameters
+        ----------
+        **values
+            The value of each slot.
+
+        Returns
+        -------
+        A dict with the HTML, and the dependencies of the template and of the values.
+        """
+        deps = list(self._dependencies)
+        html = self._fill(values, deps)
+        if len(deps) > len(self._dependencies):
+            deps = _resolve_dependencies(deps)
+        return {"dependencies": deps, "html": HTML(html)}
+
+    def _fill(
+        self, values: Dict[str, Any], deps: Optional[List[HTMLDependency]]
+    ) -> str:
+        if len(values) != len(self._types):
+            _check_names(self._types, values)
+        segments = self._segments
+        out = [segments[0]]
+        i = 0
+        for name, attr, type_, indent in self._holes:
+            i += 1
+            try:
+                value = values[name]
+            except KeyError:
+                _check_names(self._types, values)
+                raise
+            if not isinstance(value, type_):
+                raise TypeError(
+                    f"The value of slot {name!r} has to be {_type_name(type_)}, not "
+                    + f"{type(value).__name__}."
+                )
+            if isinstance(value, HTML):
+                out.append(value)
+            elif isinstance(value, str):
+                out.append(_html_escape(value, attr))
+            elif isinstance(value, (int, float)):
+                out.append(str(value))
+            elif attr:
+                raise TypeError(
+                    f"Slot {name!r} is an attribute value, so its value has to be a "
+                    + f"string or a number, not {type(value).__name__}."
+                )
+            else:
+                out.append(_render_value(value, indent, deps))
+            out.append(segments[i])
+        return "".join(out)
+
+    def __repr__(self) -> str:
+        slots = ", ".join(repr(slot) for slot in self._types)
+        return f"<Template with slots {slots}>"
+
+
+# Find the slots in a (tagified) tree, in the order they're rendered in: the attributes
+# of each tag, and then its children. Returns the name of each slot, and whether it's
+# in an attribute value, and the type of each slot.
+def _find_slots(x: TagList) -> Tuple[List[Tuple[str, bool]], Dict[str, SlotType]]:
+    occurrences: List[Tuple[str, bool]] = []
+    types: Dict[str, SlotType] = {}
+
+    def add_type(slot: Slot) -> None:
+        if types.setdefault(slot.name, slot.type) != slot.type:
+            raise ValueError(f"Slot {slot.name!r} has more than one type.")
+
+    stack = [(iter(x), False)]
+    while stack:
+        children, no_escape = stack[-1]
+        for child in children:
+            if isinstance(child, Slot):
+                if no_escape:
+                    raise ValueError(
+                        f"Slot {child.name!r} can't be in a <script> or <style> tag."
+                    )
+                add_type(child)
+                occurrences.append((child.name, False))
+            elif isinstance(child, Tag):
+                for value in child.attrs.values():
+                    if isinstance(value, Slot):
+                        add_type(value)
+                    occurrences.extend((name, True) for name in _SLOT_RE.findall(value))
+                no_escape = child.name in _NO_ESCAPE_TAG_NAMES
+                stack.append((iter(child.children), no_escape))
+                break
+        else:
+            stack.pop()
+    return occurrences, types
+
+
+# Render a tag (or other tag child) which fills a slot, at the indentation level of the
+# line the slot is on (so the contents of <pre> tags, for example, aren't indented).
+def _render_value(value: Any, indent: int, deps: Optional[List[HTMLDependency]]) -> str:
+    chunks: List[str] = []
+    value_deps: List[HTMLDependency] = []
+    x = value if isinstance(value, TagList) else (value,)
+    _write_taglist_html(x, chunks.append, indent, "\n", tagify=True, deps=value_deps)
+    if deps is not None:
+        deps.extend(copy(d) for d in _resolve_dependencies(value_deps))
+    # The first line is already indented (by the template).
+    return "".join(chunks)[2 * indent :]
+
+
+def _check_names(types: Dict[str, SlotType], values: Dict[str, Any]) -> None:
+    missing = [name for name in types if name not in values]
+    if missing:
+        raise TypeError(f"Missing values for slots: {', '.join(missing)}.")
+    unknown = [name for name in values if name not in types]
+    if unknown:
+        raise TypeError(f"Unknown slots: {', '.join(unknown)}.")
+
+
+def _type_name(type_: SlotType) -> str:
+    if isinstance(type_, tuple):
+        return " or ".join(t.__name__ for t in type_)
+    return type_.__name__
@@ -1,9 +1,9 @@
-import hashlib
 import importlib
 import os
 import re
-import tempfile
+from collections import OrderedDict
 from typing import (
+    TYPE_CHECKING,
     Any,
     List,
     NamedTuple,
@@ -13,19 +13,20 @@ from typing import (
     Dict,
     Optional,
     Iterable,
+    Tuple,
+    Set,
 )
 
-from contextlib import closing
-from http.server import SimpleHTTPRequestHandler
-from socket import socket
-from socketserver import TCPServer
-from threading import Thread
+# The modules for the preview HTTP server take a while to import, and are rarely needed,
+# so they're imported by the functions that use them.
+if TYPE_CHECKING:
+    from threading import Thread
 
 T = TypeVar("T")
 
 HashableT = TypeVar("HashableT", bound=Hashable)
 
-__all__ = ("css",)
+__all__ = ("css", "clear_path_caches", "set_file_hash_cache")
 
 
 def css(collapse_: str = "", **kwargs: Union[str, float, None]) -> Optional[str]:
@@ -112,32 +113,340 @@ HTML_ATTRS_ESCAPE_TABLE = {
 }
 
 
+# The escape tables as (character, entity) pairs. "&" comes first, so the entities
+# which replace the other characters aren't escaped again.
+_HTML_ESCAPES = tuple(HTML_ESCAPE_TABLE.items())
+_HTML_ATTRS_ESCAPES = tuple(HTML_ATTRS_ESCAPE_TABLE.items())
+
+
+# This runs for every text node and attribute value, so it's worth being fast. Each
+# character is only replaced if it occurs in the text, and `in` and str.replace() are
+# both fast substring searches, which makes this quicker than checking with a regex
+# first, or than a single str.translate() pass (which is slow when characters map to
+# multi-character strings). See benchmarks/bench_escape.py. If nothing needs to be
+# escaped, `text` itself is returned.
 def _html_escape(text: str, attr: bool = False) -> str:
-    table = HTML_ATTRS_ESCAPE_TABLE if attr else HTML_ESCAPE_TABLE
-    if not re.search("|".join(table), text):
-        return text
-    for key, value in table.items():
-        text = text.replace(key, value)
+    for char, entity in _HTML_ATTRS_ESCAPES if attr else _HTML_ESCAPES:
+        if char in text:
+            text = text.replace(char, entity)
     return text
 
 
+# The directories of packages, and the real paths of dependency source directories, are
+# looked up for each HTMLDependency every time a page is rendered, so they're cached.
+# Relative paths are resolved against the working directory, so it's part of the key.
+_package_dirs: Dict[str, str] = {}
+_realpaths: Dict[Tuple[str, str], str] = {}
+# Incremented when the caches are cleared. Cached values which were computed from paths
+# (or from the contents of files) are only valid for the generation they were made in.
+_path_cache_generation = 0
+
+
+def clear_path_caches() -> None:
+    """
+    Clear the cached package directories and real paths of HTMLDependency sources.
+
+    Call this if a package has moved (e.g., it was reinstalled elsewhere), or if a
+    symbolic link in the path of a dependency's source directory has changed. This also
+    frees the cached contents of inlined files. (Content hashes, and the contents of
+    inlined files, are computed again when the files change, without clearing the
+    caches.)
+    """
+    global _path_cache_generation, _file_contents_bytes
+    _package_dirs.clear()
+    _realpaths.clear()
+    _file_contents.clear()
+    _file_contents_bytes = 0
+    _path_cache_generation += 1
+
+
+def _path_caches_generation() -> int:
+    return _path_cache_generation
+
+
 # similar to base::system.file()
 def _package_dir(package: str) -> str:
-    with tempfile.TemporaryDirectory():
+    pkg_dir = _package_dirs.get(package)
+    if pkg_dir is None:
         pkg_file = importlib.import_module(".", package=package).__file__
-        return os.path.dirname(pkg_file)
+        pkg_dir = _package_dirs[package] = os.path.dirname(pkg_file)
+    return pkg_dir
+
+
+# A cached os.path.realpath().
+def _realpath(path: str) -> str:
+    key = (path, "" if os.path.isabs(path) else os.getcwd())
+    result = _realpaths.get(key)
+    if result is None:
+        result = _realpaths[key] = os.path.realpath(path)
+    return result
+
+
+# Content hashes of files, keyed by path. Each value is (mtime, size, hash), and the hash
+# is only used if the file's mtime and size still match.
+_file_hashes: Dict[str, Tuple[int, int, str]] = {}
+# If set, the file which _file_hashes is saved to (see set_file_hash_cache()).
+_file_hash_cache: Optional[str] = None
+
+
+def set_file_hash_cache(path: Optional[str]) -> None:
+    """
+    Save the content hashes of dependency files to a file.
+
+    When dependencies are rendered with ``content_hash``, the contents of their files
+    are hashed. The hashes are kept in memory, and only computed again for files whose
+    modification time or size has changed. This saves them to a file too, so that they
+    can be reused by other processes, and in later sessions.
+
+    Parameters
+    ----------
+    path
+        The file to save the hashes to. If it exists, the hashes in it are loaded. If
+        ``None``, hashes are no longer saved.
+    """
+    global _file_hash_cache
+    _file_hash_cache = path
+    if path is None or not os.path.exists(path):
+        return
+
+    import json
+
+    try:
+        with open(path, "r") as f:
+            hashes = json.load(f)
+    except ValueError:
+        # The file is corrupt; it'll be overwritten.
+        return
+    for file, (mtime, size, digest) in hashes.items():
+        _file_hashes.setdefault(file, (mtime, size, digest))
+
+
+# Returns the content hashes of `files`. If any of them have to be computed, and a hash
+# cache file has been set, it's updated.
+def _file_hashes_for(files: Iterable[str]) -> List[str]:
+    import hashlib
+
+    result: List[str] = []
+    changed = False
+    for file in files:
+        st = os.stat(file)
+        cached = _file_hashes.get(file)
+        if cached and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+            result.append(cached[2])
+            continue
+        h = hashlib.blake2b(digest_size=8)
+        with open(file, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+        digest = h.hexdigest()
+        _file_hashes[file] = (st.st_mtime_ns, st.st_size, digest)
+        result.append(digest)
+        changed = True
+
+    if changed and _file_hash_cache is not None:
+        _save_file_hashes(_file_hash_cache)
+    return result
+
+
+# Write to a temporary file and then rename it, so that other processes never see a
+# partially written file.
+def _save_file_hashes(path: str) -> None:
+    import json
+    import tempfile
+
+    dir = os.path.dirname(os.path.abspath(path))
+    os.makedirs(dir, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=dir, prefix=".htmltools-hashes-")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(_file_hashes, f)
+        os.replace(tmp, path)
+    except BaseException:
+        os.remove(tmp)
+        raise
+
+
+# The contents of files which are inlined into HTML, keyed by path, and ordered from
+# least to most recently used. Each value is (mtime, size, contents), and the contents
+# are only used if the file's mtime and size match. When the contents add up to more
+# than _FILE_CONTENTS_MAX_BYTES, the least recently used files are evicted.
+_file_contents: "OrderedDict[str, Tuple[int, int, bytes]]" = OrderedDict()
+_file_contents_bytes = 0
+_FILE_CONTENTS_MAX_BYTES = 32 * 1024 * 1024
+
+
+# Read a file with mmap (which avoids copying it through a read buffer), and cache its
+# contents until it changes.
+def _read_file(path: str) -> bytes:
+    global _file_contents_bytes
+    st = os.stat(path)
+    cached = _file_contents.get(path)
+    if cached and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+        try:
+            _file_contents.move_to_end(path)
+        except KeyError:
+            # Another thread evicted it.
+            pass
+        return cached[2]
+
+    import mmap
+
+    with open(path, "rb") as f:
+        if st.st_size == 0:
+            # Empty files can't be mapped.
+            data = b""
+        else:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+                data = m[:]
+    if len(data) > _FILE_CONTENTS_MAX_BYTES:
+        return data
+
+    # Like the RenderCache, this isn't locked, so the byte count can be off if threads
+    # race to update it. It's corrected when the cache is emptied.
+    old = _file_contents.pop(path, None)
+    if old is not None:
+        _file_contents_bytes -= len(old[2])
+    _file_contents[path] = (st.st_mtime_ns, st.st_size, data)
+    _file_contents_bytes += len(data)
+    while _file_contents_bytes > _FILE_CONTENTS_MAX_BYTES and _file_contents:
+        try:
+            _, (_, _, evicted) = _file_contents.popitem(last=False)
+        except KeyError:
+            break
+        _file_contents_bytes -= len(evicted)
+    if not _file_contents:
+        _file_contents_bytes = 0
+    return data
+
+
+# MIME types of files which are often referred to by CSS, and which the mimetypes module
+# may not know about (depending on the Python version and the system's MIME database).
+_CSS_ASSET_TYPES = {
+    ".woff": "font/woff",
+    ".woff2": "font/woff2",
+    ".ttf": "font/ttf",
+    ".otf": "font/otf",
+    ".eot": "application/vnd.ms-fontobject",
+    ".svg": "image/svg+xml",
+    ".webp": "image/webp",
+}
+
+
+# Returns a data: URI with the contents of a file.
+def _data_uri(path: str) -> str:
+    import base64
+
+    mime = _CSS_ASSET_TYPES.get(os.path.splitext(path)[1].lower())
+    if mime is None:
+        import mimetypes
+
+        mime = mimetypes.guess_type(path)[0] or "application/octet-stream"
+    return f"data:{mime};base64," + base64.b64encode(_read_file(path)).decode("ascii")
+
+
+# Copy the file `src` to `dst` (replacing it if it exists), unless `compare` says `dst`
+# is already up to date. Returns True if the file was copied.
+def _sync_file(
+    src: str, dst: str, compare: Optional[str] = None, method: str = "copy"
+) -> bool:
+    if compare is not None and os.path.isfile(dst):
+        if compare == "mtime":
+            s, d = os.stat(src), os.stat(dst)
+            if s.st_size == d.st_size and s.st_mtime_ns == d.st_mtime_ns:
+                return False
+        elif _same_contents(src, dst):
+            return False
+
+    if os.path.lexists(dst):
+        # If `dst` is a hard link to `src` (or a reflink), writing to it in place would
+        # modify `src` as well, so it's replaced rather than overwritten.
+        os.remove(dst)
+    if method == "hardlink":
+        try:
+            os.link(src, dst)
+            return True
+        except OSError:
+            # E.g., `src` and `dst` are on different filesystems.
+            pass
+    elif method == "reflink" and _reflink(src, dst):
+        return True
+
+    import shutil
+
+    shutil.copy2(src, dst)
+    return True
+
+
+def _same_contents(src: str, dst: str) -> bool:
+    import filecmp
+
+    return filecmp.cmp(src, dst, shallow=False)
+
+
+# Pairs of devices (of the source and target files) which reflinks can't be made between.
+_reflink_unsupported: Set[Tuple[int, int]] = set()
+
+
+# Create `dst` as a copy-on-write clone of `src`, with the FICLONE ioctl. This works on
+# Linux, for filesystems such as Btrfs and XFS. Returns False if it isn't possible.
+def _reflink(src: str, dst: str) -> bool:
+    try:
+        import fcntl
+    except ImportError:
+        return False
+
+    FICLONE = 0x40049409
+    devices = (os.stat(src).st_dev, os.stat(os.path.dirname(dst) or ".").st_dev)
+    if devices in _reflink_unsupported:
+        return False
+    try:
+        with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+            fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+    except OSError as e:
+        import errno
+
+        if e.errno in (errno.EOPNOTSUPP, errno.EXDEV, errno.EINVAL, errno.ENOTTY):
+            _reflink_unsupported.add(devices)
+        if os.path.lexists(dst):
+            os.remove(dst)
+        return False
+
+    import shutil
+
+    shutil.copystat(src, dst)
+    return True
+
+
+# Delete the files in `dir` (and its subdirectories) whose paths, relative to `dir`,
+# aren't in `keep`. Directories which are left empty are deleted too.
+def _remove_stale_files(dir: str, keep: Iterable[str]) -> None:
+    keep = {os.path.normpath(f) for f in keep}
+    for root, dirs, files in os.walk(dir, topdown=False):
+        for f in files:
+            path = os.path.join(root, f)
+            if os.path.relpath(path, dir) not in keep:
+                os.remove(path)
+        for d in dirs:
+            path = os.path.join(root, d)
+            if os.path.islink(path):
+                if os.path.relpath(path, dir) not in keep:
+                    os.remove(path)
+            elif not os.listdir(path):
+                os.rmdir(path)
 
 
 def hash_deterministic(s: str) -> str:
     """
     Returns a deterministic hash of the given string.
     """
+    import hashlib
+
     return hashlib.sha1(s.encode('utf-8')).hexdigest()
 
 
 class _HttpServerInfo(NamedTuple):
     port: int
-    thread: Thread
+    thread: "Thread"
 
 
 _http_servers: Dict[str, _HttpServerInfo] = {}
@@ -153,6 +462,8 @@ def ensure_http_server(path: str) -> int:
 
 
 def start_http_server(path: str) -> _HttpServerInfo:
+    from threading import Thread
+
     port: int = get_open_port()
     th: Thread = Thread(target=http_server, args=(port, path), daemon=True)
     th.start()
@@ -160,6 +471,9 @@ def start_http_server(path: str) -> _HttpServerInfo:
 
 
 def http_server(port: int, path: str):
+    from http.server import SimpleHTTPRequestHandler
+    from socketserver import TCPServer
+
     class Handler(SimpleHTTPRequestHandler):
         def __init__(self, *args: Any, **kwargs: Any):
             super().__init__(*args, directory=path, **kwargs)
@@ -172,6 +486,9 @@ def http_server(port: int, path: str):
 
 
 def get_open_port() -> int:
+    from contextlib import closing
+    from socket import socket
+
     with closing(socket()) as sock:
         sock.bind(("", 0))
         return sock.getsockname()[1]
@@ -1,6 +1,14 @@
+import os
+import re
+import shutil
 import textwrap
 
+import pytest
+from packaging.version import Version
+
 from htmltools import *
+from htmltools import _core
+from htmltools._core import _bundle_dependencies
 
 
 def test_dep_resolution():
@@ -224,3 +232,419 @@ def test_as_dict():
         "meta": [],
         "head": "<script>1 && 1</script>",
     }
+
+
+def test_output_cache():
+    a = HTMLDependency(
+        "a",
+        "1.0",
+        source={"subdir": "foo"},
+        script={"src": "a1.js"},
+        stylesheet={"href": "a1.css"},
+    )
+    d = a.as_dict()
+    assert a.as_dict() == d
+    assert a.as_html_tags() == a.as_html_tags()
+    # The returned values are copies, which can be modified.
+    d["script"][0]["src"] = "changed.js"
+    a.as_html_tags().append(div())
+    assert a.as_dict()["script"] == [{"src": "lib/a-1.0/a1.js"}]
+    assert str(a) == textwrap.dedent(
+        """\
+        <link href="lib/a-1.0/a1.css" rel="stylesheet"/>
+        <script src="lib/a-1.0/a1.js"></script>"""
+    )
+
+    # Output is cached for each set of arguments.
+    assert a.as_dict(lib_prefix=None, include_version=False)["script"] == [
+        {"src": "a/a1.js"}
+    ]
+    assert a.as_dict()["script"] == [{"src": "lib/a-1.0/a1.js"}]
+
+    # Modifying the dependency invalidates the cache, whether fields are assigned new
+    # values or modified in place.
+    a.version = Version("2.0")
+    assert a.as_dict()["version"] == "2.0"
+    a.script[0]["defer"] = ""
+    a.stylesheet.append({"href": "a2.css", "rel": "stylesheet"})
+    a.meta = [{"name": "x", "content": "y"}]
+    a.head = TagList(tags.title("Title"))
+    assert str(a) == textwrap.dedent(
+        """\
+        <meta name="x" content="y"/>
+        <link href="lib/a-2.0/a1.css" rel="stylesheet"/>
+        <link href="lib/a-2.0/a2.css" rel="stylesheet"/>
+        <script src="lib/a-2.0/a1.js" defer=""></script>
+        <title>Title</title>"""
+    )
+
+
+def test_copy_to_incremental(tmp_path):
+    src = tmp_path / "src"
+    (src / "js").mkdir(parents=True)
+    (src / "js" / "a.js").write_text("a")
+    (src / "b.css").write_text("b")
+    dep = HTMLDependency("a", "1.0", source={"subdir": str(src)}, all_files=True)
+    target = tmp_path / "lib" / "a-1.0"
+
+    def files():
+        return sorted(str(p.relative_to(target)) for p in target.rglob("*"))
+
+    dep.copy_to(str(tmp_path / "lib"))
+    assert files() == ["b.css", "js", os.path.join("js", "a.js")]
+
+    # Stale files are removed, and files which are up to date are left as they are: the
+    # target file below has been modified, but its size and mtime are the same.
+    (target / "old").mkdir()
+    (target / "old" / "c.js").write_text("c")
+    (target / "b.css").write_text("x")
+    st = os.stat(src / "b.css")
+    os.utime(target / "b.css", ns=(st.st_atime_ns, st.st_mtime_ns))
+    dep.copy_to(str(tmp_path / "lib"), compare="mtime")
+    assert files() == ["b.css", "js", os.path.join("js", "a.js")]
+    assert (target / "b.css").read_text() == "x"
+    dep.copy_to(str(tmp_path / "lib"), compare="hash")
+    assert (target / "b.css").read_text() == "b"
+
+    # Hard links are replaced (rather than written through) when the source changes.
+    dep.copy_to(str(tmp_path / "lib"), method="hardlink")
+    assert os.path.samefile(target / "b.css", src / "b.css")
+    (src / "b.css").unlink()
+    (src / "b.css").write_text("new")
+    dep.copy_to(str(tmp_path / "lib"), compare="hash", method="reflink")
+    assert (target / "b.css").read_text() == "new"
+    assert not os.path.samefile(target / "b.css", src / "b.css")
+
+    with pytest.raises(ValueError):
+        dep.copy_to(str(tmp_path / "lib"), compare="size")  # type: ignore
+    with pytest.raises(ValueError):
+        dep.copy_to(str(tmp_path / "lib"), method="symlink")  # type: ignore
+
+
+def test_copy_to_workers(tmp_path):
+    src = tmp_path / "src"
+    src.mkdir()
+    for i in range(20):
+        (src / f"{i}.js").write_text(str(i))
+    a = HTMLDependency("a", "1.0", source={"subdir": str(src)}, all_files=True)
+    a.copy_to(str(tmp_path / "lib"), workers=4)
+    assert sorted(os.listdir(tmp_path / "lib" / "a-1.0")) == sorted(os.listdir(src))
+    assert (tmp_path / "lib" / "a-1.0" / "7.js").read_text() == "7"
+
+    # The first missing file is reported, and nothing is copied.
+    b = HTMLDependency(
+        "b",
+        "1.0",
+        source={"subdir": str(src)},
+        script=[{"src": "1.js"}, {"src": "missing1.js"}, {"src": "missing2.js"}],
+    )
+    for _ in range(5):
+        with pytest.raises(Exception, match="missing1.js"):
+            b.copy_to(str(tmp_path / "lib"), workers=4)
+    assert not (tmp_path / "lib" / "b-1.0").exists()
+
+    with pytest.raises(ValueError):
+        a.copy_to(str(tmp_path / "lib"), workers=0)
+
+    # save_html() copies the files of all the dependencies.
+    c = HTMLDependency("c", "2.0", source={"subdir": str(src)}, script={"src": "3.js"})
+    div(a, c).save_html(str(tmp_path / "out" / "index.html"), workers=4)
+    assert sorted(os.listdir(tmp_path / "out" / "lib")) == ["a-1.0", "c-2.0"]
+    assert os.listdir(tmp_path / "out" / "lib" / "c-2.0") == ["3.js"]
+
+
+def test_content_hash(tmp_path):
+    src = tmp_path / "src"
+    src.mkdir()
+    (src / "a.js").write_text("a")
+    (src / "a.css").write_text("a")
+    dep = HTMLDependency(
+        "a",
+        "1.0",
+        source={"subdir": str(src)},
+        script={"src": "a.js"},
+        stylesheet={"href": "a.css"},
+    )
+
+    d = dep.as_dict(content_hash="query")
+    [script], [stylesheet] = d["script"], d["stylesheet"]
+    assert re.fullmatch(r"lib/a-1\.0/a\.js\?v=[0-9a-f]{16}", script["src"])
+    # The files have the same contents, so they have the same hash.
+    assert stylesheet["href"] == "lib/a-1.0/a.css?v=" + script["src"].split("=")[1]
+
+    href = dep.source_path_map(content_hash="path")["href"]
+    assert re.fullmatch(r"lib/a-1\.0-[0-9a-f]{16}", href)
+    html = HTMLDocument(div(dep)).render(content_hash="path")["html"]
+    assert f'<script src="{href}/a.js"></script>' in html
+
+    # Cached output is computed again when the files change.
+    tags = dep.as_html_tags(content_hash="path")
+    assert dep.as_html_tags(content_hash="path") == tags
+    (src / "a.js").write_text("changed")
+    new_script = dep.as_dict(content_hash="query")["script"]
+    assert new_script != [script]
+    fresh = HTMLDependency(
+        "a",
+        "1.0",
+        source={"subdir": str(src)},
+        script={"src": "a.js"},
+        stylesheet={"href": "a.css"},
+    )
+    assert new_script == fresh.as_dict(content_hash="query")["script"]
+    new_href = dep.source_path_map(content_hash="path")["href"]
+    assert new_href != href
+    assert dep.as_html_tags(content_hash="path") != tags
+    assert f'src="{new_href}/a.js"' in str(dep.as_html_tags(content_hash="path"))
+
+    # Files are copied to the folder with the hash in its name.
+    div(dep).save_html(str(tmp_path / "out" / "index.html"), content_hash="path")
+    lib = tmp_path / "out" / "lib"
+    assert os.listdir(lib) == [os.path.basename(new_href)]
+    assert sorted(os.listdir(lib / os.path.basename(new_href))) == ["a.css", "a.js"]
+
+    with pytest.raises(ValueError):
+        dep.as_dict(content_hash="md5")  # type: ignore
+    missing = HTMLDependency(
+        "b", "1.0", source={"subdir": str(src)}, script={"src": "missing.js"}
+    )
+    with pytest.raises(Exception, match="missing.js"):
+        missing.as_dict(content_hash="query")
+
+
+def test_self_contained_inline_deps(tmp_path):
+    src = tmp_path / "src"
+    (src / "fonts").mkdir(parents=True)
+    (src / "fonts" / "a b.woff2").write_bytes(b"\x00font")
+    (src / "a.js").write_text("var s = '</script><!--';")
+    (src / "a.css").write_text(
+        "@font-face { src: url('fonts/a%20b.woff2?#iefix'); }\n"
+        "a { background: url(missing.png), url(https://x.com/a.png); }"
+    )
+    dep = HTMLDependency(
+        "a",
+        "1.0",
+        source={"subdir": str(src)},
+        script={"src": "a.js", "defer": "", "type": "module"},
+        stylesheet={"href": "a.css", "media": "print"},
+        head=tags.title("Title"),
+    )
+
+    html = HTMLDocument(div(dep)).render(inline_deps=True)["html"]
+    assert (
+        '<style media="print">'
+        + '@font-face { src: url("data:font/woff2;base64,AGZvbnQ="); }\n'
+        + "a { background: url(missing.png), url(https://x.com/a.png); }</style>"
+    ) in html
+    assert r"""<script type="module">var s = '<\/script><\!--';</script>""" in html
+    assert "<title>Title</title>" in html
+    assert "lib/" not in html
+
+    # Files are read again when they change.
+    (src / "a.js").write_text("var x = 1;")
+    assert '<script type="module">var x = 1;</script>' in str(
+        dep.as_html_tags(inline=True)
+    )
+
+    # Nothing is copied for a self-contained file.
+    (tmp_path / "out").mkdir()
+    div(dep).save_html(str(tmp_path / "out" / "index.html"), self_contained=True)
+    assert os.listdir(tmp_path / "out") == ["index.html"]
+
+
+def test_bundle_deps(tmp_path, monkeypatch):
+    monkeypatch.setattr(_core, "_bundle_dir", str(tmp_path / "bundles"))
+    src = tmp_path / "src"
+    (src / "css" / "img").mkdir(parents=True)
+    (src / "a.js").write_text("var a = 1")
+    (src / "b.js").write_text("var b = 2;")
+    (src / "css" / "a.css").write_text("a { background: url('img/a.png'); }")
+    (src / "css" / "img" / "a.png").write_bytes(b"png")
+    a = HTMLDependency(
+        "a",
+        "1.0",
+        source={"subdir": str(src)},
+        script={"src": "a.js"},
+        stylesheet={"href": "css/a.css"},
+        all_files=True,
+    )
+    b = HTMLDependency("b", "2.0", source={"subdir": str(src)}, script={"src": "b.js"})
+    c = HTMLDependency(
+        "c", "1.0", source={"subdir": str(src)}, script={"src": "b.js", "defer": ""}
+    )
+    doc = HTMLDocument(div(a, b, c))
+
+    rendered = doc.render(bundle=True)
+    html = rendered["html"]
+    bundle, *deps = rendered["dependencies"]
+    assert re.fullmatch("bundle-[0-9a-f]{16}", bundle.name)
+    assert [d.name for d in deps] == ["a", "b", "c"]
+    assert os.listdir(tmp_path / "bundles") == [bundle.name[len("bundle-") :]]
+    # The bundle takes the place of the first bundled dependency.
+    assert html.index(f"lib/{bundle.name}-0.0/bundle.css") < html.index(
+        f"lib/{bundle.name}-0.0/bundle.js"
+    )
+    assert html.index(f"lib/{bundle.name}-0.0/bundle.js") < html.index(
+        'src="lib/c-1.0/b.js"'
+    )
+    assert "a-1.0/a.js" not in html and "b-2.0/b.js" not in html
+
+    source = bundle.source_path_map(lib_prefix=None)["source"]
+    with open(os.path.join(source, "bundle.js")) as f:
+        js = f.read()
+    assert js.index("var a = 1\n;") < js.index("var b = 2;")
+    with open(os.path.join(source, "bundle.css")) as f:
+        assert 'url("../a-1.0/css/img/a.png")' in f.read()
+
+    # Renders with the same dependencies reuse the bundle.
+    assert doc.render(bundle=True)["dependencies"][0] == bundle
+    assert _bundle_dependencies([a, b], True, None) is _bundle_dependencies(
+        [a, b], True, None
+    )
+
+    out = tmp_path / "out"
+    out.mkdir()
+    div(a, b, c).save_html(str(out / "index.html"), bundle=True)
+    assert (out / "lib" / f"{bundle.name}-0.0" / "bundle.js").exists()
+    assert (out / "lib" / "a-1.0" / "css" / "img" / "a.png").exists()
+
+
+def test_bundle_deps_order(tmp_path, monkeypatch):
+    monkeypatch.setattr(_core, "_bundle_dir", str(tmp_path / "bundles"))
+    for name in "abcdef":
+        (tmp_path / f"{name}.js").write_text(f"var {name};")
+
+    def dep(name: str, **attrs: str) -> HTMLDependency:
+        script = {"src": f"{name}.js", **attrs}
+        return HTMLDependency(
+            name, "1.0", source={"subdir": str(tmp_path)}, script=script
+        )
+
+    # Dependencies which can't be bundled keep their place between the bundles, so
+    # that (e.g.) a plugin still loads after the library it needs.
+    jquery = dep("c", integrity="sha384-abc")
+    deps = [dep("a"), dep("b"), jquery, dep("d"), dep("e"), dep("f", defer="")]
+    rendered = HTMLDocument(div(*deps)).render(bundle=True)
+    html = rendered["html"]
+    bundles = [d for d in rendered["dependencies"] if d.name.startswith("bundle-")]
+    assert len(bundles) == 2
+    first, second = [html.index(f'src="lib/{d.name}-0.0/bundle.js"') for d in bundles]
+    assert first < html.index('src="lib/c-1.0/c.js"') < second
+    assert second < html.index('src="lib/f-1.0/f.js"')
+    for d, names in zip(bundles, ["ab", "de"]):
+        source = d.source_path_map(lib_prefix=None)["source"]
+        with open(os.path.join(source, "bundle.js")) as f:
+            js = f.read()
+        assert [n for n in "abcdef" if f"var {n};" in js] == list(names)
+
+    # A dependency on its own isn't bundled.
+    rendered = HTMLDocument(div(deps[0], jquery, deps[3])).render(bundle=True)
+    assert [d.name for d in rendered["dependencies"]] == ["a", "c", "d"]
+
+
+def test_bundle_deps_changes(tmp_path, monkeypatch):
+    # (The bundle directory is reset to the default after the test.)
+    monkeypatch.setattr(_core, "_bundle_dir", None)
+    root = tmp_path / "bundles"
+    set_bundle_dir(str(root))
+    (tmp_path / "a.js").write_text("var a = 1;")
+    src = {"subdir": str(tmp_path)}
+    a = HTMLDependency("a", "1.0", source=src, script={"src": "a.js"})
+    b = HTMLDependency("b", "1.0", source=src, script={"src": "a.js"})
+    bundle = _bundle_dependencies([a, b], True, None)
+    assert os.listdir(root) == [bundle.name[len("bundle-") :]]
+
+    # Bundles are made again when their files change.
+    (tmp_path / "a.js").write_text("var a = 22;")
+    new_bundle = _bundle_dependencies([a, b], True, None)
+    assert new_bundle.name != bundle.name
+    source = new_bundle.source_path_map(lib_prefix=None)["source"]
+    with open(os.path.join(source, "bundle.js")) as f:
+        assert "var a = 22;" in f.read()
+
+    # Bundles which haven't been used for a day are deleted when a bundle is written,
+    # and deleted bundles are written again when they're used. Only the bundles which
+    # this process wrote are deleted, since other processes may still use theirs.
+    old = root / bundle.name[len("bundle-") :]
+    other = root / "0123456789abcdef"
+    other.mkdir()
+    for path in (old, source, other):
+        os.utime(path, (0, 0))
+    (tmp_path / "a.js").write_text("var a = 333;")
+    latest = _bundle_dependencies([a, b], True, None)
+    assert not old.exists() and not os.path.exists(source)
+    assert other.exists()
+    source = latest.source_path_map(lib_prefix=None)["source"]
+    shutil.rmtree(source)
+    assert _bundle_dependencies([a, b], True, None) == latest
+    assert os.path.exists(os.path.join(source, "bundle.js"))
+
+
+def test_preload():
+    a = HTMLDependency(
+        "a",
+        "1.0",
+        source={"subdir": "foo"},
+        script=[{"src": "a.js", "fetchpriority": "low"}, {"src": "b.js"}],
+        stylesheet={"href": "a.css", "media": "print"},
+    )
+    b = HTMLDependency(
+        "b",
+        "1.0",
+        source={"subdir": "foo"},
+        script=[
+            {"src": "m.js", "type": "module", "fetchpriority": "high"},
+            {"src": "t.html", "type": "text/template"},
+        ],
+    )
+    rendered = HTMLDocument(div(a, b)).render(preload=True)
+    assert rendered["link_header"] == (
+        "<lib/b-1.0/m.js>; rel=modulepreload; fetchpriority=high, "
+        + "<lib/a-1.0/a.css>; rel=preload; as=style; media=print, "
+        + "<lib/a-1.0/b.js>; rel=preload; as=script, "
+        + "<lib/a-1.0/a.js>; rel=preload; as=script; fetchpriority=low"
+    )
+    html = rendered["html"]
+    links = re.findall('<link [^>]*rel="(?:module)?preload"[^>]*>', html)
+    assert links[0] == (
+        '<link href="lib/b-1.0/m.js" rel="modulepreload" fetchpriority="high"/>'
+    )
+    assert len(links) == 4
+    # The preload links come before the tags they're for.
+    assert html.index(links[-1]) < html.index('rel="stylesheet"')
+    assert "t.html" not in rendered["link_header"]
+
+    assert "link_header" not in HTMLDocument(div(a)).render()
+    # Nothing is preloaded when the dependencies are inlined.
+    c = HTMLDependency("c", "1.0", source={"subdir": "foo"}, head=tags.title("c"))
+    rendered = HTMLDocument(div(c)).render(preload=True, inline_deps=True)
+    assert rendered["link_header"] == ""
+
+
+def test_loaded_dependencies():
+    a1_1 = HTMLDependency("a", "1.1", source={"subdir": "foo"}, script={"src": "a1.js"})
+    a1_2 = HTMLDependency("a", "1.2", source={"subdir": "foo"}, script={"src": "a2.js"})
+    b1_0 = HTMLDependency("b", "1.0", source={"subdir": "foo"}, script={"src": "b1.js"})
+    c1_0 = HTMLDependency("c", "1.0", source={"subdir": "foo"}, script={"src": "c1.js"})
+
+    loaded = LoadedDependencies("a[1.1];b[1.0.0]")
+    assert a1_1 in loaded and b1_0 in loaded
+    assert a1_2 not in loaded and c1_0 not in loaded
+    assert "a[1.0]" in loaded and "a[1.10]" not in loaded
+    assert loaded.new_dependencies([a1_2, b1_0, c1_0]) == [a1_2, c1_0]
+
+    # Only new and upgraded dependencies are rendered.
+    x = div(a1_2, b1_0, c1_0)
+    assert [d.name for d in x.render(loaded=loaded)["dependencies"]] == ["a", "c"]
+    assert x.render(loaded="a[1.2];c[1.0]")["dependencies"] == [b1_0]
+    assert TagList(x).render(loaded=["b[1.0]"])["dependencies"] == [a1_2, c1_0]
+    assert x.freeze().render(loaded=loaded)["dependencies"] == [a1_2, c1_0]
+    assert len(x.render()["dependencies"]) == 3
+
+    # Adding an older version doesn't replace a newer one.
+    loaded.add(a1_2, c1_0, "a[1.0]")
+    assert sorted(loaded) == ["a[1.2]", "b[1.0.0]", "c[1.0]"]
+    assert x.render(loaded=loaded)["dependencies"] == []
+    assert len(LoadedDependencies([a1_1, "b[2.0]"])) == 2
+
+    with pytest.raises(ValueError):
+        LoadedDependencies("a")
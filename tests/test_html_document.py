@@ -255,3 +255,70 @@ def test_tagify_first():
         testdep_files = os.listdir(os.path.join(tmpdir, "mylib", "testdep"))
         testdep_files.sort()
         assert testdep_files == ["testdep.css", "testdep.js"]
+
+
+def test_render_single_pass():
+    dep1 = HTMLDependency("a", "1.0", source={"subdir": "a"}, script={"src": "a.js"})
+    dep2 = HTMLDependency("b", "1.0", source={"subdir": "b"}, script={"src": "b.js"})
+    calls = []
+
+    class Widget:
+        def __init__(self, *args) -> None:
+            self._content = TagList(*args)
+
+        def tagify(self) -> TagList:
+            calls.append(self)
+            return self._content.tagify()
+
+    x = div(
+        Widget("one", span("two", dep2)),
+        span(Widget(div("three"))),
+        dep1,
+        tags.script("1 && 1"),
+    )
+
+    # render() gives the same result as tagify() + get_dependencies() +
+    # get_html_string(), but it calls each .tagify() method only once.
+    cp = x.tagify()
+    expected = {"dependencies": cp.get_dependencies(), "html": cp.get_html_string()}
+    calls.clear()
+    assert x.render() == expected
+    assert len(calls) == 2
+    assert TagList(x, "foo").render()["html"] == TagList(cp, "foo").get_html_string()
+
+    # A Tagifiable that returns a single string is inlined into its parent.
+    expect = {"dependencies": [], "html": "<div>one</div>"}
+    assert div(Widget("one")).render() == expect
+
+    # Rendering a document doesn't modify the user's <html> tag.
+    page = tags.html(tags.head(tags.title("Title")), tags.body(x))
+    doc = HTMLDocument(page, lang="en")
+    calls.clear()
+    result = doc.render()
+    assert len(calls) == 2
+    assert result["dependencies"] == [dep2, dep1]
+    assert "lang" not in page.attrs
+    assert len(page.children[0].children) == 1
+    assert result["html"] == textwrap.dedent(
+        """\
+        <!DOCTYPE html>
+        <html lang="en">
+          <head>
+            <meta charset="utf-8"/>
+            <title>Title</title>
+            <script type="application/html-dependencies">b[1.0];a[1.0]</script>
+            <script src="lib/b-1.0/b.js"></script>
+            <script src="lib/a-1.0/a.js"></script>
+          </head>
+          <body>
+            <div>
+              one
+              <span>two</span>
+              <span>
+                <div>three</div>
+              </span>
+              <script>1 && 1</script>
+            </div>
+          </body>
+        </html>"""
+    )
@@ -254,6 +254,25 @@ def test_jsx_tagifiable_children():
     )
 
 
+def test_jsx_frozen_children():
+    # Frozen tags (and memo_component() results) inside a JSX tag are already tagified,
+    # and aren't modified, but their dependencies are collected.
+    Foo = jsx_tag_create("Foo")
+    dep = HTMLDependency("a", "1.1", source={"subdir": "foo"}, script={"src": "a1.js"})
+
+    @memo_component
+    def card(title: str) -> Tag:
+        return div(tags.h5(title), dep, class_="card")
+
+    x = div(span("Hello"), dep, id="x")
+    c = div(tags.h5("a"), dep, class_="card")
+    for frozen, tag in [(x.freeze(), x), (card("a"), c), (Foo(c.freeze()), Foo(c))]:
+        y = Foo(frozen)
+        assert str(y) == str(Foo(tag))
+        assert y.tagify().get_dependencies() == Foo(tag).tagify().get_dependencies()
+        assert dep in HTMLDocument(y).render()["dependencies"]
+
+
 def test_jsx_tag_normalize_attr():
     Foo = jsx_tag_create("Foo")
     x = Foo(class_="class_", x__="x__", x_="x_", x="x")
@@ -0,0 +1,58 @@
+import pytest
+
+from htmltools import *
+
+
+def test_memo_component():
+    dep = HTMLDependency("a", "1.0", source={"subdir": "a"}, script={"src": "a.js"})
+    calls = []
+
+    @memo_component(maxsize=2)
+    def card(title: str, text: str = "") -> Tag:
+        calls.append(title)
+        return div(tags.h5(title), text, dep, class_="card")
+
+    assert card.__name__ == "card"
+    x = card("a", text="b")
+    assert isinstance(x, FrozenTag)
+    assert card("a", text="b") is x
+    assert str(x) == str(div(tags.h5("a"), "b", class_="card"))
+    assert x.get_dependencies() == [dep]
+    assert div(x, x).render()["dependencies"] == [dep]
+    # Positional and keyword arguments are different keys.
+    assert card("a", "b") is not x
+    assert calls == ["a", "a"]
+
+    # The least recently used results are evicted.
+    card("a", text="b")
+    card("c")
+    assert card.cache_info() == ComponentCacheInfo(
+        hits=2, misses=3, evictions=1, maxsize=2, currsize=2
+    )
+    assert card("a", text="b") is x
+    card.cache_clear()
+    assert card.cache_info() == ComponentCacheInfo(0, 0, 0, 2, 0)
+
+    # Results are shared, so they're frozen.
+    with pytest.raises(TypeError):
+        x.add_class("big")
+
+    # Other kinds of results.
+    class Foo:
+        def tagify(self) -> TagList:
+            return TagList(span("foo"), "bar")
+
+    @memo_component
+    def other(kind: str) -> object:
+        return {"list": [span("a"), "b"], "foo": Foo(), "str": "text"}[kind]
+
+    assert str(other("list")) == "<span>a</span>\nb"
+    assert isinstance(other("list"), TagList)
+    assert str(other("foo")) == "<span>foo</span>\nbar"
+    assert other("str") == "text"
+    assert other.cache_info().currsize == 3
+
+    with pytest.raises(TypeError):
+        memo_component(lambda: {})()
+    with pytest.raises(TypeError):
+        card(["unhashable"])
@@ -0,0 +1,110 @@
+import os
+import re
+from functools import partial
+
+import pytest
+
+from htmltools import *
+
+
+@pytest.mark.parametrize("processes", [1, 2])
+def test_save_site(tmp_path, processes):
+    src = tmp_path / "src"
+    src.mkdir()
+    (src / "a.js").write_text("a")
+    (src / "b.css").write_text("b")
+    a1 = HTMLDependency("a", "1.0", source={"subdir": str(src)}, script={"src": "a.js"})
+    a2 = HTMLDependency("a", "2.0", source={"subdir": str(src)}, script={"src": "a.js"})
+    b = HTMLDependency(
+        "b", "1.0", source={"subdir": str(src)}, stylesheet={"href": "b.css"}
+    )
+
+    site = tmp_path / "site"
+    result = save_site(
+        {
+            "index.html": div("Home", a1, b),
+            "reports/2023/index.html": HTMLDocument(div("2023", a2, b)),
+        },
+        str(site),
+        processes=processes,
+    )
+
+    assert [p["path"] for p in result["pages"]] == [
+        str(site / "index.html"),
+        str(site / "reports" / "2023" / "index.html"),
+    ]
+    assert [p["dependencies"] for p in result["pages"]] == [
+        ["a-1.0", "b-1.0"],
+        ["a-2.0", "b-1.0"],
+    ]
+    for p in result["pages"]:
+        assert p["render_time"] >= 0 and p["write_time"] >= 0
+    assert result["dependencies"] == [a1, b, a2]
+
+    # Each page refers to the shared lib directory with a relative path.
+    html = (site / "index.html").read_text()
+    assert '<script src="lib/a-1.0/a.js"></script>' in html
+    html = (site / "reports" / "2023" / "index.html").read_text()
+    assert '<script src="../../lib/a-2.0/a.js"></script>' in html
+    assert '<link href="../../lib/b-1.0/b.css" rel="stylesheet"/>' in html
+    assert sorted(os.listdir(site / "lib")) == ["a-1.0", "a-2.0", "b-1.0"]
+
+
+def test_save_site_without_versions(tmp_path):
+    src = tmp_path / "src"
+    src.mkdir()
+    (src / "a1.js").write_text("a1")
+    (src / "a2.js").write_text("a2")
+    a1 = HTMLDependency(
+        "a", "1.0", source={"subdir": str(src)}, script={"src": "a1.js"}
+    )
+    a2 = HTMLDependency(
+        "a", "2.0", source={"subdir": str(src)}, script={"src": "a2.js"}
+    )
+
+    # The pages share a folder for the dependency, which gets the latest version, and
+    # the pages which use an older version use the latest one instead.
+    doc = HTMLDocument(div(a1))
+    site = tmp_path / "site"
+    result = save_site(
+        [("1.html", div(a1)), ("2.html", div(a2)), ("3.html", doc)],
+        str(site),
+        libdir="deps",
+        include_version=False,
+    )
+    assert result["dependencies"] == [a2]
+    assert [p["dependencies"] for p in result["pages"]] == [["a-2.0"]] * 3
+    assert os.listdir(site / "deps" / "a") == ["a2.js"]
+    for page in ["1.html", "2.html", "3.html"]:
+        html = (site / page).read_text()
+        files = re.findall(r'(?:src|href)="([^"]+)"', html)
+        assert files == ["deps/a/a2.js"]
+        assert all((site / f).exists() for f in files)
+    # The document wasn't modified.
+    assert "a2.js" not in str(doc.render()["html"])
+
+    # Different dependencies with the same version can't share a folder.
+    a3 = HTMLDependency(
+        "a", "2.0", source={"subdir": str(src)}, script={"src": "a1.js"}
+    )
+    with pytest.raises(ValueError, match="same version"):
+        save_site(
+            [("1.html", div(a2)), ("2.html", div(a3))],
+            str(site),
+            include_version=False,
+        )
+
+
+@pytest.mark.parametrize("processes", [1, 2])
+def test_save_site_functions(tmp_path, processes):
+    # Pages can be given as functions, which are called by the process which renders
+    # the page.
+    pages = {f"{i}.html": partial(tags.h1, f"Page {i}") for i in range(3)}
+    result = save_site(pages, str(tmp_path), processes=processes)
+    assert len(result["pages"]) == 3
+    assert "<h1>Page 2</h1>" in (tmp_path / "2.html").read_text()
+
+    # By default, pages are rendered in this process, so they don't have to be
+    # picklable.
+    save_site({"4.html": lambda: tags.h1("Page 4")}, str(tmp_path))
+    assert "<h1>Page 4</h1>" in (tmp_path / "4.html").read_text()
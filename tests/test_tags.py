@@ -1,10 +1,14 @@
 import os
 import copy
+import pickle
 from tempfile import TemporaryDirectory
 from typing import Any, Union, Callable
 import textwrap
 
+import pytest
+
 from htmltools import *
+from htmltools import _core
 
 
 def expect_html(x: Any, expected: str):
@@ -127,32 +131,398 @@ def test_tag_shallow_copy():
     assert x.children[2] is y.children[2]
 
 
-def test_tagify_deep_copy():
-    # Each call to .tagify() should do a shallow copy, but since it recurses, the result
-    # is a deep copy.
+def test_tagify_copy_on_write():
+    # .tagify() returns a new object, but subtrees which have nothing to tagify are
+    # shared with the original, instead of being copied.
     dep = HTMLDependency(
         "a", "1.1", source={"package": None, "subdir": "foo"}, script={"src": "a1.js"}
     )
     x = div(tags.i("hello", prop="value"), "world", dep, class_="myclass")
 
     y = x.tagify()
-    y.children[0].children[0] = "HELLO"
-    y.children[0].attrs["prop"] = "VALUE"
     y.children[1] = "WORLD"
     y.attrs["class"] = "MYCLASS"
-    y.children[2].name = "A"
 
+    assert x is not y
     assert x.attrs == {"class": "myclass"}
     assert y.attrs == {"class": "MYCLASS"}
-    assert x.children[0].attrs == {"prop": "value"}
-    assert y.children[0].attrs == {"prop": "VALUE"}
-    assert x.children[0].children[0] == "hello"
-    assert y.children[0].children[0] == "HELLO"
     assert x.children[1] == "world"
     assert y.children[1] == "WORLD"
-    assert x.children[2].name == "a"
-    assert y.children[2].name == "A"
-    assert x.children[2] is not y.children[2]
+    assert x.children[0] is y.children[0]
+    assert x.children[2] is y.children[2]
+
+    # Only the ancestors of a Tagifiable object are copied.
+    class Foo:
+        def tagify(self) -> Tag:
+            return span("foo")
+
+    static = tags.p("static")
+    x = div(div(tags.b(Foo()), static), static)
+    y = x.tagify()
+    assert str(y) == textwrap.dedent(
+        """\
+        <div>
+          <div>
+            <b>
+              <span>foo</span>
+            </b>
+            <p>static</p>
+          </div>
+          <p>static</p>
+        </div>"""
+    )
+    assert isinstance(x.children[0].children[0].children[0], Foo)
+    assert x.children[0] is not y.children[0]
+    assert x.children[0].children[0] is not y.children[0].children[0]
+    assert x.children[0].children[1] is y.children[0].children[1] is static
+    assert y.children[1] is static
+
+    # Once a tree is known to have nothing to tagify, .tagify() doesn't walk it again
+    # until something Tagifiable is added to it.
+    x = div(span("a"), span(tags.b("b")))
+    assert x.children._clean_epoch == _core._tagify_epoch
+    y = x.tagify()
+    assert y.children[1] is x.children[1]
+    x.children[1].children[0].append(Foo())
+    assert x.children._clean_epoch != _core._tagify_epoch
+    assert str(x.tagify().children[1]) == textwrap.dedent(
+        """\
+        <span>
+          <b>
+            b
+            <span>foo</span>
+          </b>
+        </span>"""
+    )
+    x.children[0].children = TagList(Foo())
+    assert str(x.tagify().children[0]) == "<span>\n  <span>foo</span>\n</span>"
+
+    # The bookkeeping doesn't affect equality.
+    x = TagList(span("a"))
+    _core._mark_tagify_dirty()
+    assert x == TagList(span("a"))
+
+
+def test_freeze():
+    class Foo:
+        def tagify(self) -> Tag:
+            return span("foo")
+
+    dep = HTMLDependency("a", "1.0", source={"subdir": "a"}, script={"src": "a.js"})
+    x = div(tags.p("hello", class_="greeting"), Foo(), dep, id="nav")
+    frozen = x.freeze()
+    assert isinstance(frozen, FrozenTag)
+    assert isinstance(frozen.children[0], FrozenTag)
+    assert frozen == x.tagify() and x.tagify() == frozen
+    assert str(frozen) == str(x.tagify())
+    assert frozen.get_dependencies() == [dep]
+    assert isinstance(x.children[1], Foo)
+
+    # Frozen tags, their attributes, and their children can't be modified.
+    for modify in [
+        lambda: frozen.append("x"),
+        lambda: frozen(class_="x"),
+        lambda: frozen.add_class("x"),
+        lambda: frozen.children.insert(0, "x"),
+        lambda: frozen.children.pop(),
+        lambda: frozen.children[0].children.extend(["x"]),
+        lambda: frozen.attrs.update(id="x"),
+        lambda: setattr(frozen, "name", "span"),
+        lambda: setattr(frozen, "children", TagList("x")),
+    ]:
+        with pytest.raises(TypeError):
+            modify()
+    assert str(frozen) == str(x.tagify())
+
+    # The HTML is cached, and spliced into other tags as is.
+    html_ = frozen.get_html_string(indent=1)
+    assert frozen.get_html_string(indent=1) is html_
+    assert frozen.get_html_string() == str(x.tagify())
+    page = TagList(tags.main(frozen, "content"), frozen)
+    assert page.render() == TagList(tags.main(x, "content"), x).render()
+    assert frozen.render() == x.render()
+    assert HTMLDocument(frozen).render() == HTMLDocument(x).render()
+    doc = tags.html(tags.head(tags.title("Title")), tags.body(x))
+    assert HTMLDocument(doc.freeze()).render() == HTMLDocument(doc).render()
+
+    # Copying or tagifying a frozen tag returns the same object.
+    assert frozen.freeze() is frozen
+    assert frozen.tagify() is frozen
+    assert copy.copy(frozen) is frozen
+    assert copy.deepcopy(frozen) is frozen
+    assert pickle.loads(pickle.dumps(frozen)) == frozen
+    assert FrozenTag("div", Foo(), id="foo") == div(span("foo"), id="foo")
+
+    frozen_list = TagList(x, "text").freeze()
+    assert isinstance(frozen_list[0], FrozenTag)
+    assert (
+        frozen_list.get_html_string() == TagList(x.tagify(), "text").get_html_string()
+    )
+    with pytest.raises(TypeError):
+        frozen_list.append("x")
+
+
+def test_freeze_intern():
+    def cell(i: int) -> Tag:
+        return tags.td(span(tags.i(class_="icon"), str(i % 2)), class_="cell")
+
+    x = tags.table([tags.tr([cell(i) for i in range(4)]) for _ in range(3)])
+    frozen = x.freeze(intern=True)
+    assert frozen == x and str(frozen) == str(x)
+    rows = frozen.children
+    assert rows[0] is rows[1] is rows[2]
+    cells = rows[0].children
+    assert cells[0] is cells[2] and cells[1] is cells[3] and cells[0] is not cells[1]
+    # Equal attributes and strings are shared too.
+    assert cells[0].attrs is cells[1].attrs
+    spans = [c.children[0] for c in cells]
+    assert spans[0].children[1] is x.children[0].children[0].children[0].children[1]
+
+    # Shared tags are only rendered once, and spliced in wherever they appear.
+    html_ = frozen.get_html_string()
+    assert list(rows[0]._html_cache) == [(1, "\n")]
+    assert list(cells[0]._html_cache) == [(2, "\n")]
+    assert html_ == x.get_html_string()
+    assert frozen.render() == x.render()
+
+    # Without interning, only identical objects are shared.
+    assert x.freeze().children[0] is not x.freeze().children[1]
+    assert TagList(x, "text").freeze(intern=True)[0] == frozen
+    assert x.freeze().freeze(intern=True).children[1] is not frozen.children[1]
+    assert x.freeze().freeze(intern=True) == frozen
+
+
+def test_structural_hash():
+    def tree() -> Tag:
+        dep = HTMLDependency("a", "1.0", source={"subdir": "a"}, script={"src": "a.js"})
+        return div(span("a", class_="x", id="y"), HTML("<b>"), dep, id="z")
+
+    x, y = tree(), tree()
+    h = _core._structural_hash(x)
+    assert h is not None and h == _core._structural_hash(y)
+    assert x == y and x.freeze() == y and x.freeze() == y.freeze()
+    assert hash(x.freeze()) == hash(y.freeze())
+    assert {x.freeze(): 1}[y.freeze()] == 1
+    assert _core._structural_hash(x.freeze()) == h
+
+    # The order of attributes doesn't matter, but strings and HTML() are different.
+    assert span(id="a", class_="b") == span(class_="b", id="a")
+    assert _core._structural_hash(span(id="a", class_="b")) == _core._structural_hash(
+        span(class_="b", id="a")
+    )
+    assert div("<b>") != div(HTML("<b>"))
+    # Even if they'd be rendered the same.
+    assert div("a") != div(HTML("a")) and TagList("a") != TagList(HTML("a"))
+    assert span(title="a") != span(title=HTML("a"))
+    assert div("a").freeze() != div(HTML("a")).freeze()
+    # Subclasses of HTML are HTML, as children and as attribute values.
+    class MyHTML(HTML):
+        pass
+
+    assert div(MyHTML("a")) == div(HTML("a")) and div(MyHTML("a")) != div("a")
+    assert span(title=MyHTML("a")) == span(title=HTML("a"))
+    assert span(title=MyHTML("a")) != span(title="a")
+    assert TagList("a") != TagList("b") and TagList("a") == TagList("a")
+
+    # Modifying a tag, or any of its descendants, changes its hash.
+    for modify in [
+        lambda t: t.append("x"),
+        lambda t: t.children[0].add_class("w"),
+        lambda t: t.children[0](title="t"),
+        lambda t: t.children[0].children.insert(0, "x"),
+        lambda t: t.children[0].children.pop(),
+        lambda t: t.children.reverse(),
+        lambda t: t.attrs.pop("id"),
+        lambda t: t.children[0].attrs.clear(),
+        lambda t: setattr(t, "name", "p"),
+        lambda t: setattr(t.children[0], "name", "p"),
+        lambda t: setattr(t, "children", TagList("x")),
+    ]:
+        t = tree()
+        assert _core._structural_hash(t) == h
+        modify(t)
+        assert _core._structural_hash(t) != h
+        assert t != x and x != t and t != x.freeze()
+
+    # Only the hashes of frozen trees are cached (mutable trees don't know their
+    # ancestors, so modifying them couldn't invalidate the hashes of the ancestors).
+    frozen = x.freeze()
+    assert not hasattr(x, "_hash_cache") and frozen._hash_cache is None
+    assert _core._structural_hash(frozen) == h and frozen._hash_cache == h
+    assert frozen.children[0]._hash_cache is not None
+
+    # Equal hashes aren't taken as equality: the trees are still compared.
+    a, b = div("a").freeze(), div("b").freeze()
+    for t in [a, b]:
+        object.__setattr__(t, "_hash_cache", bytes(16))
+    assert a != b and a == div("a") and b != div("a")
+
+    # Equal dependencies have the same hash, even if they're written differently.
+    dep1 = HTMLDependency("a", "1.0", source={"subdir": "a"}, all_files=True)
+    dep2 = HTMLDependency("a", "1.0.0", source={"subdir": "a"}, all_files=True)
+    assert dep1 == dep2
+    assert _core._structural_hash(div(dep1)) == _core._structural_hash(div(dep2))
+
+    # Trees with other objects don't have a structural hash, and are compared field by
+    # field.
+    class Foo:
+        def tagify(self) -> Tag:
+            return span("foo")
+
+    foo = Foo()
+    assert _core._structural_hash(div(foo)) is None
+    assert div(foo) == div(foo) and div(foo) != div(Foo())
+
+    # Deep trees are hashed without recursion.
+    def deep_tree(leaf: str) -> Tag:
+        deep = span(leaf)
+        for _ in range(5000):
+            deep = div(deep)
+        return deep
+
+    deep = deep_tree("leaf")
+    assert isinstance(_core._structural_hash(deep), bytes)
+    # And compared without recursion.
+    assert deep == deep_tree("leaf") and deep != deep_tree("other")
+    assert deep.freeze() == deep and deep_tree("other") != deep.freeze()
+
+
+def test_render_cache():
+    dep = HTMLDependency("dep", "1.0", source={"subdir": ""})
+
+    def card(title: str) -> Tag:
+        return div(div(title, class_="title"), "Text", dep, class_="card")
+
+    def page() -> Tag:
+        return div(card("a"), card("b"), card("a"), tags.ul(tags.li("x"), tags.li("y")))
+
+    expected = page().get_html_string()
+    expected_rendered = page().render()
+
+    cache = RenderCache()
+    with use_render_cache(cache) as c:
+        assert c is cache
+        # Mutable tags aren't looked up, since their hashes aren't known.
+        assert page().get_html_string() == expected
+        assert cache.cache_info() == (0, 0, 0, 0, 0, cache.max_bytes)
+
+        # Nor are frozen tags whose hashes haven't been computed.
+        assert page().freeze().get_html_string() == expected
+        assert cache.cache_info().misses == 0
+
+        # Interned trees are hashed, so equal trees share their HTML. (The card which
+        # appears twice is rendered once, and cached too.)
+        assert page().freeze(intern=True).get_html_string() == expected
+        info = cache.cache_info()
+        assert (info.hits, info.misses, info.evictions) == (0, 2, 0)
+        assert info.entries == 2 and info.bytes > 0
+        assert page().freeze(intern=True).get_html_string() == expected
+        assert cache.cache_info().hits == 1
+        # So are the tags in frozen lists, and their dependencies are collected.
+        hits = cache.cache_info().hits
+        for _ in range(2):
+            x = TagList(card("b"), card("c")).freeze(intern=True)
+            assert x.render() == TagList(card("b"), card("c")).render()
+        assert cache.cache_info().hits == hits + 2
+        assert page().freeze(intern=True).render() == expected_rendered
+        x = page().freeze(intern=True)
+        assert x.get_html_string(indent=1) == page().get_html_string(indent=1)
+
+        # Frozen tags which have been compared have known hashes.
+        frozen = page().freeze()
+        assert frozen == page().freeze()
+        hits = cache.cache_info().hits
+        assert str(div(frozen)) == str(div(page()))
+        assert cache.cache_info().hits == hits + 1
+
+        with use_render_cache(None):
+            assert page().freeze(intern=True).get_html_string() == expected
+        assert cache.cache_info().hits == hits + 1
+
+        # Documents, whose tags are copied when they're tagified.
+        doc = HTMLDocument(page().freeze(intern=True), lang="en")
+        assert doc.render() == HTMLDocument(page(), lang="en").render()
+        hits = cache.cache_info().hits
+
+    assert page().freeze(intern=True).get_html_string() == expected
+    assert cache.cache_info().hits == hits
+
+    # The least recently used entries are evicted.
+    cache = RenderCache(max_bytes=500)
+    with use_render_cache(cache):
+        for title in "abcdefgh":
+            card(title).freeze(intern=True).get_html_string()
+    info = cache.cache_info()
+    assert info.evictions > 0 and info.bytes <= 500
+    assert info.entries + info.evictions == 8
+
+
+def test_tag_slots():
+    # Tags, and their attributes and children, don't have a __dict__.
+    x = div(span("a"), id="foo")
+    assert not hasattr(x, "__dict__")
+    assert not hasattr(x.attrs, "__dict__")
+    assert not hasattr(x.children, "__dict__")
+
+    # Empty attributes/children are shared until they're accessed.
+    y = br()
+    assert y._attrs is br()._attrs
+    assert y._children is br()._children
+    assert y.has_class("foo") is False
+    assert str(y) == "<br/>"
+    assert y._attrs is br()._attrs
+    y.attrs["class"] = "foo"
+    y.children.append("text")
+    assert str(y) == '<br class="foo">text</br>'
+    assert str(br()) == "<br/>"
+    assert y == Tag("br", "text", class_="foo")
+    assert br() == Tag("br", children=[], **{})
+    assert copy.copy(y) == y
+
+    # Subclasses can still have instance attributes.
+    class MyTag(Tag):
+        def __init__(self, *args: TagChildArg) -> None:
+            super().__init__("my-tag", *args)
+            self.extra = "extra"
+
+    z = copy.copy(MyTag("a"))
+    assert z.extra == "extra"
+    assert z == MyTag("a")
+
+
+def test_tagifiable_duck_typing():
+    # Objects are Tagifiable if they have a .tagify() method, even if it was set on the
+    # instance rather than the class.
+    class Widget:
+        pass
+
+    w = Widget()
+    w.tagify = lambda: span("w")  # type: ignore
+    x = div(w, 1, True)
+    assert str(x.tagify()) == "<div>\n  <span>w</span>\n  1\n  True\n</div>"
+    assert x.render()["html"] == str(x.tagify())
+    with pytest.raises(TypeError):
+        div(Widget())
+    with pytest.raises(RuntimeError):
+        x.get_html_string()
+
+    # Tag subclasses that override tagify() are tagified.
+    class MyTag(Tag):
+        def tagify(self) -> Tag:
+            return span("my")
+
+    assert str(div(MyTag("div")).tagify()) == "<div>\n  <span>my</span>\n</div>"
+
+
+def test_tag_construction_shortcuts():
+    # Common shapes of arguments are handled without flattening, but give the same
+    # result as the general case.
+    a = span("a")
+    assert div("x", a, id="y") == div(["x", [a]], {"id": "y"})
+    assert div(a).children == TagList([a])
+    assert div(a).children._clean_epoch == _core._tagify_epoch
+    assert str(div(class_="a", **{"class": "b"})) == '<div class="a b"></div>'
+    assert str(div(HTML("<b>"), id=None, hidden=True)) == '<div hidden=""><b></div>'
 
 
 def test_tag_writing():
@@ -386,6 +756,37 @@ def test_taglist_tagifiable():
     assert list(x.tagify().children) == ["1", "foo", "bar", "2"]
 
 
+def test_document_tagifiable():
+    # In a document, Tagifiable objects can return other Tagifiable objects.
+    class Foo:
+        def tagify(self) -> Tag:
+            return span("foo")
+
+    class Widget:
+        def tagify(self) -> Tag:
+            return div("w", Foo())
+
+    class WidgetList:
+        def tagify(self) -> TagList:
+            return TagList(Foo(), Widget())
+
+    class WidgetTag(Tag):
+        def tagify(self) -> Tag:
+            return div("w", Foo())
+
+    class ClassTag(Tag):
+        def tagify(self) -> Tag:
+            x = super().tagify()
+            x.add_class("c")
+            return x
+
+    widget = div("w", span("foo"))
+    x = div(Widget(), WidgetList(), WidgetTag("p"), ClassTag("p", Widget()))
+    expected = div(widget, span("foo"), widget, widget, Tag("p", widget, class_="c"))
+    assert HTMLDocument(x).render() == HTMLDocument(expected).render()
+    assert HTMLDocument(Widget()).render() == HTMLDocument(widget).render()
+
+
 def test_attr_vals():
     attrs = {
         "none": None,
@@ -425,3 +826,42 @@ def test_metadata_nodes_gone():
         str(TagList(span("Body content"), MetadataNode()))
         == "<span>Body content</span>"
     )
+
+
+def test_html_writer():
+    from io import StringIO
+
+    from htmltools._core import _write_tag_html, _write_taglist_html
+
+    x = div(span("a<b", class_="c"), "text", head_content("abc"), tags.br())
+    chunks = []
+    _write_tag_html(x, chunks.append, 1, "\n")
+    assert "".join(chunks) == x.get_html_string(indent=1)
+
+    # Any file-like writer can be used.
+    out = StringIO()
+    _write_taglist_html(TagList(x, "foo"), out.write, 0, "\r\n")
+    assert out.getvalue() == TagList(x, "foo").get_html_string(eol="\r\n")
+
+    # Tag subclasses which customize get_html_string() are respected.
+    class MyTag(Tag):
+        def get_html_string(self, indent: int = 0, eol: str = "\n") -> HTML:
+            return HTML("  " * indent + "<custom/>")
+
+    expect_html(div(MyTag("x"), "y"), "<div>\n  <custom/>\n  y\n</div>")
+
+
+def test_deeply_nested_tags():
+    # Rendering, tagify() and get_dependencies() shouldn't recurse once per level of
+    # nesting, so they work on trees that are deeper than the recursion limit.
+    dep = HTMLDependency("a", "1.1", source={"subdir": "foo"}, script={"src": "a1.js"})
+    depth = 5000
+    x = span("leaf", dep)
+    for _ in range(depth):
+        x = div(x)
+
+    html = str(x.tagify())
+    assert html.count("<div>") == depth
+    assert "  " * depth + "<span>leaf</span>" in html
+    assert x.get_dependencies() == [dep]
+    assert x.render()["dependencies"] == [dep]
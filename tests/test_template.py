@@ -0,0 +1,83 @@
+import pytest
+
+from htmltools import *
+
+
+def test_template():
+    dep = HTMLDependency("a", "1.0", source={"subdir": "a"}, script={"src": "a.js"})
+    row = Template(
+        tags.tr(
+            tags.td(Slot("name"), title=Slot("name")),
+            tags.td(Slot("count", int)),
+            tags.td(Slot("cell", (str, Tag))),
+            class_=Slot("cls"),
+        ),
+        dep,
+    )
+    assert row.slots == {"cls": str, "name": str, "count": int, "cell": (str, Tag)}
+
+    # Filling a template gives the same HTML as creating the tags.
+    def tr(name: str, count: int, cell: TagChildArg, cls: str) -> Tag:
+        return tags.tr(
+            tags.td(name, title=name),
+            tags.td(str(count)),
+            tags.td(cell),
+            class_=cls,
+        )
+
+    values = {"name": "<a> & 'b'", "count": 3, "cell": "x", "cls": 'a"b'}
+    assert row(**values) == str(tr(**values))
+    values["cell"] = HTML("<b>y</b>")
+    assert row(**values) == str(tr(**values))
+    values["name"] = HTML("<i>a</i>")
+    assert row(**values) == str(tr(**values))
+    assert isinstance(row(**values), HTML)
+    # Slots are rendered like strings, so a tag which fills a slot that's the only child
+    # of a tag is inline, and tags which fill a slot on its own line are indented like
+    # the line.
+    values["cell"] = div(span("x"), "y")
+    assert "  <td><div>\n    <span>x</span>\n    y\n  </div></td>" in row(**values)
+    block = Template(div(span("x"), Slot("y", Tag)))
+    assert block(y=div(span("x"))) == str(div(span("x"), div(span("x"))))
+    # Only the lines of the tags are indented, not the contents of <pre> tags, or of
+    # HTML() strings.
+    y = div(tags.pre("a\n  b"), tags.textarea("c\nd"), HTML("<i>\n</i>"), "e")
+    assert block(y=y) == str(div(span("x"), y))
+    assert "<pre>a\n  b</pre>" in block(y=y)
+    inline = Template(div(span(Slot("y", Tag))))
+    assert "<span><div>\n    <pre>a\n  b</pre>\n" in inline(y=y)
+    many = Template(div(span("x"), Slot("y", TagList)))
+    assert many(y=TagList(y, y)) == str(div(span("x"), y, y))
+
+    # The dependencies of the template, and of the values.
+    dep2 = HTMLDependency("a", "2.0", source={"subdir": "a"})
+    dep3 = HTMLDependency("b", "1.0", source={"subdir": "b"})
+    assert row.render(**values)["dependencies"] == [dep]
+    values["cell"] = div(dep2, dep3)
+    rendered = row.render(**values)
+    assert rendered["dependencies"] == [dep2, dep3]
+    assert rendered["html"] == row(**values)
+    assert row.render(**values)["dependencies"][0] is not dep
+
+    # Wrong values
+    with pytest.raises(TypeError, match="Missing values for slots: count"):
+        row(name="a", cell="b", cls="c")
+    with pytest.raises(TypeError, match="Unknown slots: other"):
+        row(name="a", count=1, cell="b", cls="c", other="d")
+    with pytest.raises(TypeError, match="has to be int, not str"):
+        row(name="a", count="1", cell="b", cls="c")
+    with pytest.raises(TypeError, match="has to be str, not Tag"):
+        row(name=span("a"), count=1, cell="b", cls="c")
+    attr = Template(span(title=Slot("title", object)))
+    with pytest.raises(TypeError, match="is an attribute value"):
+        attr(title=span("a"))
+
+    # Slots which can't be filled
+    with pytest.raises(ValueError, match="<script>"):
+        Template(tags.script(Slot("a")))
+    with pytest.raises(ValueError, match="HTML"):
+        Template(div(HTML("<b>" + Slot("a") + "</b>")))
+    with pytest.raises(ValueError, match="more than one type"):
+        Template(div(Slot("a"), Slot("a", int)))
+    with pytest.raises(ValueError, match="identifiers"):
+        Slot("a b")
@@ -1,6 +1,12 @@
+import json
+import os
+import subprocess
+import sys
+import textwrap
+
 import pytest
 from htmltools import *
-from htmltools._util import _flatten
+from htmltools._util import _flatten, _html_escape
 
 
 def test_flatten():
@@ -39,3 +45,141 @@ def test_flatten():
         _flatten([0, TagList(1, 2, div(), TagList(span(div()), span())), (3, 4)])
     ) == [0, "1", "2", div(), span(div()), span(), 3, 4]
     assert _flatten([1, [TagList("2"), 3], 4]) == [1, "2", 3, 4]
+
+
+def test_html_escape():
+    assert _html_escape("a < b && c > d") == "a &lt; b &amp;&amp; c &gt; d"
+    assert _html_escape("\"'\r\n") == "\"'\r\n"
+    assert (
+        _html_escape("<a href='x'>&amp;\"\r\n", attr=True)
+        == "&lt;a href=&apos;x&apos;&gt;&amp;amp;&quot;&#13;&#10;"
+    )
+    # Strings without anything to escape are returned as is.
+    x = "no special characters"
+    assert _html_escape(x) is x
+    assert _html_escape(x, attr=True) is x
+
+
+def test_lazy_imports():
+    # `import htmltools` doesn't import the tag function modules, or modules that are
+    # only needed for saving or previewing HTML.
+    code = textwrap.dedent(
+        """\
+        import sys
+        import htmltools
+        lazy = ["htmltools.tags", "htmltools.svg", "htmltools._jsx", "http.server",
+                "packaging.version", "shutil", "tempfile", "urllib.parse", "webbrowser"]
+        print(",".join(m for m in lazy if m in sys.modules))
+        htmltools.div
+        print("htmltools.tags" in sys.modules)
+        # The helpers for the lazy imports aren't in the module's namespace.
+        helpers = {"importlib", "List", "TYPE_CHECKING", "_lazy_imports"}
+        print(sorted(helpers & set(dir(htmltools))), "_jsx" in dir(htmltools))
+        """
+    )
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    out = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=root,
+        env={**os.environ, "PYTHONPATH": root},
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    assert out.splitlines() == ["", "True", "[] True"]
+
+
+def test_path_caches(tmp_path, monkeypatch):
+    from htmltools import _util
+
+    clear_path_caches()
+    # Package directories are looked up once.
+    pkg_dir = _util._package_dir("htmltools")
+    assert pkg_dir == os.path.dirname(_util.__file__)
+    assert _util._package_dirs == {"htmltools": pkg_dir}
+    assert _util._package_dir("htmltools") is pkg_dir
+
+    # Relative paths are resolved against the working directory they're used from.
+    (tmp_path / "a" / "lib").mkdir(parents=True)
+    (tmp_path / "b" / "lib").mkdir(parents=True)
+    monkeypatch.chdir(tmp_path / "a")
+    assert _util._realpath("lib") == os.path.realpath(tmp_path / "a" / "lib")
+    monkeypatch.chdir(tmp_path / "b")
+    assert _util._realpath("lib") == os.path.realpath(tmp_path / "b" / "lib")
+
+    # Changed symlinks aren't noticed until the caches are cleared.
+    (tmp_path / "target1").mkdir()
+    (tmp_path / "target2").mkdir()
+    link = tmp_path / "link"
+    link.symlink_to(tmp_path / "target1")
+    assert _util._realpath(str(link)) == os.path.realpath(tmp_path / "target1")
+    link.unlink()
+    link.symlink_to(tmp_path / "target2")
+    assert _util._realpath(str(link)) == os.path.realpath(tmp_path / "target1")
+    clear_path_caches()
+    assert _util._package_dirs == {} and _util._realpaths == {}
+    assert _util._realpath(str(link)) == os.path.realpath(tmp_path / "target2")
+
+
+def test_file_contents_cache(tmp_path, monkeypatch):
+    from htmltools import _util
+
+    clear_path_caches()
+    monkeypatch.setattr(_util, "_FILE_CONTENTS_MAX_BYTES", 10)
+    for name, text in [("a", "aaaa"), ("b", "bbbb"), ("big", "x" * 11)]:
+        (tmp_path / name).write_text(text)
+
+    def path(name: str) -> str:
+        return str(tmp_path / name)
+
+    # Contents are cached until the file changes.
+    assert _util._read_file(path("a")) == b"aaaa"
+    assert _util._read_file(path("a")) is _util._read_file(path("a"))
+    (tmp_path / "a").write_text("aaa")
+    assert _util._read_file(path("a")) == b"aaa"
+    assert _util._file_contents_bytes == 3
+
+    # Files which are too big aren't cached, and the least recently used files are
+    # evicted.
+    assert _util._read_file(path("big")) == b"x" * 11
+    assert list(_util._file_contents) == [path("a")]
+    _util._read_file(path("b"))
+    _util._read_file(path("a"))
+    (tmp_path / "c").write_text("cccc")
+    _util._read_file(path("c"))
+    assert list(_util._file_contents) == [path("a"), path("c")]
+    assert _util._file_contents_bytes == 7
+
+    clear_path_caches()
+    assert not _util._file_contents and _util._file_contents_bytes == 0
+
+
+def test_file_hash_cache(tmp_path):
+    from htmltools import _util
+
+    (tmp_path / "a.js").write_text("a")
+    cache = tmp_path / "cache" / "hashes.json"
+    set_file_hash_cache(str(cache))
+    try:
+        [h] = _util._file_hashes_for([str(tmp_path / "a.js")])
+        saved = json.loads(cache.read_text())
+        assert saved[str(tmp_path / "a.js")][2] == h
+
+        # Hashes are loaded from the cache file, and only used while the file's mtime
+        # and size are the same.
+        _util._file_hashes.clear()
+        saved[str(tmp_path / "a.js")][2] = "cached"
+        cache.write_text(json.dumps(saved))
+        set_file_hash_cache(str(cache))
+        assert _util._file_hashes_for([str(tmp_path / "a.js")]) == ["cached"]
+        (tmp_path / "a.js").write_text("ab")
+        assert _util._file_hashes_for([str(tmp_path / "a.js")]) != ["cached"]
+
+        # A corrupt cache file is ignored (and then replaced).
+        cache.write_text("{")
+        set_file_hash_cache(str(cache))
+        (tmp_path / "b.js").write_text("b")
+        _util._file_hashes_for([str(tmp_path / "b.js")])
+        assert str(tmp_path / "b.js") in json.loads(cache.read_text())
+    finally:
+        set_file_hash_cache(None)